@@ -18,6 +18,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy
+from bisect import bisect_right
+from calendar import monthrange
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
@@ -198,18 +201,18 @@ def locate_day_in_analysis_interval(day_for_locate):
     the day_for_locate is inside.
     """
     range_analysis_interval = get_range_analysis_interval()
-    range_analysis_interval.reverse()
-    for range_item in range_analysis_interval:
-        if day_for_locate >= range_item:
-            return range_item
+    position = bisect_right(range_analysis_interval, day_for_locate)
+    if position:
+        return range_analysis_interval[position - 1]
 
 
-def get_values_in_range_analysis_interval(variable, year, n_month, day=None, lag=None):
-    """Get all values inside range analysis interval in specific year, month, day or lag.
-    The "type" must be "D" or "I". For bimonthly and trimonthly the "n_month" is the start
-    of month of bimonthly or trimonthly respective, for 5, 10, or 15 days the "day" is a
-    start day in the range analysis interval. The "lag" is only affect for the independent
-    variable and it must be 0, 1 or 2.
+def get_range_of_dates_in_analysis_interval(variable, year, n_month, day=None, lag=None):
+    """Get the first and the last date of the values inside range analysis interval in
+    specific year, month, day or lag (see get_values_in_range_analysis_interval), all
+    values between this dates (both inclusive) are the values of this analysis interval.
+
+    :return: (first date, last date) or None if the variable has not a valid frequency data
+    :rtype: tuple
     """
 
     range_analysis_interval = get_range_analysis_interval()
@@ -220,32 +223,20 @@ def get_values_in_range_analysis_interval(variable, year, n_month, day=None, lag
             day = locate_day_in_analysis_interval(day)
 
     if variable.type == 'D':
-        var_D_values = []
         if env.var_D.is_n_daily():
             if env.var_D.is_daily():
-                # clone range for add the last day (32) for calculate interval_day_var_D
+                # clone range for add the last day (32) for calculate the last day of interval
                 rai_plus = list(range_analysis_interval)
                 rai_plus.append(32)
-                # from day to next iterator based on analysis interval
-                # e.g. [0,1,2,3,4] for first iteration for 5 days
-                interval_day_var_D = list(range(day - 1, rai_plus[rai_plus.index(day) + 1] - 1))
-
-                for iter_day in interval_day_var_D:
-                    now = date(year, n_month, 1) + relativedelta(days=iter_day)
-                    # check if continues with the same month
-                    if now.month == n_month:
-                        index_var_D = variable.date.index(now)
-                        var_D_values.append(variable.data[index_var_D])
+                # from day to next iterator based on analysis interval, but inside the same month
+                last_day = min(rai_plus[rai_plus.index(day) + 1] - 1, monthrange(year, n_month)[1])
+                return date(year, n_month, day), date(year, n_month, 1) + relativedelta(days=last_day - 1)
             else:
-                index_var_D = variable.date.index(date(year, n_month, day))
-                var_D_values.append(variable.data[index_var_D])
+                return date(year, n_month, day), date(year, n_month, day)
         if env.var_D.is_n_monthly():
-            var_D_values.append(variable.data[variable.date.index(date(year, n_month, 1))])
-
-        return var_D_values
+            return date(year, n_month, 1), date(year, n_month, 1)
 
     if variable.type == 'I':
-        var_I_values = []
         if env.var_I.is_n_daily():
             # from day to next iterator based on analysis interval
             start_interval = range_analysis_interval[range_analysis_interval.index(day) - lag]
@@ -259,16 +250,13 @@ def get_values_in_range_analysis_interval(variable, year, n_month, day=None, lag
             if range_analysis_interval.index(day) - lag < 0:
                 start_date += relativedelta(months=-1)
 
-            iter_date = start_date
-
             if env.var_I.is_daily():
-                while iter_date.day != end_interval:
-                    index_var_I = variable.date.index(iter_date)
-                    var_I_values.append(variable.data[index_var_I])
-                    iter_date += relativedelta(days=1)
+                # the day before the next date with day as the end interval
+                end_date = date(start_date.year, start_date.month, 1) + \
+                           relativedelta(months=1 if end_interval < start_date.day else 0, days=end_interval - 1)
+                return start_date, end_date + relativedelta(days=-1)
             else:
-                index_var_I = variable.date.index(start_date)
-                var_I_values.append(variable.data[index_var_I])
+                return start_date, start_date
         if env.var_I.is_n_monthly():
             if env.config_run.settings['analysis_interval'] in ["5days", "10days", "15days"]:
                 real_date = date(year, n_month, day) + relativedelta(
@@ -277,10 +265,120 @@ def get_values_in_range_analysis_interval(variable, year, n_month, day=None, lag
                 if n_month - real_date.month > 1:
                     real_date = date(real_date.year, real_date.month + 1, 1)
 
-                var_I_values.append(variable.data[variable.date.index(
-                    date(real_date.year, real_date.month, 1))])
+                return date(real_date.year, real_date.month, 1), date(real_date.year, real_date.month, 1)
             else:
-                var_I_values.append(variable.data[variable.date.index(
-                    date(year, n_month, 1) + relativedelta(months=-lag))])
+                return date(year, n_month, 1) + relativedelta(months=-lag), \
+                       date(year, n_month, 1) + relativedelta(months=-lag)
+
+    return None
+
+
+class SlicesOfAnalysisInterval(object):
+    """Table of the first and last dates of the analysis intervals for each
+    year, calculated once per variable type, frequency of data and analysis
+    interval for a specific month, day and lag. The dates are converted to
+    the positions of the values in the series of each station without walk
+    the dates again.
+    """
+
+    # {(type, frequency data, analysis interval, n_month, day, lag): (first year, first dates, last dates)}
+    tables = {}
+
+    @staticmethod
+    def get_key(variable, n_month, day=None, lag=None):
+        range_analysis_interval = get_range_analysis_interval()
+        # first fix if day not is a valid start day in analysis interval
+        if day and range_analysis_interval and day not in range_analysis_interval:
+            day = locate_day_in_analysis_interval(day)
+        if variable.type == 'D':
+            # the lag is not used for the dependent variable
+            lag = None
+
+        return (variable.type, env.var_[variable.type].FREQUENCY_DATA, env.config_run.settings['analysis_interval'],
+                n_month, day, lag)
+
+    @staticmethod
+    def build(variable, years, n_month, day=None, lag=None):
+        """Calculate the first and last dates of the analysis interval for all
+        years from the minimum to the maximum of years.
+        """
+        first_year = min(years)
+        first_dates = []
+        last_dates = []
+        for year in range(first_year, max(years) + 1):
+            range_of_dates = get_range_of_dates_in_analysis_interval(variable, year, n_month, day, lag)
+            if range_of_dates is None:
+                return None
+            first_dates.append(range_of_dates[0])
+            last_dates.append(range_of_dates[1])
+
+        return first_year, numpy.array(first_dates, dtype='datetime64[D]'), \
+               numpy.array(last_dates, dtype='datetime64[D]')
+
+    @staticmethod
+    def get_dates(variable, years, n_month, day=None, lag=None):
+        """Return the first and last dates (numpy datetime64 arrays) of the
+        analysis interval for each year, or None if the variable has not a
+        valid frequency data
+        """
+        years = numpy.asarray(years, dtype=numpy.int64)
+        key = SlicesOfAnalysisInterval.get_key(variable, n_month, day, lag)
+        table = SlicesOfAnalysisInterval.tables.get(key)
+
+        if table is not None and (years.min() < table[0] or years.max() >= table[0] + len(table[1])):
+            # extend the table with the new years
+            years_in_table = [table[0], table[0] + len(table[1]) - 1]
+            table = None
+        else:
+            years_in_table = []
+
+        if table is None:
+            table = SlicesOfAnalysisInterval.build(variable, list(years) + years_in_table, n_month, day, lag)
+            if table is None:
+                return None
+            SlicesOfAnalysisInterval.tables[key] = table
+
+        first_year, first_dates, last_dates = table
+        return first_dates[years - first_year], last_dates[years - first_year]
+
+
+def get_range_of_index_in_years(variable, years, n_month, day=None, lag=None):
+    """Get the index of the first value and the index after the last value in the
+    series of the variable for the analysis interval of each year in specific month,
+    day or lag (see get_values_in_range_analysis_interval).
+
+    :return: (start indexes, end indexes) or None if the variable has not a valid frequency data
+    :rtype: tuple of numpy arrays
+    """
+
+    dates = SlicesOfAnalysisInterval.get_dates(variable, years, n_month, day, lag)
+
+    if dates is None:
+        return None
+
+    first_dates, last_dates = dates
+    start_idxs = variable.series.offsets(first_dates)
+    # there are not values in the ranges with the last date before the first date
+    empty = last_dates < first_dates
+    end_idxs = start_idxs.copy()
+    if not empty.all():
+        end_idxs[~empty] = variable.series.offsets(last_dates[~empty]) + 1
+
+    return start_idxs, end_idxs
+
+
+def get_values_in_range_analysis_interval(variable, year, n_month, day=None, lag=None):
+    """Get all values inside range analysis interval in specific year, month, day or lag.
+    The "type" must be "D" or "I". For bimonthly and trimonthly the "n_month" is the start
+    of month of bimonthly or trimonthly respective, for 5, 10, or 15 days the "day" is a
+    start day in the range analysis interval. The "lag" is only affect for the independent
+    variable and it must be 0, 1 or 2.
+    """
+
+    range_of_index = get_range_of_index_in_years(variable, [year], n_month, day, lag)
+
+    if range_of_index is None:
+        return []
+
+    return list(variable.data[range_of_index[0][0]:range_of_index[1][0]])
 
-        return var_I_values
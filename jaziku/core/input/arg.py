@@ -44,3 +44,60 @@ arguments.add_argument('-f', '--force', action='store_true', default=False,
 # set path for save the results
 arguments.add_argument('-o', '--output', type=str, default=False,
                        help=_('set absolute path where to save all results'), required=False)
+
+# disable the cache of series read from files
+arguments.add_argument('--no-cache', action='store_true', default=False,
+                       help=_('disable the cache of series read from files'), required=False)
+
+# clear the cache of series read from files
+arguments.add_argument('--clear-cache', action='store_true', default=False,
+                       help=_('clear the cache of series read from files and of stages before run'), required=False)
+
+# cache of the stages of the run
+arguments.add_argument('--stage-cache', action='store_true', default=False,
+                       help=_('save the result of each stage (prepare the stations, data analysis,\n'
+                              'climate and forecast of each station and maps) in the cache and\n'
+                              'restore the stages unchanged in the next runs'), required=False)
+
+# resume the run killed from its journal
+arguments.add_argument('--resume', action='store_true', default=False,
+                       help=_('resume the run killed, skip the units completed in the journal of the\n'
+                              'output directory (stations, maps and stages of EDA) if its inputs have\n'
+                              'not changed and its files exist'), required=False)
+
+# number of processes to read and process the stations
+arguments.add_argument('-w', '--workers', type=int, default=1,
+                       help=_('number of processes to read, prepare and process (climate and forecast) '
+                              'the stations'), required=False)
+
+# calculate the climate of all stations at once
+arguments.add_argument('--batch-climate', action='store_true', default=False,
+                       help=_('calculate the thresholds and contingency tables of all stations at once '
+                              '(needs more memory)'), required=False)
+
+# file of scenarios for forecast
+arguments.add_argument('--forecast-scenarios', type=str, default=False,
+                       help=_('path to file with several scenarios (forecast date and probabilities of var I)\n'
+                              'to make the forecast for all of them in the same run'), required=False)
+
+# save the climate (contingency tables) of the stations for make the forecast only
+arguments.add_argument('--store-climate', action='store_true', default=False,
+                       help=_('save the contingency tables and time series of the stations\n'
+                              'for make the forecast again with --forecast-only'), required=False)
+
+# make the forecast only with the climate saved
+arguments.add_argument('--forecast-only', action='store_true', default=False,
+                       help=_('make only the forecast (and its maps) with the climate saved\n'
+                              'before with --store-climate, without read the series'), required=False)
+
+# update the climate only where the series changed since the previous run
+arguments.add_argument('--incremental', action='store_true', default=False,
+                       help=_('update the climate of the stations calculating again only the\n'
+                              'slices (lag, month, day) whose time series changed since the\n'
+                              'previous run in the same output directory (e.g. new months of\n'
+                              'var I), the climate is saved as with --store-climate'), required=False)
+
+# verify the incremental update with the complete calculation
+arguments.add_argument('--verify-incremental', action='store_true', default=False,
+                       help=_('compare the climate updated with --incremental against the\n'
+                              'complete calculation of all slices'), required=False)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import hashlib
+import numpy
+
+from jaziku import env
+from jaziku.core.input import validation
+
+
+# ==============================================================================
+# CACHE OF PARSED SERIES
+# Save the series read and validated from the files of var D and var I in
+# binary files (.npz) inside the cache directory, the next runs load the
+# series from the cache if the file of the series and the settings for
+# validate it have not changed. The series not used in MAX_AGE days are
+# deleted from the cache and, if the cache is bigger than MAX_SIZE, the
+# series least recently used too (see evict).
+
+# days that a series not used is kept in the cache
+MAX_AGE = 60
+# maximum size of the cache of series (bytes)
+MAX_SIZE = 256 * 1024 ** 2
+
+
+def is_enabled():
+    return env.globals_vars.CACHE_DIR is not None and not env.globals_vars.arg_no_cache
+
+
+def get_cache_file(variable):
+    """Return the path of the file in the cache for the series of the
+    variable, the name is the fingerprint of the file of the series: path,
+    size, modification time and hash of its content, plus the type of
+    series (that defined the internal limits).
+    """
+    stat = os.stat(variable.file_path)
+
+    fingerprint = hashlib.sha1()
+    with open(variable.file_path, 'rb') as open_file:
+        fingerprint.update(open_file.read())
+    fingerprint.update(repr((variable.file_path, stat.st_size, stat.st_mtime_ns,
+                             variable.type, variable.type_series)).encode('utf-8'))
+
+    return os.path.join(env.globals_vars.CACHE_DIR, fingerprint.hexdigest() + '.npz')
+
+
+def get_limits(variable):
+    """Return the limits (below, above) of the variable for save in cache,
+    the limits not defined are nan.
+    """
+    if not env.config_run.settings['limits_var_' + variable.type]['ready']:
+        validation.set_limits(variable)
+    limit_below = env.config_run.settings['limits_var_' + variable.type]['below']
+    limit_above = env.config_run.settings['limits_var_' + variable.type]['above']
+
+    return numpy.array([numpy.nan if limit_below is None else limit_below,
+                        numpy.nan if limit_above is None else limit_above], dtype=numpy.float64)
+
+
+def load(variable, cache_file):
+    """Load the data and date of the variable from the cache, return False
+    if the series is not in the cache or the frequency data or the limits
+    are different from the series saved, then the file needs to be read.
+
+    Return by reference:
+
+    :ivar VARIABLE.data: data from cache
+    :ivar VARIABLE.date: date from cache
+    """
+    if not os.path.isfile(cache_file):
+        return False
+
+    try:
+        with numpy.load(cache_file) as cached:
+            frequency_data = str(cached['frequency_data'])
+            limits = cached['limits']
+            data = cached['data']
+            dates = cached['date']
+    except Exception:
+        # corrupt file in cache
+        return False
+
+    # the frequency data must be the same for all stations, if not,
+    # read the file for report the error
+    try:
+        env.var_[variable.type].set_FREQUENCY_DATA(frequency_data)
+    except ValueError:
+        return False
+
+    # the series was validated with others limits
+    if not numpy.array_equal(limits, get_limits(variable), equal_nan=True):
+        return False
+
+    variable.data = data
+    variable.date = dates.tolist()
+
+    # the modification time of the file in cache is the last time used (see evict)
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+
+    return True
+
+
+def save(variable, cache_file):
+    """Save the data and date of the variable (read and validated) in the cache
+    """
+    if not os.path.isdir(env.globals_vars.CACHE_DIR):
+        os.makedirs(env.globals_vars.CACHE_DIR, exist_ok=True)
+
+    # write in temporal file and rename it, the cache file is complete or not exists
+    tmp_file = cache_file + '.{0}.tmp.npz'.format(os.getpid())
+    try:
+        numpy.savez(tmp_file,
+                    frequency_data=numpy.array(env.var_[variable.type].FREQUENCY_DATA),
+                    limits=get_limits(variable),
+                    data=numpy.asarray(variable.data, dtype=numpy.float64),
+                    date=numpy.array(variable.date, dtype='datetime64[D]'))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # the cache is optional, continue without it
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+
+def clear():
+    """Delete all series saved in the cache
+    """
+    if env.globals_vars.CACHE_DIR is None or not os.path.isdir(env.globals_vars.CACHE_DIR):
+        return
+
+    for file_name in os.listdir(env.globals_vars.CACHE_DIR):
+        if file_name.endswith('.npz'):
+            os.remove(os.path.join(env.globals_vars.CACHE_DIR, file_name))
+
+
+def evict():
+    """Delete the series of the cache not used in MAX_AGE days, and the
+    series least recently used while the size of the cache is greater
+    than MAX_SIZE.
+    """
+    if env.globals_vars.CACHE_DIR is None or not os.path.isdir(env.globals_vars.CACHE_DIR):
+        return
+
+    cache_files = []
+    for file_name in os.listdir(env.globals_vars.CACHE_DIR):
+        # the temporal files are being written by other run (see save)
+        if file_name.endswith('.npz') and not file_name.endswith('.tmp.npz'):
+            file_path = os.path.join(env.globals_vars.CACHE_DIR, file_name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            cache_files.append((stat.st_mtime, stat.st_size, file_path))
+
+    # the most recently used first
+    cache_files.sort(reverse=True)
+    oldest_time = time.time() - MAX_AGE * 24 * 3600
+    size = 0
+    for last_used, file_size, file_path in cache_files:
+        size += file_size
+        if last_used < oldest_time or size > MAX_SIZE:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
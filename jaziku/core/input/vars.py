@@ -21,6 +21,7 @@
 import os
 import csv
 import re
+import numpy
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
@@ -54,9 +55,6 @@ def read_variable(variable):
     :ivar STATION.var_X.data: data read from raw file
     :ivar STATION.var_X.date: date read from raw file
     """
-    var_date = []
-    var_data = []
-
     # check first if file exist
     if not os.path.isfile(variable.file_path):
         console.msg_error(
@@ -86,52 +84,168 @@ def read_variable(variable):
         delimiter = ';'
     open_file.seek(0)
 
-    time_series_file = csv.reader(open_file, delimiter=delimiter)
-
-    # time_series_file = csv.reader(fo, delimiter = '\t')
-    # time_series_file.write(data.replace('\x00', ''))
-
-    first = True
-    # Read line to line time_series_file, validation and save variable
-    for row in time_series_file:
-
+    # read all file and tokenize it in one pass
+    rows = []  # rows with date and value
+    line_nums = []  # number of line in the file of each row
+    for line_num, row in enumerate(csv.reader(open_file.read().split('\n'), delimiter=delimiter), start=1):
         # if row is null o empty, e.g. empty but with tabs or spaces
         if not row or not row[0].strip():
             continue
-
         # delete empty elements in row
-        row = [e for e in row if e]
+        rows.append([e for e in row if e])
+        line_nums.append(line_num)
+
+    open_file.close()
+
+    if not rows:
+        console.msg_error(
+            _("Reading the station: {0} - {1}\n"
+              "The file '{2}' is empty").format(variable.station.code, variable.station.name, variable.file_path))
 
-        # get values
+    # check if variable is daily or month
+    if len(rows[0]) < 2:
+        msg_error_wrong_line(variable, line_nums[0])
+    date_value = rows[0][0].replace('/', '-').split("-")
+    try:
+        if len(date_value) == 3:
+            env.var_[variable.type].set_FREQUENCY_DATA("daily")
+        else:
+            month = re.sub(r'[^\w]', '', date_value[1])
+            if month.isdigit():
+                env.var_[variable.type].set_FREQUENCY_DATA("monthly")
+            elif len(month) == 2:
+                env.var_[variable.type].set_FREQUENCY_DATA("bimonthly")
+            elif len(month) == 3:
+                env.var_[variable.type].set_FREQUENCY_DATA("trimonthly")
+            else:
+                raise ValueError(_('date unknown: ') + '-'.join(date_value))
+    except ValueError as error:
+        console.msg_error(_("Problems settings the frequency data for the station\n"
+                            "with code '{0}' and name '{1}':\n\n").format(variable.station.code,
+                                                                          variable.station.name) + str(error))
+
+    # convert all dates and values to arrays
+    try:
+        dates, values = parse_rows(rows, variable)
+    except Exception as error:
+        # there is a wrong line, the file is checked line to line
+        # for report the line and the error
+        check_row_by_row(rows, line_nums, variable)
+        # no line with error was found, report the error of the file
+        console.msg_error(
+            _("Reading the station: {0} - {1}\n"
+              "Problems reading the file '{2}' for var {3}:\n\n").format(variable.station.code, variable.station.name,
+                                                                         variable.file_path, variable.type) + str(error))
+
+    # check if the values are continuous
+    if env.var_[variable.type].is_daily():
+        steps = numpy.diff(dates.astype(numpy.int64))
+    else:
+        steps = numpy.diff(dates.astype('datetime64[M]').astype(numpy.int64))
+    discontinuities = numpy.flatnonzero(steps != 1)
+    idx_discontinuity = discontinuities[0] + 1 if len(discontinuities) else len(rows)
+
+    # valid nulls
+    with numpy.errstate(invalid='ignore'):
+        values[numpy.isin(numpy.trunc(values), env.globals_vars.OLD_VALID_NULL)] = numpy.nan  # TODO: deprecated valid null
+
+    # check variable if is within limits
+    if not env.config_run.settings['limits_var_' + variable.type]['ready']:
+        validation.set_limits(variable)
+    limit_below = env.config_run.settings['limits_var_' + variable.type]['below']
+    limit_above = env.config_run.settings['limits_var_' + variable.type]['above']
+    out_of_limits = numpy.zeros(len(values), dtype=bool)
+    with numpy.errstate(invalid='ignore'):
+        if limit_below is not None:
+            out_of_limits |= values < limit_below
+        if limit_above is not None:
+            out_of_limits |= values > limit_above
+    out_of_limits = numpy.flatnonzero(out_of_limits)
+    idx_out_of_limits = out_of_limits[0] if len(out_of_limits) else len(rows)
+
+    # report the first error in the file
+    if idx_discontinuity < len(rows) and idx_discontinuity <= idx_out_of_limits:
+        msg_error_missing_date(variable, line_nums[idx_discontinuity],
+                               next_date(dates[idx_discontinuity - 1].tolist(), variable))
+    if idx_out_of_limits < len(rows):
         try:
-            date_value = row[0].replace('/', '-').split("-")
-            value = row[1].replace(',', '.')
-        except Exception:
-            console.msg_error(_(
-                "Reading from file '{0}' in line: {1}\n\n"
-                "this could be caused by wrong line or strange character,\n"
-                "fix it manually or run 'normalize_format {0}'")
-                              .format(variable.file_name, time_series_file.line_num))
-
-        # check if variable is daily or month
-        if first:
-            try:
-                if len(date_value) == 3:
-                    env.var_[variable.type].set_FREQUENCY_DATA("daily")
-                else:
-                    month = re.sub(r'[^\w]', '', date_value[1])
-                    if month.isdigit():
-                        env.var_[variable.type].set_FREQUENCY_DATA("monthly")
-                    elif len(month) == 2:
-                        env.var_[variable.type].set_FREQUENCY_DATA("bimonthly")
-                    elif len(month) == 3:
-                        env.var_[variable.type].set_FREQUENCY_DATA("trimonthly")
-                    else:
-                        raise ValueError(_('date unknown: ') + '-'.join(date_value))
-            except ValueError as error:
-                console.msg_error(_("Problems settings the frequency data for the station\n"
-                                    "with code '{0}' and name '{1}':\n\n").format(variable.station.code,
-                                                                                  variable.station.name) + str(error))
+            validation.is_the_value_within_limits(float(values[idx_out_of_limits]), variable)
+        except Exception as error:
+            console.msg_error(_("Reading from file '{0}' in line: {1}\n\n{2}")
+                              .format(variable.file_name, line_nums[idx_out_of_limits], error))
+
+    variable.data = values
+    variable.date = dates.tolist()
+
+
+def parse_rows(rows, variable):
+    """Convert the dates and values of all rows read from the file of the
+    variable to arrays, raise any exception if there is some wrong or
+    strange element in the rows.
+
+    :param rows: rows of the file, each row is [date, value, ...]
+    :type rows: list
+    :param variable: variable that belongs the rows
+    :type variable: Variable
+
+    :return: dates (numpy datetime64[D] array), values (numpy float64 array)
+    """
+    # delete strange characters in dates of all rows in one pass
+    date_values = [date_value.split("-") for date_value in
+                   re.sub(r'[^\w\n-]', '', '\n'.join([row[0] for row in rows]).replace('/', '-')).split('\n')]
+    values = numpy.fromiter((float(row[1].replace(',', '.')) for row in rows), dtype=numpy.float64, count=len(rows))
+
+    years = numpy.fromiter((int(date_value[0]) for date_value in date_values), dtype=numpy.int64, count=len(rows))
+
+    if env.var_[variable.type].is_daily() or env.var_[variable.type].is_monthly():
+        months = numpy.fromiter((int(date_value[1]) for date_value in date_values), dtype=numpy.int64,
+                                count=len(rows))
+    else:
+        # convert the characters of the months (e.g. jfm) to int
+        n_monthly = 2 if env.var_[variable.type].is_bimonthly() else 3
+        char2int = {}
+        for date_value in date_values:
+            if date_value[1] not in char2int:
+                char2int[date_value[1]] = input.n_monthly_char2int(date_value[1], n_monthly) or 0
+        months = numpy.fromiter((char2int[date_value[1]] for date_value in date_values), dtype=numpy.int64,
+                                count=len(rows))
+
+    if env.var_[variable.type].is_daily():
+        days = numpy.fromiter((int(date_value[2]) for date_value in date_values), dtype=numpy.int64,
+                              count=len(rows))
+    else:
+        days = numpy.ones(len(rows), dtype=numpy.int64)
+
+    # check that all dates are valid dates
+    if (years < 1).any() or (years > 9999).any() or (months < 1).any() or (months > 12).any() or (days < 1).any():
+        raise ValueError
+    months = ((years - 1970) * 12 + months - 1).astype('datetime64[M]')
+    dates = months.astype('datetime64[D]') + (days - 1)
+    if (dates.astype('datetime64[M]') != months).any():
+        raise ValueError
+
+    return dates, values
+
+
+def check_row_by_row(rows, line_nums, variable):
+    """Check line to line the rows read from the file of the variable, this
+    report (and exit) the first error found in the file with the line of
+    the error.
+
+    :param rows: rows of the file, each row is [date, value, ...]
+    :type rows: list
+    :param line_nums: number of line in the file of each row
+    :type line_nums: list
+    :param variable: variable that belongs the rows
+    :type variable: Variable
+    """
+    previous_date = None
+    for row, line_num in zip(rows, line_nums):
+        if len(row) < 2:
+            msg_error_wrong_line(variable, line_num)
+
+        date_value = row[0].replace('/', '-').split("-")
+        value = row[1].replace(',', '.')
 
         try:
             # delete strange characters and convert format
@@ -141,77 +255,68 @@ def read_variable(variable):
             if env.var_[variable.type].is_daily():
                 month = int(month)
                 day = int(re.sub(r'[^\w]', '', date_value[2]))
-                # check if the values are continuous
-                if not first and date(year, month, day) + relativedelta(days=-1) != var_date[-1]:
-                    missing_date = var_date[-1] + relativedelta(days=+1)
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}' in line: {2}\n\n"
-                        "Jaziku detected missing value for date: {3}\n\n"
-                        "fix it manually or run 'normalize_format {1}'")
-                                      .format(variable.type, variable.file_name, time_series_file.line_num,
-                                              missing_date))
-
             if env.var_[variable.type].is_monthly():
                 month = int(month)
                 day = 1
-                # check if the values are continuous
-                if not first and date(year, month, day) + relativedelta(months=-1) != var_date[-1]:
-                    missing_date = var_date[-1] + relativedelta(months=+1)
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}' in line: {2}\n\n"
-                        "Jaziku detected missing value for date: {3}-{4}\n\n"
-                        "fix it manually or run 'normalize_format {1}'")
-                                      .format(variable.type, variable.file_name, time_series_file.line_num,
-                                              missing_date.year, missing_date.month))
-
             if env.var_[variable.type].is_bimonthly():
                 month = input.bimonthly_char2int(month)
                 day = 1
-                # check if the values are continuous
-                if not first and date(year, month, day) + relativedelta(months=-1) != var_date[-1]:
-                    missing_date = var_date[-1] + relativedelta(months=+1)
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}' in line: {2}\n\n"
-                        "Jaziku detected missing value for date: {3}-{4}\n\n"
-                        "fix it manually or run 'normalize_format {1}'")
-                                      .format(variable.type, variable.file_name, time_series_file.line_num,
-                                              missing_date.year,
-                                              output.bimonthly_int2char(missing_date.month)))
-
             if env.var_[variable.type].is_trimonthly():
                 month = input.trimonthly_char2int(month)
                 day = 1
-                # check if the values are continuous
-                if not first and date(year, month, day) + relativedelta(months=-1) != var_date[-1]:
-                    missing_date = var_date[-1] + relativedelta(months=+1)
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}' in line: {2}\n\n"
-                        "Jaziku detected missing value for date: {3}-{4}\n\n"
-                        "fix it manually or run 'normalize_format {1}'")
-                                      .format(variable.type, variable.file_name, time_series_file.line_num,
-                                              missing_date.year,
-                                              output.trimonthly_int2char(missing_date.month)))
+
+            # check if the values are continuous
+            if previous_date is not None and date(year, month, day) != next_date(previous_date, variable):
+                msg_error_missing_date(variable, line_num, next_date(previous_date, variable))
 
             value = float(value)
             if env.globals_vars.is_valid_null(value):  # TODO: deprecated valid null
                 value = float('nan')
-            # set date of dependent variable from file, column 1,
-            # format: yyyy-mm-dd
-            var_date.append(date(year, month, day))
+            previous_date = date(year, month, day)
             # check variable if is within limits
-            if validation.is_the_value_within_limits(value, variable):
-                # save value
-                var_data.append(value)
+            validation.is_the_value_within_limits(value, variable)
 
         except Exception as error:
             console.msg_error(_("Reading from file '{0}' in line: {1}\n\n{2}")
-                              .format(variable.file_name, time_series_file.line_num, error))
+                              .format(variable.file_name, line_num, error))
 
-        if first:
-            first = False
 
-    open_file.close()
-    del time_series_file
-
-    variable.data = var_data
-    variable.date = var_date
+def next_date(_date, variable):
+    """Return the next date after _date based on the frequency data of the variable
+    """
+    if env.var_[variable.type].is_daily():
+        return _date + relativedelta(days=+1)
+    else:
+        return _date + relativedelta(months=+1)
+
+
+def msg_error_wrong_line(variable, line_num):
+    console.msg_error(_(
+        "Reading from file '{0}' in line: {1}\n\n"
+        "this could be caused by wrong line or strange character,\n"
+        "fix it manually or run 'normalize_format {0}'")
+                      .format(variable.file_name, line_num))
+
+
+def msg_error_missing_date(variable, line_num, missing_date):
+    if env.var_[variable.type].is_daily():
+        console.msg_error(_(
+            "Reading var {0} from file '{1}' in line: {2}\n\n"
+            "Jaziku detected missing value for date: {3}\n\n"
+            "fix it manually or run 'normalize_format {1}'")
+                          .format(variable.type, variable.file_name, line_num,
+                                  missing_date))
+
+    if env.var_[variable.type].is_monthly():
+        month = missing_date.month
+    if env.var_[variable.type].is_bimonthly():
+        month = output.bimonthly_int2char(missing_date.month)
+    if env.var_[variable.type].is_trimonthly():
+        month = output.trimonthly_int2char(missing_date.month)
+
+    console.msg_error(_(
+        "Reading var {0} from file '{1}' in line: {2}\n\n"
+        "Jaziku detected missing value for date: {3}-{4}\n\n"
+        "fix it manually or run 'normalize_format {1}'")
+                      .format(variable.type, variable.file_name, line_num,
+                              missing_date.year, month))
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+from jaziku import env
+from jaziku.core import stage_cache
+from jaziku.modules.maps import data as maps_data
+from jaziku.utils import console
+
+
+# ==============================================================================
+# JOURNAL OF THE RUN
+# Record in the output directory the units of work completed in the run (the
+# climate and forecast of each station, each map and each stage of the EDA)
+# with the key (hash) of its inputs, the files written and the result to show
+# it again (console output, state in env changed and rows for the maps data
+# files). Then if the run is killed, the next run with --resume skips the
+# units completed if its inputs have not changed and its files still exist.
+#
+# The result of each unit is saved (complete) in its own file before append
+# the unit in the journal file, a unit in the journal is always complete.
+
+JOURNAL_DIR = '.jaziku_journal'
+JOURNAL_FILE = 'journal.txt'
+
+KINDS = ['eda', 'station', 'map']
+
+# working values of the calculations left in the stations (e.g. by the EDA),
+# these are calculated again before use them then are not inputs of the units
+WORKING_VALUES = ['first_iter', 'specific_values', 'specific_values_cleaned']
+
+# directory of the journal of this run, None before start it
+journal_dir = None
+
+# units completed in the run resumed: {unit: key}
+completed_units = {}
+
+# units skipped and processed by kind in this run: {kind: [skipped, processed]}
+report = {}
+
+
+def start():
+    """Start the journal of the run in the output directory, if the run is
+    resumed (--resume) read the units completed in the journal, else the
+    journal of the previous run is deleted.
+    """
+    global journal_dir, completed_units
+
+    journal_dir = os.path.join(env.globals_vars.OUTPUT_DIR, JOURNAL_DIR)
+    completed_units = {}
+
+    if env.globals_vars.arg_resume:
+        completed_units = read_journal()
+        if not completed_units:
+            console.msg(_("\n > WARNING: there is not units completed in the journal\n"
+                          "   of the output directory, the run is not resumed."), color='yellow')
+        else:
+            console.msg(_("\nResuming the run, units completed in the journal: {0}")
+                        .format(len(completed_units)), color='cyan')
+    else:
+        shutil.rmtree(journal_dir, ignore_errors=True)
+
+    try:
+        os.makedirs(os.path.join(journal_dir, 'units'), exist_ok=True)
+    except OSError:
+        console.msg_error(_("The journal of the run can't be created in:\n{0}").format(journal_dir), False)
+
+
+def read_journal():
+    """Read the units completed in the journal file, each line is the key
+    and the unit separated by tab, the last line could be incomplete if
+    the run was killed writing it.
+
+    :return: {unit: key}
+    :rtype: dict
+    """
+    journal_file = os.path.join(journal_dir, JOURNAL_FILE)
+    if not os.path.isfile(journal_file):
+        return {}
+
+    units = {}
+    with open(journal_file, 'r', encoding='utf-8', errors='replace') as open_file:
+        for line in open_file:
+            if not line.endswith('\n') or '\t' not in line:
+                continue
+            key, unit = line.rstrip('\n').split('\t', 1)
+            units[unit] = key
+    return units
+
+
+def get_unit_file(unit):
+    return os.path.join(journal_dir, 'units', hashlib.sha1(unit.encode('utf-8')).hexdigest() + '.pickle')
+
+
+def get_inputs(objects):
+    """Return the fingerprint of the objects to use it as inputs of several
+    units, for calculate it once (e.g. the stations for the EDA).
+    """
+    if journal_dir is None:
+        return None
+    return stage_cache.get_fingerprint(list(objects), WORKING_VALUES)
+
+
+def is_completed(unit, key):
+    """Return the result saved of the unit if it was completed in the run
+    resumed with the same key and all its files exist with the same size,
+    else None.
+    """
+    if completed_units.get(unit) != key:
+        return None
+
+    try:
+        with open(get_unit_file(unit), 'rb') as open_file:
+            saved = pickle.load(open_file)
+    except Exception:
+        return None
+
+    if saved['key'] != key:
+        return None
+    for path, size in saved['files'].items():
+        path = os.path.join(env.globals_vars.OUTPUT_DIR, path)
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            return None
+    return saved
+
+
+def record(unit, key, saved):
+    """Record the unit completed in the journal, first save its result in
+    its own file (complete or not exists) and then append the unit in the
+    journal file.
+    """
+    unit_file = get_unit_file(unit)
+    tmp_file = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(unit_file), delete=False) as open_file:
+            tmp_file = open_file.name
+            pickle.dump(saved, open_file, protocol=4)
+            open_file.flush()
+            os.fsync(open_file.fileno())
+        os.replace(tmp_file, unit_file)
+
+        # append the line in only one write, the processes of the pool write in the same journal
+        journal_file = os.open(os.path.join(journal_dir, JOURNAL_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(journal_file, '{0}\t{1}\n'.format(key, unit).encode('utf-8'))
+            os.fsync(journal_file)
+        finally:
+            os.close(journal_file)
+    except Exception:
+        # the journal is optional, continue without record the unit
+        if tmp_file is not None and os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+
+def run(kind, unit, function, args, objects=(), directories=(), files=(), inputs=None):
+    """Run the function of the unit with the args and record it in the
+    journal, or skip it if the unit was completed in the run resumed with
+    the same inputs, showing the console output and restoring the state
+    in env and the rows for the maps data files saved of the unit. The
+    state of the objects is not saved (the units are the last use of it).
+
+    :param kind: kind of unit (see KINDS)
+    :type kind: str
+    :param unit: name of the unit, unique in the run
+    :type unit: str
+    :param function: function to run the unit
+    :type function: function
+    :param args: arguments for the function
+    :type args: tuple
+    :param objects: objects that the unit processes (e.g. the station)
+    :type objects: list
+    :param directories: directories where the unit writes its files
+    :type directories: list
+    :param files: others files written by the unit (outside of directories)
+    :type files: list
+    :param inputs: others inputs of the unit, e.g. the fingerprint of the stations
+
+    :return: the value returned by the function (or saved of the unit)
+    """
+    if journal_dir is None:
+        return function(*args)
+
+    try:
+        key = stage_cache.get_key(kind, [], [], (stage_cache.get_fingerprint(list(objects), WORKING_VALUES), inputs))
+    except Exception:
+        # the unit can't be recorded in the journal
+        key = None
+
+    counter = report.setdefault(kind, [0, 0])
+
+    if key is not None:
+        saved = is_completed(unit, key)
+        if saved is not None:
+            counter[0] += 1
+            stage_cache.replay(saved)
+            return saved['result']
+    counter[1] += 1
+
+    result, captured = stage_cache.capture(function, args, directories)
+
+    if key is not None:
+        # record the unit before write the rows of the unit in the maps data
+        files_of_unit = {}
+        for path in captured['files'] + [os.path.relpath(path, env.globals_vars.OUTPUT_DIR) for path in files]:
+            if os.path.isfile(os.path.join(env.globals_vars.OUTPUT_DIR, path)):
+                files_of_unit[path] = os.path.getsize(os.path.join(env.globals_vars.OUTPUT_DIR, path))
+        captured.update({'key': key, 'files': files_of_unit, 'result': result})
+        record(unit, key, captured)
+
+    maps_data.write_rows_for_maps(captured['rows_for_maps'])
+
+    return result
+
+
+def add_report(report_of_process):
+    """Add the units skipped and processed in other process (see
+    jaziku.process_all_stations)
+    """
+    for kind, (skipped, processed) in report_of_process.items():
+        counter = report.setdefault(kind, [0, 0])
+        counter[0] += skipped
+        counter[1] += processed
+
+
+def print_report():
+    """Show the units skipped and processed by kind in the run resumed
+    """
+    console.msg(_("\nRun resumed (units skipped/processed):"))
+    for kind in KINDS:
+        if kind in report:
+            console.msg("   {0} {1} {2}/{3}".format(kind, '-' * (25 - len(kind)), report[kind][0], report[kind][1]))
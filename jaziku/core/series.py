@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+from bisect import bisect_left, bisect_right
+
+
+# ==============================================================================
+# SERIES CLASS
+# array-backed storage of data and date for a variable
+
+
+class Series(object):
+    """Array-backed time series of a variable, keep the data as float64
+    array, the dates as datetime64 array (and the list of dates for
+    the old code) and calculate the position of any date with arithmetic
+    of dates (O(1)) instead of search it inside the list of dates.
+
+    The type of step (daily, N days or N-monthly) is detected from the
+    first dates of the series, all dates in Jaziku are continuous after
+    read and validated the series.
+
+    :attributes:
+        SERIES.data: values of the series (numpy float64 array)
+        SERIES.date: dates of the series (list of datetime.date)
+        SERIES.date64: dates of the series (numpy datetime64[D] array)
+        SERIES.step: 'daily', 'n_days' or 'n_monthly'
+    """
+
+    def __init__(self, data, date):
+        self.data = data
+        self.date = date
+        self.date64 = numpy.array(date, dtype='datetime64[D]')
+        self.step = None
+        self.n_days = None
+
+        if not date:
+            return
+
+        first = date[0]
+        self.first_ordinal = first.toordinal()
+        self.first_month = first.year * 12 + first.month - 1
+
+        if len(date) == 1 or (date[1] - first).days == 1:
+            self.step = 'daily'
+        elif first.day == 1 and date[1].day == 1:
+            self.step = 'n_monthly'
+        else:
+            self.step = 'n_days'
+            # the N days of the interval: 5, 10 or 15
+            if date[1].month == first.month:
+                self.n_days = date[1].day - first.day
+            else:
+                self.n_days = {26: 5, 21: 10, 16: 15}[first.day]
+            self.intervals_per_month = 30 // self.n_days
+            self.first_interval = (first.day - 1) // self.n_days
+
+    def __len__(self):
+        return len(self.data)
+
+    def _offset(self, _date):
+        """Arithmetic position of the date inside the series, this
+        is not checked if the date really exists.
+        """
+        if self.step == 'daily':
+            return _date.toordinal() - self.first_ordinal
+        if self.step == 'n_monthly':
+            return _date.year * 12 + _date.month - 1 - self.first_month
+        if self.step == 'n_days':
+            if (_date.day - 1) % self.n_days != 0:
+                return None
+            months = _date.year * 12 + _date.month - 1 - self.first_month
+            return months * self.intervals_per_month + (_date.day - 1) // self.n_days - self.first_interval
+        return None
+
+    def index(self, _date):
+        """Return the position of the date inside the series, as
+        list.index() raise ValueError if the date is not in the series.
+        """
+        offset = self._offset(_date)
+        if offset is not None and 0 <= offset < len(self.date) and self.date[offset] == _date:
+            return offset
+
+        # the series has not a regular step here, search the date
+        offset = bisect_left(self.date, _date)
+        if offset < len(self.date) and self.date[offset] == _date:
+            return offset
+
+        raise ValueError("{0} is not in the series".format(_date))
+
+    def offsets(self, dates):
+        """Return the positions of several dates (numpy datetime64[D] array)
+        inside the series, this is the vectorized version of index(), raise
+        ValueError if any date is not in the series.
+        """
+        dates = numpy.asarray(dates, dtype='datetime64[D]')
+        if not len(self.date) or not len(dates):
+            return numpy.array([self.index(_date) for _date in dates.tolist()], dtype=numpy.int64)
+
+        if self.step == 'daily':
+            offsets = (dates - self.date64[0]).astype(numpy.int64)
+        else:
+            # months since the first month of the series
+            months = dates.astype('datetime64[M]').astype(numpy.int64) + 1970 * 12 - self.first_month
+            if self.step == 'n_monthly':
+                offsets = months
+            else:
+                days = (dates - dates.astype('datetime64[M]')).astype(numpy.int64)
+                offsets = months * self.intervals_per_month + days // self.n_days - self.first_interval
+                offsets[days % self.n_days != 0] = -1
+
+        inside = (offsets >= 0) & (offsets < len(self.date))
+        if inside.all() and (self.date64[offsets] == dates).all():
+            return offsets
+
+        # the series has not a regular step here, search the dates
+        return numpy.array([self.index(_date) for _date in dates.tolist()], dtype=numpy.int64)
+
+    def get(self, _date):
+        """Return the value of the series in the date
+        """
+        return self.data[self.index(_date)]
+
+    def range_of_dates(self, start_date, end_date):
+        """Return the start and end (exclusive) position of all dates of the
+        series between start_date and end_date (both inclusive).
+        """
+        return bisect_left(self.date, start_date), bisect_right(self.date, end_date)
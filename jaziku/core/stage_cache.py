@@ -0,0 +1,448 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import io
+import os
+import sys
+import pickle
+import shutil
+import hashlib
+import types
+import tempfile
+import numpy
+from datetime import date
+from contextlib import redirect_stdout
+
+from jaziku import env
+from jaziku.modules.maps import data as maps_data
+from jaziku.utils import console
+
+
+# ==============================================================================
+# CACHE OF STAGES
+# Save the result of each stage of the run (prepare the stations, data
+# analysis, climate and forecast of each station and the maps of each grid)
+# in the cache directory (--stage-cache), under a hash of the settings and
+# the inputs that the stage depends on. The result of a stage is the files
+# written in its directories, the console output, the rows for the maps
+# data files and the state changed (in the stations, env and others objects),
+# then the next runs restore the stages unchanged instead of process them.
+
+STAGES = ['prepare', 'data_analysis', 'climate', 'forecast', 'maps']
+
+# state in env changed by the stages, saved and restored with the stages
+ENV_STATE = [(env.globals_vars, ['NUM_DAYS_OF_ANALYSIS_INTERVAL', 'PROCESS_PERIOD',
+                                 'CLIMATE_DIR', 'FORECAST_DIR', 'DATA_ANALYSIS_DIR',
+                                 'probability_forecast_values', 'forecast_contingency_table',
+                                 'forecast_scenarios', 'maps_files_climate', 'maps_files_correlation',
+                                 'maps_files_forecast', 'maps_data']),
+             (env.var_D, ['TYPE_SERIES', 'FREQUENCY_DATA', 'was_converted', 'UNITS']),
+             (env.var_I, ['TYPE_SERIES', 'FREQUENCY_DATA', 'was_converted', 'UNITS']),
+             (env.config_run, ['settings'])]
+
+# state in env accumulated by all stations (or the settings, see get_key), it is not an input of the stages
+ENV_STATE_NOT_INPUT = ['maps_files_climate', 'maps_files_correlation', 'maps_files_forecast', 'maps_data',
+                       'settings']
+
+# arguments that change the result of the stages
+ARGS_OF_STAGES = ['arg_store_climate', 'arg_incremental', 'arg_verify_incremental']
+
+# settings (in runfile) that the stage doesn't depend on
+FORECAST_SETTINGS = ['forecast_date', 'forecast_var_I_lag_0', 'forecast_var_I_lag_1', 'forecast_var_I_lag_2']
+SETTINGS_NOT_USED = {'prepare': FORECAST_SETTINGS + ['maps'],
+                     'data_analysis': FORECAST_SETTINGS + ['maps'],
+                     'eda': FORECAST_SETTINGS + ['maps'],
+                     'climate': FORECAST_SETTINGS}
+# state in env that the stage doesn't depend on (the climate depends on the
+# type and the values of var I for forecast, not on the date)
+ENV_STATE_NOT_USED = {'climate': ['forecast_scenarios']}
+
+# hits and misses of the cache by stage in this run: {stage: [hits, misses]}
+report = {}
+
+
+class Tee(object):
+    """Write the console output in several streams, the console and the
+    output saved for the stage.
+    """
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+    def isatty(self):
+        return self.streams[0].isatty()
+
+
+def update_fingerprint(fingerprint, obj, visited, ignored_attributes=()):
+    """Update the fingerprint (hash) with the content of the object, walking
+    its items and attributes (except the ignored attributes). The values
+    (strings, numbers, dates, ...) and the tuples are hashed by its content,
+    and the others objects already visited (shared or cyclic, e.g. the
+    station of the variable) by the order of visit.
+    """
+    if obj is None or isinstance(obj, (str, bytes, int, float, complex, date, numpy.generic, numpy.dtype)):
+        fingerprint.update(repr((type(obj).__name__, obj)).encode('utf-8'))
+        return
+    if isinstance(obj, tuple):
+        fingerprint.update(b'tuple')
+        for item in obj:
+            update_fingerprint(fingerprint, item, visited, ignored_attributes)
+        return
+    if id(obj) in visited:
+        fingerprint.update('<{0}>'.format(visited[id(obj)][0]).encode('utf-8'))
+        return
+    # keep the object with its order of visit, the temporal objects (e.g. the state
+    # returned by __getstate__) can't be freed and its id used by other object
+    visited[id(obj)] = (len(visited), obj)
+
+    fingerprint.update(type(obj).__name__.encode('utf-8'))
+    if isinstance(obj, numpy.ndarray):
+        fingerprint.update(repr((obj.dtype.str, obj.shape)).encode('utf-8'))
+        if obj.dtype == object:
+            for item in obj.flat:
+                update_fingerprint(fingerprint, item, visited, ignored_attributes)
+        elif obj.dtype == numpy.longdouble:
+            # the bytes of padding of the long double are not defined
+            fingerprint.update(obj.astype(numpy.float64).tobytes())
+        else:
+            fingerprint.update(numpy.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        for item, value in obj.items():
+            update_fingerprint(fingerprint, item, visited, ignored_attributes)
+            update_fingerprint(fingerprint, value, visited, ignored_attributes)
+    elif isinstance(obj, list):
+        for item in obj:
+            update_fingerprint(fingerprint, item, visited, ignored_attributes)
+    elif isinstance(obj, (set, frozenset)):
+        for item in sorted(obj, key=repr):
+            update_fingerprint(fingerprint, item, visited, ignored_attributes)
+    elif isinstance(obj, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)):
+        fingerprint.update(repr(obj).encode('utf-8'))
+    elif hasattr(obj, '__getstate__') or hasattr(obj, '__dict__'):
+        state = obj.__getstate__() if hasattr(obj, '__getstate__') else obj.__dict__
+        if ignored_attributes and isinstance(state, dict):
+            state = {name: value for name, value in state.items() if name not in ignored_attributes}
+        update_fingerprint(fingerprint, state, visited, ignored_attributes)
+    else:
+        fingerprint.update(repr(obj).encode('utf-8'))
+
+
+def is_enabled():
+    return env.globals_vars.arg_stage_cache and env.globals_vars.CACHE_DIR is not None and \
+        not env.globals_vars.arg_no_cache
+
+
+def get_stages_dir():
+    return os.path.join(env.globals_vars.CACHE_DIR, 'stages')
+
+
+def get_env_state():
+    """Return the state in env that the stages can change
+
+    :return: [(object, attribute name, value), ...]
+    :rtype: list
+    """
+    return [(module, name, getattr(module, name)) for module, names in ENV_STATE for name in names]
+
+
+def get_fingerprint(obj, ignored_attributes=()):
+    fingerprint = hashlib.sha1()
+    update_fingerprint(fingerprint, obj, {}, ignored_attributes)
+    return fingerprint.hexdigest()
+
+
+def get_state_to_compare(value):
+    """Return the fingerprint of the value for compare it before and after
+    the stage, for dictionaries the fingerprint of each item.
+    """
+    if isinstance(value, dict):
+        return {item: get_fingerprint(item_value) for item, item_value in value.items()}
+    return get_fingerprint(value)
+
+
+def get_env_state_changed(env_state_before):
+    """Return the state in env changed by the stage, for dictionaries only
+    the items changed (e.g. the headers of the maps data files but not the
+    rows of others stations).
+
+    :return: [(module name, attribute name, is dict, value or items changed), ...]
+    :rtype: list
+    """
+    env_state_changed = []
+    for (module, name, value), value_before in zip(get_env_state(), env_state_before):
+        value_after = get_state_to_compare(value)
+        if isinstance(value_after, dict) and isinstance(value_before, dict):
+            items_changed = {item: value[item] for item in value_after
+                             if value_after[item] != value_before.get(item)}
+            if items_changed:
+                env_state_changed.append((module.__name__, name, True, items_changed))
+        elif value_after != value_before:
+            env_state_changed.append((module.__name__, name, False, value))
+    return env_state_changed
+
+
+def get_key(stage, objects, attributes, inputs):
+    """Return the key (hash) of the stage in the cache, this is calculated
+    with the version of Jaziku, the output directory, the settings used
+    by the stage, the state in env, the objects processed by the stage
+    (e.g. the station), the attributes and the inputs of the stage.
+    """
+    settings = [(name, value) for name, value in env.config_run.settings.items()
+                if name not in SETTINGS_NOT_USED.get(stage, [])]
+    env_state = [(module.__name__, name, value) for module, name, value in get_env_state()
+                 if name not in ENV_STATE_NOT_INPUT + ENV_STATE_NOT_USED.get(stage, [])]
+    args = [getattr(env.globals_vars, name, None) for name in ARGS_OF_STAGES]
+
+    # each part with its own fingerprint, then the objects shared between the parts (e.g. the
+    # process period in env and in the station) don't change the key when the stage is restored
+    return get_fingerprint([get_fingerprint(part) for part in
+                            [env.globals_vars.VERSION, stage, env.globals_vars.OUTPUT_DIR, settings, env_state, args,
+                             (list(objects), [getattr(obj, name) for obj, name in attributes]), inputs]])
+
+
+def get_files_fingerprint(files):
+    """Return the hash of the content of the files, for the stages that
+    read files (e.g. the series of the stations).
+    """
+    fingerprint = hashlib.sha1()
+    for file_path in sorted(set(files)):
+        fingerprint.update(file_path.encode('utf-8'))
+        if os.path.isfile(file_path):
+            with open(file_path, 'rb') as open_file:
+                fingerprint.update(open_file.read())
+    return fingerprint.hexdigest()
+
+
+def get_files_in_directories(directories):
+    """Return all files and directories inside the directories with its
+    size and modification time (None for directories).
+
+    :return: {path: (size, mtime) or None}
+    :rtype: dict
+    """
+    files = {}
+    for directory in directories:
+        for root, dirs, file_names in os.walk(directory):
+            files[root] = None
+            for file_name in file_names:
+                stat = os.stat(os.path.join(root, file_name))
+                files[os.path.join(root, file_name)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def restore_objects(objects, objects_saved):
+    """Restore in place the state of the objects (e.g. the stations) from
+    the copies saved in the cache, the references of its attributes to
+    the copy (e.g. the variables to the station) are changed to the object.
+    """
+    for obj, obj_saved in zip(objects, objects_saved):
+        obj.__dict__.clear()
+        obj.__dict__.update(obj_saved.__dict__)
+        for value in obj.__dict__.values():
+            if getattr(value, 'station', None) is obj_saved:
+                value.station = obj
+
+
+def replay(saved):
+    """Show the console output and restore the state in env and the rows
+    for the maps data files saved of the stage (see capture)
+    """
+    sys.stdout.write(saved['output'])
+    sys.stdout.flush()
+
+    for module_name, name, is_dict, value in saved['env_state']:
+        if is_dict:
+            getattr(sys.modules[module_name], name).update(value)
+        else:
+            setattr(sys.modules[module_name], name, value)
+    maps_data.write_rows_for_maps(saved['rows_for_maps'])
+
+
+def restore(stage_dir, objects, attributes):
+    """Restore the stage from the cache, return False if the stage is not
+    in the cache.
+    """
+    stage_file = os.path.join(stage_dir, 'stage.pickle')
+    if not os.path.isfile(stage_file):
+        return False
+
+    try:
+        with open(stage_file, 'rb') as open_file:
+            saved = pickle.load(open_file)
+    except Exception:
+        # corrupt file in cache
+        return False
+
+    for path in saved['directories']:
+        output_dir = os.path.join(env.globals_vars.OUTPUT_DIR, path)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+    for path in saved['files']:
+        shutil.copy2(os.path.join(stage_dir, 'files', path), os.path.join(env.globals_vars.OUTPUT_DIR, path))
+
+    restore_objects(objects, saved['objects'])
+    for (obj, name), value in zip(attributes, saved['attributes']):
+        setattr(obj, name, value)
+    replay(saved)
+
+    return True
+
+
+def save(stage_dir, saved, files):
+    """Save the result of the stage in the cache, the state and the files
+    written by the stage.
+    """
+    if not os.path.isdir(os.path.dirname(stage_dir)):
+        os.makedirs(os.path.dirname(stage_dir), exist_ok=True)
+
+    # write in temporal directory and rename it, the stage is complete in cache or not exists
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(stage_dir))
+    try:
+        for path in files:
+            os.makedirs(os.path.dirname(os.path.join(tmp_dir, 'files', path)), exist_ok=True)
+            shutil.copy2(os.path.join(env.globals_vars.OUTPUT_DIR, path), os.path.join(tmp_dir, 'files', path))
+        with open(os.path.join(tmp_dir, 'stage.pickle'), 'wb') as open_file:
+            pickle.dump(saved, open_file, protocol=4)
+        os.replace(tmp_dir, stage_dir)
+    except Exception:
+        # the cache is optional, continue without it
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def run(stage, function, args, objects=(), attributes=(), directories=(), inputs=None):
+    """Run the function of the stage with the args, or restore the stage
+    from the cache if it was processed before with the same settings and
+    inputs.
+
+    :param stage: name of the stage (see STAGES)
+    :type stage: str
+    :param function: function to run the stage
+    :type function: function
+    :param args: arguments for the function
+    :type args: tuple
+    :param objects: objects that the stage processes and changes (e.g. the stations)
+    :type objects: list
+    :param attributes: others attributes changed by the stage [(object, name), ...]
+    :type attributes: list
+    :param directories: directories where the stage writes its files
+    :type directories: list
+    :param inputs: others inputs of the stage, e.g. the fingerprint of files read
+    """
+    if not is_enabled():
+        function(*args)
+        return
+
+    try:
+        key = get_key(stage, objects, attributes, inputs)
+    except Exception:
+        # the stage can't be saved in the cache
+        key = None
+
+    counter = report.setdefault(stage, [0, 0])
+
+    if key is not None:
+        stage_dir = os.path.join(get_stages_dir(), stage, key)
+        if restore(stage_dir, objects, attributes):
+            counter[0] += 1
+            return
+    counter[1] += 1
+
+    result, captured = capture(function, args, directories)
+
+    if key is not None:
+        # save the stage before write the rows of the stage in the maps data
+        captured['objects'] = list(objects)
+        captured['attributes'] = [getattr(obj, name) for obj, name in attributes]
+        save(stage_dir, captured, captured['files'])
+
+    maps_data.write_rows_for_maps(captured['rows_for_maps'])
+
+
+def capture(function, args, directories=()):
+    """Run the function with the args capturing its result: the console
+    output, the files and directories written inside the directories,
+    the state in env changed and the rows for the maps data files (these
+    are not written in the maps data, see replay).
+
+    :return: (value returned by the function, {'output', 'directories',
+        'files', 'env_state', 'rows_for_maps'})
+    :rtype: tuple
+    """
+    files_before = get_files_in_directories(directories)
+    env_state_before = [get_state_to_compare(value) for module, name, value in get_env_state()]
+
+    output_of_stage = io.StringIO()
+    rows_for_maps = maps_data.rows_for_maps
+    maps_data.rows_for_maps = []
+    try:
+        with redirect_stdout(Tee(sys.stdout, output_of_stage)):
+            result = function(*args)
+    finally:
+        rows_of_stage = maps_data.rows_for_maps
+        maps_data.rows_for_maps = rows_for_maps
+
+    files_after = get_files_in_directories(directories)
+    files = [os.path.relpath(path, env.globals_vars.OUTPUT_DIR) for path, stat in files_after.items()
+             if stat is not None and files_before.get(path) != stat]
+    new_directories = [os.path.relpath(path, env.globals_vars.OUTPUT_DIR) for path, stat in files_after.items()
+                       if stat is None and path not in files_before]
+
+    return result, {'output': output_of_stage.getvalue(),
+                    'directories': sorted(new_directories),
+                    'files': files,
+                    'env_state': get_env_state_changed(env_state_before),
+                    'rows_for_maps': rows_of_stage}
+
+
+def add_report(report_of_process):
+    """Add the hits and misses of the stages processed in other process
+    (see jaziku.process_all_stations)
+    """
+    for stage, (hits, misses) in report_of_process.items():
+        counter = report.setdefault(stage, [0, 0])
+        counter[0] += hits
+        counter[1] += misses
+
+
+def print_report():
+    """Show the hits and misses of the cache by stage in this run
+    """
+    console.msg(_("\nCache of stages (hits/misses):"))
+    for stage in STAGES:
+        if stage in report:
+            console.msg("   {0} {1} {2}/{3}".format(stage, '-' * (25 - len(stage)), report[stage][0], report[stage][1]))
+
+
+def clear():
+    """Delete all stages saved in the cache
+    """
+    if env.globals_vars.CACHE_DIR is None:
+        return
+
+    shutil.rmtree(get_stages_dir(), ignore_errors=True)
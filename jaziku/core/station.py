@@ -47,6 +47,33 @@ class Station(object):
 
         self.var_ = {'D': self.var_D, 'I': self.var_I}
 
+        self.common_period = None
+        self.process_period = None
+
+        # results of the climate calculated with all stations (see climate.batch)
+        self.climate_batch = None
+        # thresholds and contingency tables updated from the previous run (see climate.incremental)
+        self.climate_incremental = None
+
+    def snapshot(self):
+        """Return a copy-on-write snapshot of this station, for work on it
+        (e.g. convert or fill the variables in EDA) without change the
+        station and without copy its series. The snapshot shares all values
+        with the station, the attributes replaced in the snapshot (e.g. the
+        data converted) are only of the snapshot and the data shared is
+        read-only, it is copied before change it (see Variable.snapshot).
+
+        :rtype: Station
+        """
+        station = Station.__new__(Station)
+        station.__dict__.update(self.__dict__)
+
+        station.var_D = self.var_D.snapshot(station)
+        station.var_I = self.var_I.snapshot(station)
+        station.var_ = {'D': station.var_D, 'I': station.var_I}
+
+        return station
+
     def calculate_common_and_process_period(self):
         """Calculate common period (interception) in years of dates from
         dependent and independent variable. And the process period is the
@@ -93,8 +120,8 @@ class Station(object):
         for date_period in common_date:
             # common_period format list: [[  date ,  var_D ,  var_I ],... ]
             self.common_period.append([date_period,
-                                       self.var_D.data[self.var_D.date.index(date_period)],
-                                       self.var_I.data[self.var_I.date.index(date_period)]])
+                                       self.var_D.series.get(date_period),
+                                       self.var_I.series.get(date_period)])
 
         # calculate the process period
         self.process_period = {'start': self.common_period[0][0].year + 1,
@@ -18,12 +18,18 @@
 # You should have received a copy of the GNU General Public License
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
+import sys
 import gettext
+import multiprocessing
+import numpy
+from contextlib import redirect_stdout
 from datetime import date
 
 from jaziku import env
 from jaziku.core import analysis_interval
 from jaziku.core.station import Station
+from jaziku.core.variable import Variable
 from jaziku.core.input import validation
 from jaziku.utils import console
 
@@ -42,9 +48,9 @@ def prepare_all_stations(stations_list, prepare_data_for_data_analysis, prepare_
 
         # Read vars
         console.msg(_("Reading var D and var I of all stations ................. "), newline=False)
-        for station in stations_list:
-            station.var_D.read_data_from_file()
-            station.var_I.read_data_from_file()
+        # the var I is read only once and shared for all stations
+        Variable.shared_series.clear()
+        errors_in_common_period = read_all_stations(stations_list)
         console.msg(_("done"), color='green')
 
         # show some information of variables
@@ -72,8 +78,14 @@ def prepare_all_stations(stations_list, prepare_data_for_data_analysis, prepare_
 
         # common and process period
         console.msg(_("Calculate common and process period for each stations ... "), newline=False)
-        for station in stations_list:
-            station.calculate_common_and_process_period()
+        for idx_station, station in enumerate(stations_list):
+            if idx_station in errors_in_common_period:
+                # report the error occurred calculating the common period when the station was read
+                sys.stdout.write(errors_in_common_period[idx_station])
+                sys.exit()
+            # the common period could be calculated when the station was read
+            if station.common_period is None:
+                station.calculate_common_and_process_period()
         console.msg(_("done"), color='green')
 
         # global common period
@@ -142,6 +154,109 @@ def prepare_all_stations(stations_list, prepare_data_for_data_analysis, prepare_
         Station.stations_processed).format(Station.stations_processed), color='cyan')
 
 
+# stations to read in the processes of the pool, this is
+# inherited by the processes (fork) instead of send it
+stations_to_read = None
+
+
+def read_all_stations(stations_list):
+    """Read the var D and var I of all stations, if the number of workers
+    is greater than 1, the stations (after the first one) are read in a
+    pool of processes, each process read and fill the var D and calculate
+    the common and process period of the station and return the compact
+    result (arrays) to set it in the station. The errors are reported in
+    the same order of stations as read it one by one.
+
+    :param stations_list: list of all stations
+    :type stations_list: list
+
+    :return: errors calculating the common period: {idx_station: error message}
+    """
+    global stations_to_read
+
+    # the first station is read here, this set the frequency data, the limits
+    # of the variables and read the var I shared for all stations before fork
+    stations_list[0].var_D.read_data_from_file()
+    stations_list[0].var_I.read_data_from_file()
+
+    workers = min(env.globals_vars.arg_workers, len(stations_list) - 1)
+
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for station in stations_list[1::]:
+            station.var_D.read_data_from_file()
+            station.var_I.read_data_from_file()
+        return {}
+
+    errors_in_common_period = {}
+    stations_to_read = stations_list
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.imap(read_station_in_process, range(1, len(stations_list)),
+                            chunksize=max(1, (len(stations_list) - 1) // (workers * 4)))
+
+        for idx_station, result in enumerate(results, start=1):
+            station = stations_list[idx_station]
+            if 'error_reading' in result:
+                # report the error in the same order of stations
+                sys.stdout.write(result['error_reading'])
+                sys.exit()
+
+            station.var_D.data = result['data']
+            station.var_D.date = result['date'].tolist()
+            station.var_D.set_origin()
+            station.var_I.read_data_from_file()
+
+            if 'error_period' in result:
+                # it will be reported when is calculated the common period
+                errors_in_common_period[idx_station] = result['error_period']
+            else:
+                station.common_period = [[date_period, value_D, value_I] for date_period, value_D, value_I in
+                                         zip(result['common_date'].tolist(), result['common_D'], result['common_I'])]
+                station.process_period = result['process_period']
+    stations_to_read = None
+
+    return errors_in_common_period
+
+
+def read_station_in_process(idx_station):
+    """Read and fill the var D and calculate the common and process period of
+    the station inside a process of the pool, return the compact result or
+    the error message of the station.
+
+    :param idx_station: index of station in stations_to_read
+    :type idx_station: int
+
+    :return: dict with arrays of data/date of var D and common period
+    """
+    station = stations_to_read[idx_station]
+
+    error_message = io.StringIO()
+    try:
+        with redirect_stdout(error_message):
+            station.var_D.read_data_from_file()
+            station.var_I.read_data_from_file()
+    except SystemExit:
+        return {'error_reading': error_message.getvalue()}
+
+    result = {'data': station.var_D.data,
+              'date': station.var_D.series.date64}
+
+    error_message = io.StringIO()
+    try:
+        with redirect_stdout(error_message):
+            station.calculate_common_and_process_period()
+    except SystemExit:
+        result['error_period'] = error_message.getvalue()
+        return result
+
+    common_period = list(zip(*station.common_period))
+    result['common_date'] = numpy.array(common_period[0], dtype='datetime64[D]')
+    result['common_D'] = numpy.array(common_period[1], dtype=numpy.float64)
+    result['common_I'] = numpy.array(common_period[2], dtype=numpy.float64)
+    result['process_period'] = station.process_period
+
+    return result
+
+
 def global_process_period(stations_list):
     """Calculate the maximum global common period of all stations
     based on all common process period of all series
@@ -19,17 +19,19 @@
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import numpy
+from collections import OrderedDict
 from datetime import date
 from calendar import monthrange
 from dateutil.relativedelta import relativedelta
 from numpy import median, average, var, std
 from scipy.stats.stats import variation, skew, kurtosis
-from copy import deepcopy
 
 from jaziku import env
-from jaziku.core.input import vars
-from jaziku.core.analysis_interval import get_range_analysis_interval, get_values_in_range_analysis_interval
-from jaziku.modules.climate.time_series import calculate_specific_values_of_time_series
+from jaziku.core.input import vars, cache
+from jaziku.core.analysis_interval import get_range_analysis_interval
+from jaziku.core.series import Series
+from jaziku.modules.climate.time_series import calculate_specific_values_of_groups
 from jaziku.utils import console, array
 
 
@@ -43,17 +45,37 @@ class Variable(object):
         VARIABLE.type_series: type of series (D or I), e.g. 'SOI'
         VARIABLE.file_name: the name of file of series
         VARIABLE.file_path: the absolute path where save the file of series
-        VARIABLE.data: complete data of series
+        VARIABLE.data: complete data of series (numpy float64 array)
         VARIABLE.date: complete date of series
-        VARIABLE.origin_data: original complete data of series
+        VARIABLE.series: array-backed series of data and date with
+            O(1) date-to-index lookup, e.g. VARIABLE.series.index(date)
+        VARIABLE.origin_data: original complete data of series (read-only)
         VARIABLE.origin_date: original complete date of series
         VARIABLE.origin_frequency_data: original the frequency data
+        VARIABLE.frequency_data: frequency of the data of this variable
+        VARIABLE.data_state: 'origin' if the data is the origin, ('filled',
+            start, end) if it is the origin filled in the process period
+            (see filling), else None
+        VARIABLE.derived_series: series converted from the origin (or the
+            origin filled) saved for the next conversions (see convert2)
+        VARIABLE.shared_key: key in Variable.shared_series if the series
+            is shared (read-only) with other stations, else None
         VARIABLE.was_converted
         plus attributes return of methods:
             data_and_null_in_process_period()
             do_some_statistic_of_data()
     """
 
+    # all stations read the same file for var I, then the series of var I
+    # is read, filled and converted only once per run and frequency and
+    # shared (read-only) for all stations:
+    #   {(file_path,): Series, (file_path, new_freq_data, ...): Series}
+    shared_series = {}
+
+    # maximum number of derived series saved by variable, the least
+    # recently used is deleted when there are more (see convert2)
+    derived_series_size = 4
+
     def __init__(self, type, station):
         if type in ['D', 'I']:
             self.type = type
@@ -65,6 +87,107 @@ class Variable(object):
         self.origin_data = None
         self.origin_date = None
         self.origin_frequency_data = None
+        # frequency, state and the series derived of the data
+        self.frequency_data = None
+        self.data_state = None
+        self.derived_series = OrderedDict()
+        # data and date of the series
+        self._data = None
+        self._date = None
+        self._series = None
+        self.shared_key = None
+
+    def __getstate__(self):
+        # the derived series are not saved (e.g. in the cache of stages),
+        # these are converted again when are needed
+        state = dict(self.__dict__)
+        state['derived_series'] = OrderedDict()
+        return state
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, values):
+        self._data = numpy.asarray(values, dtype=numpy.float64)
+        self._series = None
+        self.shared_key = None
+
+    @property
+    def date(self):
+        return self._date
+
+    @date.setter
+    def date(self, dates):
+        self._date = list(dates)
+        self._series = None
+        self.shared_key = None
+
+    @property
+    def series(self):
+        """Array-backed series of the data and date of this variable,
+        this is rebuilt only when the data or date are replaced.
+        """
+        if self._series is None:
+            self._series = Series(self._data, self._date)
+        return self._series
+
+    def share_series(self, shared_key):
+        """Use the series shared for all stations saved in Variable.shared_series,
+        this is a read-only view, if this variable need change the data this
+        make its own copy before (see make_data_writable).
+        """
+        series = Variable.shared_series[shared_key]
+        self._data = series.data
+        self._date = series.date
+        self._series = series
+        self.shared_key = shared_key
+
+    def save_shared_series(self, shared_key):
+        """Save the series of this variable for share it with all stations
+        """
+        self.data.flags.writeable = False
+        Variable.shared_series[shared_key] = self.series
+        self.shared_key = shared_key
+
+    def snapshot(self, station):
+        """Return a copy-on-write snapshot of this variable for the snapshot
+        of the station (see Station.snapshot), the data is shared read-only
+        with the snapshot, then the variable or the snapshot that changes it
+        in place make its own copy before (see make_data_writable).
+
+        :rtype: Variable
+        """
+        if self.data is not None:
+            self.data.flags.writeable = False
+
+        variable = Variable.__new__(Variable)
+        variable.__dict__.update(self.__dict__)
+        variable.station = station
+
+        return variable
+
+    def set_origin(self):
+        """Save the data, date and frequency data read of this variable as
+        its origin, the data is read-only and shared with the origin until
+        it is changed (see make_data_writable).
+        """
+        self.data.flags.writeable = False
+        self.origin_data = self.data
+        self.origin_date = self.date
+        self.origin_frequency_data = env.var_[self.type].FREQUENCY_DATA
+        self.frequency_data = self.origin_frequency_data
+        self.data_state = 'origin'
+        self.derived_series = OrderedDict()
+        self.was_converted = False
+
+    def make_data_writable(self):
+        """Make a copy of the data of this variable if it is shared
+        with other stations before change it.
+        """
+        if not self.data.flags.writeable:
+            self.data = self.data.copy()
 
     def set_file(self, file):
 
@@ -96,6 +219,20 @@ class Variable(object):
         # relative path to file
         self.file_relpath = os.path.relpath(file, os.path.abspath(os.path.dirname(env.globals_vars.arg_runfile)))
 
+    def read_series(self):
+        """Read the data and date of this variable from the cache of parsed
+        series, or from the file of series if it is not in the cache (or it
+        changed) and save it in the cache for the next runs.
+        """
+        if not cache.is_enabled() or not os.path.isfile(self.file_path):
+            vars.read_variable(self)
+            return
+
+        cache_file = cache.get_cache_file(self)
+        if not cache.load(self, cache_file):
+            vars.read_variable(self)
+            cache.save(self, cache_file)
+
     def read_data_from_file(self):
         """Read var I or var D from files, validated and check consistent.
 
@@ -104,18 +241,28 @@ class Variable(object):
             VARIABLE.date
         """
 
+        # the var I is the same file for all stations, read it only once
+        if self.type == 'I':
+            shared_key = (self.file_path,)
+            if shared_key in Variable.shared_series:
+                self.share_series(shared_key)
+            else:
+                self.read_series()
+                self.fill_variable()
+                self.save_shared_series(shared_key)
+
+            # save the original data/date/freq (it is read-only)
+            self.set_origin()
+            return
+
         # -------------------------------------------------------------------------
         # Reading the variables from files and check based on range validation
         # and fill variable if is needed
-        vars.read_variable(self)
+        self.read_series()
         self.fill_variable()
 
         # save the original data/date/freq
-        self.origin_data = deepcopy(self.data)
-        self.origin_date = deepcopy(self.date)
-        self.origin_frequency_data = env.var_[self.type].FREQUENCY_DATA
-
-        self.was_converted = False
+        self.set_origin()
 
     def fill_variable(self):
         """Complete and fill variable with null values if the last and/or start year
@@ -128,147 +275,68 @@ class Variable(object):
         values.
         """
 
+        # the series are filled with steps of days or months
         if env.var_[self.type].is_daily():
+            step = 'D'
+        elif env.var_[self.type].is_monthly():
+            step = 'M'
+        else:
+            return
 
-            def below():
-                first_year = self.date[0].year
-                first_month = self.date[0].month
-                first_day = self.date[0].day
-                first_date = date(first_year, first_month, first_day)
-
-                # if the variable have complete data in the first year
-                if first_month == 1 and first_day == 1:
-                    return
-
-                start_date_required = date(first_year, 11, 1)
-
-                # if the variable don't have the minimum data required for the first year,
-                # this is, full data in november and december for the first year
-                if first_date > start_date_required:
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}':\n"
-                        "don't have the minimum data required (november and december)\n"
-                        "for the first year ({2}) of the series.")
-                                      .format(self.type, self.file_name, first_year))
-
-                iter_date = first_date
-
-                iter_date += relativedelta(days=-1)
-
-                # fill variable for date and data for whole the first year
-                while first_year == iter_date.year:
-                    self.date.insert(0, iter_date)
-                    self.data.insert(0, float('nan'))
-                    iter_date += relativedelta(days=-1)
-
-            def above():
-                last_year = self.date[-1].year
-                last_month = self.date[-1].month
-                last_day = self.date[-1].day
-                last_date = date(last_year, last_month, last_day)
-
-                # if the variable have complete data in the last year
-                if last_month == 12 and last_day == 31:
-                    return
-
-                end_date_required = date(last_year, 3, 1) + relativedelta(days=-1)  # last day of february
-
-                # if the variable don't have the minimum data required for the last year,
-                # this is, full data in january and february for the last year
-                if last_date < end_date_required:
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}':\n"
-                        "don't have the minimum data required (january and february)\n"
-                        "for the last year ({2}) of the series.")
-                                      .format(self.type, self.file_name, last_year))
-
-                iter_date = last_date
-
-                iter_date += relativedelta(days=1)
-
-                # fill variable for date and data for whole the last year
-                while last_year == iter_date.year:
-                    self.date.append(iter_date)
-                    self.data.append(float('nan'))
-                    iter_date += relativedelta(days=1)
-
-            # fill data below
-            below()
-            # fill data above
-            above()
-
-        if env.var_[self.type].is_monthly():
-
-            def below():
-                first_year = self.date[0].year
-                first_month = self.date[0].month
-                first_date = date(first_year, first_month, 1)
-
-                # if the variable have complete data in the first year
-                if first_month == 1:
-                    return
-
-                start_date_required = date(first_year, 11, 1)
-
-                # if the variable don't have the minimum data required for the first year,
-                # this is, full data in november and december for the first year
-                if first_date > start_date_required:
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}':\n"
-                        "don't have the minimum data required (november and december)\n"
-                        "for the first year ({2}) of the series.")
-                                      .format(self.type, self.file_name, first_year))
-
-                iter_date = first_date
-
-                iter_date += relativedelta(months=-1)
-
-                # fill variable for date and data for whole the first year
-                while first_year == iter_date.year:
-                    self.date.insert(0, iter_date)
-                    self.data.insert(0, float('nan'))
-                    iter_date += relativedelta(months=-1)
-
-            def above():
-                last_year = self.date[-1].year
-                last_month = self.date[-1].month
-                last_date = date(last_year, last_month, 1)
-
-                # if the variable have complete data in the last year
-                if last_month == 12:
-                    return
-
-                end_date_required = date(last_year, 2, 1)
-
-                # if the variable don't have the minimum data required for the last year,
-                # this is, full data in january and february for the last year
-                if last_date < end_date_required:
-                    console.msg_error(_(
-                        "Reading var {0} from file '{1}':\n"
-                        "don't have the minimum data required (january and february)\n"
-                        "for the last year ({2}) of the series.")
-                                      .format(self.type, self.file_name, last_year))
-
-                iter_date = last_date
+        first_date = self.date[0]
+        last_date = self.date[-1]
+
+        # if the variable don't have the minimum data required for the first year,
+        # this is, full data in november and december for the first year
+        start_date_required = date(first_date.year, 11, 1)
+        if first_date > start_date_required:
+            console.msg_error(_(
+                "Reading var {0} from file '{1}':\n"
+                "don't have the minimum data required (november and december)\n"
+                "for the first year ({2}) of the series.")
+                              .format(self.type, self.file_name, first_date.year))
+
+        # if the variable don't have the minimum data required for the last year,
+        # this is, full data in january and february for the last year
+        if env.var_[self.type].is_daily():
+            end_date_required = date(last_date.year, 3, 1) + relativedelta(days=-1)  # last day of february
+        else:
+            end_date_required = date(last_date.year, 2, 1)
+        if last_date < end_date_required:
+            console.msg_error(_(
+                "Reading var {0} from file '{1}':\n"
+                "don't have the minimum data required (january and february)\n"
+                "for the last year ({2}) of the series.")
+                              .format(self.type, self.file_name, last_date.year))
+
+        # dates to fill for whole the first year and the last year
+        dates_below = numpy.arange(numpy.datetime64(date(first_date.year, 1, 1), step),
+                                   numpy.datetime64(first_date, step))
+        dates_above = numpy.arange(numpy.datetime64(last_date, step) + 1,
+                                   numpy.datetime64(date(last_date.year + 1, 1, 1), step))
+
+        # if the variable have complete data in the first and last year
+        if not len(dates_below) and not len(dates_above):
+            return
 
-                iter_date += relativedelta(months=1)
-
-                # fill variable for date and data for whole the last year
-                while last_year == iter_date.year:
-                    self.date.append(iter_date)
-                    self.data.append(float('nan'))
-                    iter_date += relativedelta(months=1)
-
-            # fill data below
-            below()
-            # fill data above
-            above()
+        # fill variable for date and data in one allocation
+        self.data = numpy.concatenate((numpy.full(len(dates_below), numpy.nan), self.data,
+                                       numpy.full(len(dates_above), numpy.nan)))
+        self.date = dates_below.astype('datetime64[D]').tolist() + self.date + \
+                    dates_above.astype('datetime64[D]').tolist()
 
     def rollback_to_origin(self):
         """Rollback to origin data, date and frequency of this variable
         """
-        self.data = deepcopy(self.origin_data)
-        self.date = deepcopy(self.origin_date)
+        if self.type == 'I' and (self.file_path,) in Variable.shared_series:
+            # the origin of var I is shared and read-only
+            self.share_series((self.file_path,))
+        else:
+            # the origin is read-only, it is shared until the data is changed
+            self.data = self.origin_data
+            self.date = self.origin_date
+        self.frequency_data = self.origin_frequency_data
+        self.data_state = 'origin'
         env.var_[self.type].set_FREQUENCY_DATA(self.origin_frequency_data, check=False)
 
     def daily2Ndays(self, N_days=None):
@@ -278,20 +346,16 @@ class Variable(object):
 
         range_analysis_interval = get_range_analysis_interval(N_days)
 
-        data_Ndays = []
-        date_Ndays = []
-        for year in range(self.date[0].year, self.date[-1].year + 1):
-            for month in range(1, 13):
-                for day in range_analysis_interval:
-                    values = get_values_in_range_analysis_interval(self, year, month, day, 0)
-                    values = array.clean(values)
-                    # calculate time series based on mode calculation series
-                    if env.config_run.settings['mode_calculation_series_D'] == 'mean':
-                        data_Ndays.append(array.mean(values))
-                    if env.config_run.settings['mode_calculation_series_D'] == 'accumulate':
-                        data_Ndays.append(sum(array.clean(values)))
-
-                    date_Ndays.append(date(year, month, day))
+        # the days of the dates and the start of each interval of N days
+        days = (self.series.date64 - self.series.date64.astype('datetime64[M]')).astype(numpy.int64) + 1
+        starts = numpy.flatnonzero(numpy.isin(days, range_analysis_interval))
+
+        # calculate time series based on mode calculation series
+        groups, sizes = array.group_by_starts(self.data, starts)
+        data_Ndays = calculate_specific_values_of_groups(
+            self, groups, sizes, mode_calculation=self.get_mode_calculation_of_conversion(N_days),
+            check_nulls=False)
+        date_Ndays = self.series.date64[starts].tolist()
 
         # save the original data/date
         self.ori_data = self.data
@@ -310,23 +374,15 @@ class Variable(object):
             VARIABLE.date (overwrite) (list)
         """
 
-        data_monthly = []
-        date_monthly = []
-
-        _iter = 0
-        for year in range(self.date[0].year, self.date[-1].year + 1):
-            for month in range(1, 13):
-                var_month_list = []
-                while self.date[_iter].month == month:
-                    var_month_list.append(self.data[_iter])
-                    _iter += 1
-                    if _iter > self.date.index(self.date[-1]):
-                        break
-                # data
-                value = calculate_specific_values_of_time_series(self, var_month_list)
-                data_monthly.append(value)
-                # date
-                date_monthly.append(date(year, month, 1))
+        # the start of each month
+        days = (self.series.date64 - self.series.date64.astype('datetime64[M]')).astype(numpy.int64) + 1
+        starts = numpy.flatnonzero(days == 1)
+
+        # data
+        groups, sizes = array.group_by_starts(self.data, starts)
+        data_monthly = calculate_specific_values_of_groups(self, groups, sizes)
+        # date
+        date_monthly = self.series.date64[starts].tolist()
 
         self.data = data_monthly
         self.date = date_monthly
@@ -340,19 +396,16 @@ class Variable(object):
             VARIABLE.date (overwrite) (list)
         """
 
-        data_n_monthly = []
         size_data = len(self.data)
+        # the last N-1 months have not the next months for calculate the N-month value
+        data_n_monthly = numpy.full(size_data, numpy.nan)
 
-        for idx_data, data in enumerate(self.data):
-            n_month_list = []
-            for n in range(n_month):
-                if idx_data + n >= size_data:
-                    n_month_list = [float('nan')]
-                    continue
-                n_month_list.append(self.data[idx_data + n])
+        if size_data >= n_month:
+            # the values of the N consecutive months for each month
+            n_month_groups = numpy.column_stack([self.data[n:size_data - n_month + 1 + n] for n in range(n_month)])
             # calculate the N-month value
-            value = calculate_specific_values_of_time_series(self, n_month_list)
-            data_n_monthly.append(value)
+            data_n_monthly[:size_data - n_month + 1] = calculate_specific_values_of_groups(
+                self, n_month_groups, numpy.full(len(n_month_groups), n_month))
 
         self.data = data_n_monthly
 
@@ -367,45 +420,118 @@ class Variable(object):
         this based too on the new_freq_data set in argument and
         the mode calculation series (mean or accumulate).
 
-        Please set the new frequency:
+        The conversion is from the frequency of the data of this variable
+        (VARIABLE.frequency_data), for the others functions that use the
+        frequency of the variables in env please set the new frequency:
         env.var_[D,I].set_FREQUENCY_DATA(new_freq_data, check=False)
         AFTER this function (not before).
+
+        The series converted from the origin (or the origin filled) are
+        saved in VARIABLE.derived_series by (new frequency, data state, mode
+        calculation series), this is shared with the snapshots of the
+        station, then the same conversion is made only once.
         """
 
-        if env.var_[self.type].FREQUENCY_DATA == new_freq_data:
+        if self.frequency_data == new_freq_data:
+            return
+
+        # if the series is shared, use the series converted before by other station
+        if self.shared_key is not None:
+            shared_key = self.shared_key + (new_freq_data,)
+            if shared_key in Variable.shared_series:
+                self.share_series(shared_key)
+                self.frequency_data = new_freq_data
+                self.was_converted = True
+                return
+            self.convert_series(new_freq_data)
+            # save the series converted for the others stations
+            if self.shared_key is None:
+                self.save_shared_series(shared_key)
+            return
+
+        # use the series converted before of the origin
+        derived_key = self.get_derived_series_key(new_freq_data)
+        if derived_key in self.derived_series:
+            self.derived_series.move_to_end(derived_key)
+            series = self.derived_series[derived_key]
+            self._data = series.data
+            self._date = series.date
+            self._series = series
+            self.frequency_data = new_freq_data
+            self.was_converted = True
             return
 
+        self.convert_series(new_freq_data)
+
+        # save the series converted of the origin (read-only) for the next conversions
+        if derived_key is not None and self.frequency_data == new_freq_data:
+            self.data.flags.writeable = False
+            self.derived_series[derived_key] = self.series
+            while len(self.derived_series) > Variable.derived_series_size:
+                self.derived_series.popitem(last=False)
+
+    def get_derived_series_key(self, new_freq_data):
+        """Return the key in VARIABLE.derived_series of the data of this
+        variable converted to the new frequency, None if the data is not
+        the origin or the origin filled.
+        """
+        if self.data_state is None or self.frequency_data != self.origin_frequency_data:
+            return None
+
+        return new_freq_data, self.data_state, self.get_mode_calculation_of_conversion(new_freq_data)
+
+    def get_mode_calculation_of_conversion(self, new_freq_data):
+        """Return the mode calculation series (mean or accumulate) used for
+        convert the data of this variable to the new frequency, the data
+        daily to N days (5days, 10days, 15days or None for the analysis
+        interval) is converted with the mode of var D (see daily2Ndays).
+        """
+        if new_freq_data in [None, '5days', '10days', '15days']:
+            return env.config_run.settings['mode_calculation_series_D']
+        return env.config_run.settings['mode_calculation_series_' + self.type]
+
+    def convert_series(self, new_freq_data):
+        """Convert the data/date of this variable to the new
+        frequency (see convert2)
+        """
+
         if new_freq_data in ['5days', '10days', '15days']:
-            if env.var_[self.type].is_daily():
+            if self.frequency_data == 'daily':
                 self.daily2Ndays(new_freq_data)
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
 
         if new_freq_data == 'monthly':
-            if env.var_[self.type].is_daily():
+            if self.frequency_data == 'daily':
                 self.daily2monthly()
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
 
         if new_freq_data == 'bimonthly':
-            if env.var_[self.type].is_daily():
+            if self.frequency_data == 'daily':
                 self.daily2monthly()
                 self.monthly2bimonthly()
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
-            if env.var_[self.type].is_monthly():
+            if self.frequency_data == 'monthly':
                 self.monthly2bimonthly()
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
 
         if new_freq_data == 'trimonthly':
-            if env.var_[self.type].is_daily():
+            if self.frequency_data == 'daily':
                 self.daily2monthly()
                 self.monthly2trimonthly()
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
-            if env.var_[self.type].is_monthly():
+            if self.frequency_data == 'monthly':
                 self.monthly2trimonthly()
+                self.frequency_data = new_freq_data
                 self.was_converted = True
                 return
 
@@ -419,6 +545,9 @@ class Variable(object):
 
         self.calculate_data_date_and_nulls_in_period()
 
+        # the data could be shared with other stations
+        self.make_data_writable()
+
         ### MeanMultiyear ###
 
         if mode == 'MeanMultiyear':
@@ -450,7 +579,7 @@ class Variable(object):
                 for idx, value in enumerate(self.data_in_process_period):
                     if env.globals_vars.is_valid_null(value):
                         idx_date_period = self.date_in_process_period[idx]
-                        idx_date = self.date.index(idx_date_period)
+                        idx_date = self.series.index(idx_date_period)
                         self.data[idx_date] = multiyear_values[(idx_date_period.month, idx_date_period.day)]
 
             if env.var_[self.type].is_n_monthly():
@@ -467,22 +596,33 @@ class Variable(object):
                 for idx, value in enumerate(self.data_in_process_period):
                     if env.globals_vars.is_valid_null(value):
                         idx_date_period = self.date_in_process_period[idx]
-                        idx_date = self.date.index(idx_date_period)
+                        idx_date = self.series.index(idx_date_period)
                         self.data[idx_date] = multiyear_values[idx_date_period.month]
 
             self.calculate_data_date_and_nulls_in_period()
 
+        if self.data_state == 'origin':
+            self.data_state = ('filled', env.globals_vars.PROCESS_PERIOD['start'],
+                               env.globals_vars.PROCESS_PERIOD['end'])
+        else:
+            self.data_state = None
+
     def calculate_data_date_and_nulls_in_period(self, start_year=False, end_year=False):
         """Calculate the data without the null values inside
         the process period and too calculate the null values.
 
+        The data in the period is a read-only view when the data of the
+        variable is shared (with other stations, the origin or the
+        snapshots of the station, see make_data_writable), else it is a
+        copy. Don't change it in place, copy it before (e.g. with list()).
+
         :return by reference:
-            VARIABLE.data_in_process_period (list)
+            VARIABLE.data_in_process_period (numpy.ndarray)
             VARIABLE.data_filtered_in_process_period (list)
             VARIABLE.date_in_process_period (list)
             VARIABLE.nulls_in_process_period (int)
         (with specific period):
-            VARIABLE.data_in_period (list)
+            VARIABLE.data_in_period (numpy.ndarray)
             VARIABLE.data_filtered_in_period (list)
             VARIABLE.date_in_period (list)
             VARIABLE.nulls_in_period (int)
@@ -499,13 +639,22 @@ class Variable(object):
             # set to end year of process period for this station
             end_year = env.globals_vars.PROCESS_PERIOD['end']
 
-        start_date_var = min([d for d in self.date if d.year == start_year])
-        end_date_var = max([d for d in self.date if d.year == end_year])
-
-        data_in_period = self.data[self.date.index(start_date_var): \
-            self.date.index(end_date_var) + 1]
-        date_in_period = self.date[self.date.index(start_date_var): \
-            self.date.index(end_date_var) + 1]
+        start_idx, end_idx = self.series.range_of_dates(date(start_year, 1, 1), date(end_year, 12, 31))
+
+        # the series must have dates in the start year and in the end year
+        if start_idx >= end_idx or self.date[start_idx].year != start_year or \
+                self.date[end_idx - 1].year != end_year:
+            console.msg_error(_(
+                "The var {0} of the station {1} ({2}) don't have data\n"
+                "for the start year ({3}) or the end year ({4}) of the\n"
+                "period to process.")
+                              .format(self.type, self.station.name, self.station.code, start_year, end_year))
+
+        data_in_period = self.data[start_idx:end_idx]
+        # the data shared (read-only) are not copied for each station
+        if data_in_period.flags.writeable:
+            data_in_period = data_in_period.copy()
+        date_in_period = self.date[start_idx:end_idx]
         nulls_in_period, \
         percentage_of_nulls_in_period = array.check_nulls(data_in_period)
 
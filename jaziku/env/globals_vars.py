@@ -55,6 +55,10 @@ ARGS = None
 # this variable is set in jaziku.py
 OUTPUT_DIR = None
 
+# absolute directory where save the cache of the series read from files,
+# this variable is set in jaziku.py
+CACHE_DIR = None
+
 # ==============================================================================
 # valid nulls
 
@@ -178,7 +182,9 @@ maps_files_climate = {}  # [lag][month][var_I_labels]
 maps_files_correlation = {}  # [lag][month][var_I_labels]
 # maps files for forecast:
 # maps_files_forecast = {'5days': {}, '10days': {}, '15days': {}, 'trimonthly': {}}  # [lag][month][var_I_labels]
-maps_files_forecast = {}  # [lag][month][var_I_labels]
+maps_files_forecast = {}  # [scenario name]{'forecast_date': text, 'files': [lag]}
+# rows of all maps data files (climate and forecast) of all stations processed:
+maps_data = {}  # {maps data file: [header, row, ...]}
 
 # ==============================================================================
 # graphics properties
@@ -283,3 +289,10 @@ probability_forecast_values = {'type': None}
 # type = '3x3' '3x7' '7x7'
 
 forecast_contingency_table = {'type': None}
+
+# ==============================================================================
+# scenarios for forecast process, the first is the scenario defined in runfile
+# and the others are read from the file of scenarios (--forecast-scenarios):
+#   [{'name', 'forecast_date', 'type', 'probability_forecast_values'}, ...]
+
+forecast_scenarios = []
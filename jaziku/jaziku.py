@@ -31,9 +31,12 @@
 # ==============================================================================
 # IMPORTS
 
+import io
 import sys
 import gc
 import os.path
+import multiprocessing
+from contextlib import redirect_stdout
 from matplotlib import use
 
 # internationalization and init languages variable "_()"
@@ -43,13 +46,15 @@ from jaziku.i18n import i18n
 # jaziku imports
 from jaziku import env
 from jaziku.core import settings
-from jaziku.core import stations
-from jaziku.core.input import runfile, arg
+from jaziku.core import stations, stage_cache, journal
+from jaziku.core.input import runfile, arg, cache
 from jaziku.core.station import Station
-from jaziku.modules.climate import climate
+from jaziku.core.variable import Variable
+from jaziku.modules.climate import climate, batch, store, incremental, thresholds
 from jaziku.modules.forecast import forecast
 from jaziku.modules.data_analysis import data_analysis
 from jaziku.modules.maps import maps
+from jaziku.modules.maps import data as maps_data
 from jaziku.utils import console, output
 
 
@@ -57,7 +62,10 @@ from jaziku.utils import console, output
 # MAIN PROCESS
 
 
-def main(arg_runfile=False, arg_force=False, arg_output=False):
+def main(arg_runfile=False, arg_force=False, arg_output=False, arg_no_cache=False, arg_clear_cache=False,
+         arg_workers=1, arg_batch_climate=False, arg_forecast_scenarios=False, arg_store_climate=False,
+         arg_forecast_only=False, arg_incremental=False, arg_verify_incremental=False, arg_stage_cache=False,
+         arg_resume=False):
     """
     Main process of Jaziku
     """
@@ -82,10 +90,32 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
         env.globals_vars.arg_runfile = env.globals_vars.ARGS.runfile
         env.globals_vars.arg_force = env.globals_vars.ARGS.force
         env.globals_vars.arg_output = env.globals_vars.ARGS.output
+        env.globals_vars.arg_no_cache = env.globals_vars.ARGS.no_cache
+        env.globals_vars.arg_clear_cache = env.globals_vars.ARGS.clear_cache
+        env.globals_vars.arg_workers = env.globals_vars.ARGS.workers
+        env.globals_vars.arg_batch_climate = env.globals_vars.ARGS.batch_climate
+        env.globals_vars.arg_forecast_scenarios = env.globals_vars.ARGS.forecast_scenarios
+        env.globals_vars.arg_store_climate = env.globals_vars.ARGS.store_climate
+        env.globals_vars.arg_forecast_only = env.globals_vars.ARGS.forecast_only
+        env.globals_vars.arg_incremental = env.globals_vars.ARGS.incremental
+        env.globals_vars.arg_verify_incremental = env.globals_vars.ARGS.verify_incremental
+        env.globals_vars.arg_stage_cache = env.globals_vars.ARGS.stage_cache
+        env.globals_vars.arg_resume = env.globals_vars.ARGS.resume
     else:
         env.globals_vars.arg_runfile = arg_runfile
         env.globals_vars.arg_force = arg_force
         env.globals_vars.arg_output = arg_output
+        env.globals_vars.arg_no_cache = arg_no_cache
+        env.globals_vars.arg_clear_cache = arg_clear_cache
+        env.globals_vars.arg_workers = arg_workers
+        env.globals_vars.arg_batch_climate = arg_batch_climate
+        env.globals_vars.arg_forecast_scenarios = arg_forecast_scenarios
+        env.globals_vars.arg_store_climate = arg_store_climate
+        env.globals_vars.arg_forecast_only = arg_forecast_only
+        env.globals_vars.arg_incremental = arg_incremental
+        env.globals_vars.arg_verify_incremental = arg_verify_incremental
+        env.globals_vars.arg_stage_cache = arg_stage_cache
+        env.globals_vars.arg_resume = arg_resume
 
     # -------------------------------------------------------------------------
     # Initialize all settings variables in None
@@ -137,23 +167,67 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
         # this is absolute directory where is the runfile + filename of runfile
         env.globals_vars.OUTPUT_DIR = os.path.abspath(os.path.splitext(env.globals_vars.arg_runfile)[0])
 
+    # -------------------------------------------------------------------------
+    # CACHE OF SERIES READ FROM FILES
+
+    # absolute directory to save the cache of series, this is in the home of user
+    env.globals_vars.CACHE_DIR = os.path.join(os.path.expanduser('~'), '.jaziku', 'cache')
+
+    if env.globals_vars.arg_clear_cache:
+        cache.clear()
+        stage_cache.clear()
+    elif cache.is_enabled():
+        cache.evict()
+
+    # -------------------------------------------------------------------------
+    # FORECAST ONLY WITH THE CLIMATE SAVED
+
+    if env.globals_vars.arg_forecast_only:
+        if not env.config_run.settings['forecast_process']:
+            console.msg_error(_("The forecast process must be enabled in runfile for\n"
+                                "make the forecast only."), False)
+        # the climate is loaded from the store, not processed
+        env.config_run.settings['data_analysis'] = False
+        env.config_run.settings['climate_process'] = False
+        if env.config_run.settings['maps']:
+            env.config_run.settings['maps']['climate'] = False
+            env.config_run.settings['maps']['correlation'] = False
+
+    # -------------------------------------------------------------------------
+    # INCREMENTAL UPDATE OF THE CLIMATE FROM THE PREVIOUS RUN
+
+    if env.globals_vars.arg_incremental:
+        if not env.config_run.settings['climate_process']:
+            console.msg_error(_("The climate process must be enabled in runfile for\n"
+                                "update the climate incrementally."), False)
+        # the climate updated is saved for the next run and the slices of
+        # each station are updated in the climate process (not in batch)
+        env.globals_vars.arg_store_climate = True
+        env.globals_vars.arg_batch_climate = False
+        env.globals_vars.CLIMATE_DIR = os.path.join(env.globals_vars.OUTPUT_DIR, _('Jaziku_Climate'))
+        incremental.read_previous_climate(stations_list)
+
     # -------------------------------------------------------------------------
     # PREPARE ALL OUTPUT DIRECTORIES FOR SAVE RESULTS
 
     output.prepare_dirs()
 
+    # -------------------------------------------------------------------------
+    # JOURNAL OF THE RUN FOR RESUME IT
+
+    journal.start()
+
     # -------------------------------------------------------------------------
     # DATA ANALYSIS
 
     if env.config_run.settings['data_analysis']:
         # PRE-PROCESS: prepare data for all stations for data analysis process
-        stations.prepare_all_stations(stations_list,
-                                      prepare_data_for_data_analysis=True,
-                                      prepare_data_for_climate_forecast=False)
+        prepare_all_stations(stations_list, prepare_data_for_data_analysis=True,
+                             prepare_data_for_climate_forecast=False)
 
         # main process for data analysis
-        data_analysis.main(stations_list)
-
+        stage_cache.run('data_analysis', data_analysis.main, (stations_list,), objects=stations_list,
+                        attributes=[(Variable, 'shared_series')], directories=[env.globals_vars.DATA_ANALYSIS_DIR])
 
     # -------------------------------------------------------------------------
     # CLIMATE AND FORECAST PRE-PROCESS
@@ -161,12 +235,16 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
     # climate
     if env.config_run.settings['climate_process']:
         # PRE-PROCESS: prepare data for all stations for climate (and forecast) process
-        stations.prepare_all_stations(stations_list,
-                                      prepare_data_for_data_analysis=False,
-                                      prepare_data_for_climate_forecast=True)
+        prepare_all_stations(stations_list, prepare_data_for_data_analysis=False,
+                             prepare_data_for_climate_forecast=True)
 
         climate.pre_process()
 
+    # forecast only: load the climate saved of all stations
+    if env.globals_vars.arg_forecast_only:
+        env.globals_vars.CLIMATE_DIR = os.path.join(env.globals_vars.OUTPUT_DIR, _('Jaziku_Climate'))
+        store.load_all_stations(stations_list)
+
     # forecast
     if env.config_run.settings['forecast_process']:
         forecast.pre_process()
@@ -174,22 +252,16 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
     # -------------------------------------------------------------------------
     # CLIMATE AND FORECAST MAIN PROCESS
 
-    if env.config_run.settings['climate_process']:
-        # process each station from stations list
-        for station in stations_list:
-
-            # console message
-            print(_("\n################# STATION: {0} ({1})").format(station.name, station.code))
+    if env.config_run.settings['climate_process'] or env.globals_vars.arg_forecast_only:
+        if env.globals_vars.arg_batch_climate and env.config_run.settings['climate_process']:
+            # calculate the climate of all stations at once
+            batch.process_all_stations(stations_list)
 
-            ## process climate and forecast for this station
-            # run climate process
-            if env.config_run.settings['climate_process']:
-                climate.process(station)
+        # process each station from stations list
+        process_all_stations(stations_list)
 
-            # run forecast process
-            if env.config_run.settings['forecast_process']:
-                # TODO: run forecast without climate¿?
-                forecast.process(station)
+        # write the maps data files with the rows of all stations
+        maps_data.save_maps_data()
 
         console.msg(gettext.ngettext(
             _("\n{0} station processed."),
@@ -201,7 +273,6 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
     # force run garbage collector memory
     gc.collect()
 
-
     # -------------------------------------------------------------------------
     # MAPS PROCESS
 
@@ -213,7 +284,13 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
 
         for grid in maps.Grid.all_grids:
             # process all maps for this grid
-            maps.process(grid)
+            stage_cache.run('maps', maps.process, (grid,), objects=[grid],
+                            attributes=[(maps.Grid, 'maps_created_in_grid')],
+                            directories=[directory for directory in [env.globals_vars.CLIMATE_DIR,
+                                                                     env.globals_vars.FORECAST_DIR]
+                                         if directory is not None],
+                            inputs=(env.globals_vars.maps_data, env.globals_vars.maps_files_climate,
+                                    env.globals_vars.maps_files_correlation, env.globals_vars.maps_files_forecast))
 
         for grid in maps.Grid.all_grids:
             console.msg(gettext.ngettext(
@@ -222,6 +299,11 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
                 maps.Grid.maps_created_in_grid).format(maps.Grid.maps_created_in_grid, grid.grid_fullname),
                         color='green')
 
+    if stage_cache.is_enabled():
+        stage_cache.print_report()
+    if env.globals_vars.arg_resume:
+        journal.print_report()
+
     console.msg(_("\nProcess completed!"), color='green')
 
     print(_("Good bye :)"))
@@ -233,6 +315,141 @@ def main(arg_runfile=False, arg_force=False, arg_output=False):
     # sys.exit()
 
 
+def prepare_all_stations(stations_list, prepare_data_for_data_analysis, prepare_data_for_climate_forecast):
+    """Prepare all stations (see stations.prepare_all_stations), the stage
+    depends on the files of the series of var D and var I.
+    """
+    files_of_series = [station.var_[var].file_path for station in stations_list for var in ['D', 'I']
+                       if getattr(station.var_[var], 'file_path', None)]
+
+    stage_cache.run('prepare', stations.prepare_all_stations,
+                    (stations_list, prepare_data_for_data_analysis, prepare_data_for_climate_forecast),
+                    objects=stations_list, attributes=[(Variable, 'shared_series')],
+                    inputs=(prepare_data_for_data_analysis, prepare_data_for_climate_forecast,
+                            stage_cache.get_files_fingerprint(files_of_series)))
+
+
+def process_station(station):
+    """Run the climate and forecast process for the station, the station
+    completed in the run resumed is skipped (see journal)
+    """
+    directories = []
+    if env.config_run.settings['climate_process']:
+        directories.append(os.path.join(env.globals_vars.CLIMATE_DIR, _('stations'),
+                                        station.code + '_' + station.name))
+    if env.config_run.settings['forecast_process']:
+        directories.append(os.path.join(env.globals_vars.FORECAST_DIR, _('stations'),
+                                        station.code + '_' + station.name))
+
+    journal.run('station', 'station {0} {1}'.format(station.code, station.name), process_modules_of_station,
+                (station,), objects=[station], directories=directories)
+
+
+def process_modules_of_station(station):
+    """Run the climate and forecast process for the station
+    """
+
+    # console message
+    print(_("\n################# STATION: {0} ({1})").format(station.name, station.code))
+
+    # the thresholds are shared only between the slices of the station
+    thresholds.thresholds_calculated.clear()
+
+    ## process climate and forecast for this station
+    # run climate process
+    if env.config_run.settings['climate_process']:
+        stage_cache.run('climate', climate.process, (station,), objects=[station],
+                        directories=[os.path.join(env.globals_vars.CLIMATE_DIR, _('stations'),
+                                                  station.code + '_' + station.name)])
+
+    # run forecast process
+    if env.config_run.settings['forecast_process']:
+        # TODO: run forecast without climate¿?
+        stage_cache.run('forecast', forecast.process, (station,), objects=[station],
+                        directories=[os.path.join(env.globals_vars.FORECAST_DIR, _('stations'),
+                                                  station.code + '_' + station.name)])
+
+
+# stations to process in the processes of the pool, this is
+# inherited by the processes (fork) instead of send it
+stations_to_process = None
+
+
+def process_all_stations(stations_list):
+    """Run the climate and forecast process for all stations, if the number
+    of workers is greater than 1, the stations (after the first one) are
+    processed in a pool of processes. The processes are forked after the
+    pre-process, then each one inherit the settings (env.config_run), the
+    variables (env.var_D, env.var_I) and env.globals_vars. The console
+    output and the rows for the maps data files of each station are
+    returned to the main process and showed/written in the same order of
+    stations as process it one by one.
+
+    :param stations_list: list of all stations
+    :type stations_list: list
+    """
+    global stations_to_process
+
+    # the first station is processed here, this create the maps data files
+    # (with the headers) before fork
+    process_station(stations_list[0])
+
+    workers = min(env.globals_vars.arg_workers, len(stations_list) - 1)
+
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for station in stations_list[1::]:
+            process_station(station)
+        return
+
+    stations_to_process = stations_list
+    sys.stdout.flush()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.imap(process_station_in_process, range(1, len(stations_list)))
+
+        for result in results:
+            sys.stdout.write(result['output'])
+            sys.stdout.flush()
+            maps_data.write_rows_for_maps(result['rows_for_maps'])
+            stage_cache.add_report(result['stages_report'])
+            journal.add_report(result['journal_report'])
+            if result['exit']:
+                # the error was showed in the output, the next stations are not processed
+                pool.terminate()
+                sys.exit()
+    stations_to_process = None
+
+
+def process_station_in_process(idx_station):
+    """Run the climate and forecast process for the station inside a process
+    of the pool, return the console output, the rows for the maps data files
+    and if the station ended with error.
+
+    :param idx_station: index of station in stations_to_process
+    :type idx_station: int
+
+    :return: dict with the output, rows for maps, report of the cache of
+        stages and of the journal and exit of the station
+    """
+    station = stations_to_process[idx_station]
+
+    output_of_station = io.StringIO()
+    maps_data.rows_for_maps = []
+    stage_cache.report = {}
+    journal.report = {}
+    try:
+        with redirect_stdout(output_of_station):
+            process_station(station)
+        with_error = False
+    except SystemExit:
+        with_error = True
+
+    return {'output': output_of_station.getvalue(),
+            'rows_for_maps': maps_data.rows_for_maps,
+            'stages_report': stage_cache.report,
+            'journal_report': journal.report,
+            'exit': with_error}
+
+
 # Run main() when call jaziku.py
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import numpy
+from contextlib import redirect_stdout
+
+from jaziku import env
+from jaziku.modules.climate import time_series
+from jaziku.modules.climate.contingency_table import get_slices_of_contingency_tables, \
+    calculate_thresholds_of_slices, get_contingency_tables_in_values
+from jaziku.modules.climate.thresholds import calculate_statistics_in_batch, thresholds_to_list
+from jaziku.utils import console
+
+
+def process_all_stations(stations_list):
+    """Batched climate engine, calculate the time series of all stations and
+    stack them in arrays [station, lag, month, interval, year] for calculate
+    the statistics of thresholds and the contingencies tables with absolute
+    values of all stations at once. The results are saved in each station
+    (station.climate_batch) and are used when the climate process of each
+    station is run (see climate.process), this makes the outputs of
+    the station.
+
+    The messages (and errors) of the thresholds of each station are saved
+    and showed when the station is processed, thus the output of the run is
+    the same.
+
+    :param stations_list: stations to process
+    :type stations_list: list
+    """
+
+    console.msg(_("Calculating the climate of all stations in batch ........ "), newline=False)
+
+    for station in stations_list:
+        station.climate_dir \
+            = os.path.join(env.globals_vars.CLIMATE_DIR, _('stations'), station.code + '_' + station.name)
+        time_series.calculate_time_series(station, makes_files=False)
+
+    # all lag, N-monthly or month/day of contingencies tables
+    slices = get_slices_of_contingency_tables()
+    days = stations_list[0].indexed_time_series.days
+    lags_idx = [lag for lag, n_month, day in slices]
+    months_idx = [n_month - 1 for lag, n_month, day in slices]
+    days_idx = [days.index(day) for lag, n_month, day in slices]
+
+    # time series of all stations [station, lag, month, interval, year] and the
+    # specific values of all slices of each station [station, slice, year]
+    values = {}
+    for var in ['var_D', 'var_I']:
+        tensor = numpy.stack([station.indexed_time_series.values[var] for station in stations_list])
+        values[var] = tensor[:, lags_idx, months_idx, days_idx]
+
+    # calculate the statistics for the thresholds of all stations and slices in batch
+    calculate_statistics_in_batch(stations_list[0].var_D,
+                                  values['var_D'].reshape(-1, values['var_D'].shape[-1]).tolist())
+    calculate_statistics_in_batch(stations_list[0].var_I,
+                                  values['var_I'].reshape(-1, values['var_I'].shape[-1]).tolist())
+
+    # calculate the thresholds of each station saving its messages
+    thresholds_of_stations = []
+    for idx_station, station in enumerate(stations_list):
+        messages = io.StringIO()
+        try:
+            with redirect_stdout(messages):
+                thresholds_of_stations.append(
+                    calculate_thresholds_of_slices(station, values['var_D'][idx_station].tolist(),
+                                                   values['var_I'][idx_station].tolist()))
+        except SystemExit:
+            # the error is showed when this station is processed, the next stations are not processed
+            station.climate_batch = {'output': messages.getvalue(), 'exit': True}
+            break
+        station.climate_batch = {'output': messages.getvalue(), 'exit': False}
+
+    # calculate the contingencies tables with absolute values of all stations at once
+    stations_with_thresholds = len(thresholds_of_stations)
+    if stations_with_thresholds:
+        thresholds_var_D = [[thresholds_to_list(thresholds[0]) for thresholds in thresholds_of_station]
+                            for thresholds_of_station in thresholds_of_stations]
+        thresholds_var_I = [[thresholds_to_list(thresholds[1]) for thresholds in thresholds_of_station]
+                            for thresholds_of_station in thresholds_of_stations]
+        n_categories = len(thresholds_var_D[0][0]) + 1
+
+        contingency_tables_in_values = get_contingency_tables_in_values(
+            values['var_D'][:stations_with_thresholds].reshape(-1, values['var_D'].shape[-1]),
+            values['var_I'][:stations_with_thresholds].reshape(-1, values['var_I'].shape[-1]),
+            numpy.reshape(thresholds_var_D, (-1, n_categories - 1)),
+            numpy.reshape(thresholds_var_I, (-1, n_categories - 1))) \
+            .reshape(stations_with_thresholds, len(slices), n_categories, n_categories)
+
+        for station, thresholds_of_station, contingency_tables in \
+                zip(stations_list, thresholds_of_stations, contingency_tables_in_values.tolist()):
+            station.climate_batch['thresholds'] = thresholds_of_station
+            station.climate_batch['contingency_tables_in_values'] = contingency_tables
+
+    console.msg(_("done"), color='green')
@@ -22,7 +22,7 @@ import os
 from clint.textui import colored
 
 from jaziku import env
-from jaziku.modules.climate import result_table, time_series
+from jaziku.modules.climate import result_table, time_series, store, incremental
 from jaziku.modules.climate.contingency_table import get_contingency_tables
 from jaziku.modules.climate.graphs import climate_graphs
 from jaziku.modules.maps.data import climate_data_for_maps
@@ -98,14 +98,26 @@ def process(station):
     # -------------------------------------------------------------------------
     # process
 
-    time_series.calculate_time_series(station)
+    if station.climate_batch is None:
+        time_series.calculate_time_series(station)
+    else:
+        # the time series were calculated with all stations (see batch)
+        time_series.save_time_series(station)
 
     # size_time_series: is the number o years of the process period
     station.size_time_series = (len(station.common_period) / 12) - 2
 
+    if env.globals_vars.arg_incremental:
+        # calculate only the slices changed since the previous run (see incremental)
+        incremental.update_contingency_tables(station)
+
     # get all contingency tables for this station
     get_contingency_tables(station)
 
+    if env.globals_vars.arg_store_climate:
+        # save the climate for make the forecast only (see store)
+        store.save(station)
+
     result_table.composite_analysis(station)
 
     if env.config_run.settings['graphics']:
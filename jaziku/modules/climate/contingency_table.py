@@ -18,15 +18,75 @@
 # You should have received a copy of the GNU General Public License
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
+import sys
+import numpy
 from numpy import matrix
 from math import isnan
+from contextlib import redirect_stdout
 
 from jaziku import env
 from jaziku.core.analysis_interval import get_range_analysis_interval
 from jaziku.utils import output
 from jaziku.utils import console
 from jaziku.modules.climate import time_series
-from jaziku.modules.climate.thresholds import get_thresholds
+from jaziku.modules.climate.thresholds import get_thresholds, thresholds_to_list, calculate_statistics_in_batch
+
+
+def get_categories(values, thresholds, normal_inclusive):
+    """Categorize the values based on the thresholds (sorted list with 2 or 6
+    thresholds), return a boolean array with shape (..., values, categories)
+    that is True where the value is inside the category. The values and
+    thresholds can be batches with the same leading dimensions.
+
+    When normal_inclusive is True the value equal to a threshold is put in the
+    category closer to normal category (the normal is {below* <= value <= above*}),
+    else in the category farther from normal (the normal is {below* < value < above*}).
+    The nan values are not inside any category.
+    """
+    values = numpy.asarray(values, dtype=float)
+    thresholds = numpy.asarray(thresholds, dtype=float)[..., numpy.newaxis, :]
+
+    n_thresholds = thresholds.shape[-1]
+    categories = numpy.ones(values.shape + (n_thresholds + 1,), dtype=bool)
+
+    # the threshold idx is the upper edge of the category idx and the lower edge of the category idx + 1
+    for idx in range(n_thresholds):
+        threshold = thresholds[..., idx]
+        if (idx < n_thresholds // 2) == normal_inclusive:
+            categories[..., idx] &= values < threshold
+            categories[..., idx + 1] &= values >= threshold
+        else:
+            categories[..., idx] &= values <= threshold
+            categories[..., idx + 1] &= values > threshold
+
+    return categories
+
+
+def get_contingency_tables_in_values(values_var_D, values_var_I, thresholds_var_D, thresholds_var_I):
+    """Calculate the contingency tables with absolute values for a batch of
+    specific values (lists of values of var D and var I for each table) and
+    the thresholds (sorted lists) of var D and var I for each table.
+
+    :return: contingency tables [table][var I category][var D category]
+    :rtype: numpy array
+    """
+
+    # the batch of values as matrix, filling with nan (nan is not counted) if the
+    # specific values have different sizes
+    size = max([len(values) for values in values_var_D] + [len(values) for values in values_var_I] + [0])
+    batch_of_values = {'D': numpy.full((len(values_var_D), size), numpy.nan),
+                       'I': numpy.full((len(values_var_I), size), numpy.nan)}
+    for idx, values in enumerate(values_var_D):
+        batch_of_values['D'][idx, :len(values)] = values
+    for idx, values in enumerate(values_var_I):
+        batch_of_values['I'][idx, :len(values)] = values
+
+    categories_var_D = get_categories(batch_of_values['D'], thresholds_var_D, env.var_D.is_normal_inclusive())
+    categories_var_I = get_categories(batch_of_values['I'], thresholds_var_I, env.var_I.is_normal_inclusive())
+
+    # count the pairs of values in each category of var I and var D
+    return numpy.einsum('tvi,tvd->tid', categories_var_I.astype(numpy.int64), categories_var_D.astype(numpy.int64))
 
 
 def get_label_of_var_I_category(value, station):
@@ -60,84 +120,38 @@ def get_label_of_var_I_category(value, station):
         station.first_iter = False
 
     # categorize the value of var I and get the label_of_var_I_category based in the label phenomenon
+    if env.config_run.settings['class_category_analysis'] == 3:
+        labels = ['below', 'normal', 'above']
+    if env.config_run.settings['class_category_analysis'] == 7:
+        labels = ['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']
 
-    if env.var_I.is_normal_inclusive():
-        # default case
-
-        if env.config_run.settings['class_category_analysis'] == 3:
-            if value < thresholds_var_I['below']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below']
-            elif value > thresholds_var_I['above']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above']
-            else:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['normal']
-
-        if env.config_run.settings['class_category_analysis'] == 7:
-            if value < thresholds_var_I['below3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below3']
-            elif thresholds_var_I['below3'] <= value < thresholds_var_I['below2']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below2']
-            elif thresholds_var_I['below2'] <= value < thresholds_var_I['below1']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below1']
-            elif thresholds_var_I['below1'] <= value <= thresholds_var_I['above1']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['normal']
-            elif thresholds_var_I['above1'] < value <= thresholds_var_I['above2']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above1']
-            elif thresholds_var_I['above2'] < value <= thresholds_var_I['above3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above2']
-            elif value > thresholds_var_I['above3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above3']
+    categories = get_categories([value], thresholds_to_list(thresholds_var_I), env.var_I.is_normal_inclusive())[0]
+    if categories.any():
+        label_of_var_I_category = env.config_run.settings['categories_labels_var_I'][labels[categories.argmax()]]
     else:
-        # SPECIAL CASE 2: for some variables, for set the category of phenomenon for the normal case the thresholds are exclude (< >)
-        # please see env/var_I file
-
-        if env.config_run.settings['class_category_analysis'] == 3:
-            if value <= thresholds_var_I['below']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below']
-            elif value >= thresholds_var_I['above']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above']
-            else:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['normal']
-
-        if env.config_run.settings['class_category_analysis'] == 7:
-            if value <= thresholds_var_I['below3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below3']
-            elif thresholds_var_I['below3'] < value <= thresholds_var_I['below2']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below2']
-            elif thresholds_var_I['below2'] < value <= thresholds_var_I['below1']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['below1']
-            elif thresholds_var_I['below1'] < value < thresholds_var_I['above1']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['normal']
-            elif thresholds_var_I['above1'] <= value < thresholds_var_I['above2']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above1']
-            elif thresholds_var_I['above2'] <= value < thresholds_var_I['above3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above2']
-            elif value >= thresholds_var_I['above3']:
-                label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['above3']
+        # the value is not inside any category (e.g. nan), as normal
+        label_of_var_I_category = env.config_run.settings['categories_labels_var_I']['normal']
 
     return label_of_var_I_category
 
 
-def get_specific_contingency_table(station, lag, n_month, start_day=None):
-    """Calculate and return the contingency table in absolute values,
-    values in percent, values to print and thresholds by below and
-    above of dependent and independent variable for specific lag,
-    N-month or month/day within the whole period to process.
+def get_specific_values_and_thresholds(station, lag, n_month, start_day=None):
+    """Get the specific values and calculate the thresholds of var D and var I for
+    specific lag, N-month or month/day, with the thresholds adjusted when two
+    thresholds are equal.
 
-    :param station: Stations instance
-    :type station: Station
-    :param lag: lag for calculate the contingency table
-    :type lag: int
-    :param n_month: month for calculate the contingency table
-    :type n_month: int
-    :param day: day for calculate the contingency table when is
-        data is daily
-    :type start_day: int
+    :return: (thresholds_var_D, thresholds_var_I) dicts
+    :rtype: tuple
+    """
 
-    :return: specific_contingency_table dict:
-        {'in_values', 'in_percentage', 'in_percentage_formatted',
-        'thresholds_var_D', 'thresholds_var_I'}
-    :rtype: dict
+    set_specific_values(station, lag, n_month, start_day)
+
+    return get_thresholds_adjusted(station)
+
+
+def set_specific_values(station, lag, n_month, start_day=None):
+    """Set the specific values of var D and var I for specific lag,
+    N-month or month/day.
     """
 
     if start_day is None:
@@ -150,6 +164,15 @@ def get_specific_contingency_table(station, lag, n_month, start_day=None):
         station.var_D.specific_values = time_series.get_specific_values(station, 'var_D', lag, n_month, start_day)
         station.var_I.specific_values = time_series.get_specific_values(station, 'var_I', lag, n_month, start_day)
 
+
+def get_thresholds_adjusted(station):
+    """Calculate the thresholds of var D and var I for the specific values set,
+    adjusted when two thresholds are equal.
+
+    :return: (thresholds_var_D, thresholds_var_I) dicts
+    :rtype: tuple
+    """
+
     # calculate thresholds as defined by the user in station file for var D
     thresholds_var_D = get_thresholds(station, station.var_D)
 
@@ -171,128 +194,46 @@ def get_specific_contingency_table(station, lag, n_month, start_day=None):
             thresholds_var_I[thresholds_idx[thres_idx]] -= epsilon
             thresholds_var_I[thresholds_idx[thres_idx + 1]] += epsilon
 
-    # -------------------------------------------------------------------------
-    # -------------------------------------------------------------------------
-    ## Calculating contingency table with absolute values
+    return thresholds_var_D, thresholds_var_I
 
-    if env.config_run.settings['class_category_analysis'] == 3:
-        # matrix 3x3
-        contingency_table = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
-    if env.config_run.settings['class_category_analysis'] == 7:
-        # matrix 7x7
-        contingency_table = [[0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0]]
 
-    if env.config_run.settings['class_category_analysis'] == 3:
-        if env.var_D.is_normal_inclusive():
-            def __matrix_row_var_D(column_var_I):
-                if station.var_D.specific_values[index] < thresholds_var_D['below']:
-                    contingency_table[column_var_I][0] += 1
-                if thresholds_var_D['below'] <= station.var_D.specific_values[index] <= thresholds_var_D['above']:
-                    contingency_table[column_var_I][1] += 1
-                if station.var_D.specific_values[index] > thresholds_var_D['above']:
-                    contingency_table[column_var_I][2] += 1
-        else:
-            def __matrix_row_var_D(column_var_I):
-                if station.var_D.specific_values[index] <= thresholds_var_D['below']:
-                    contingency_table[column_var_I][0] += 1
-                if thresholds_var_D['below'] < station.var_D.specific_values[index] < thresholds_var_D['above']:
-                    contingency_table[column_var_I][1] += 1
-                if station.var_D.specific_values[index] >= thresholds_var_D['above']:
-                    contingency_table[column_var_I][2] += 1
+def get_specific_contingency_table(station, lag, n_month, start_day=None):
+    """Calculate and return the contingency table in absolute values,
+    values in percent, values to print and thresholds by below and
+    above of dependent and independent variable for specific lag,
+    N-month or month/day within the whole period to process.
 
-    if env.config_run.settings['class_category_analysis'] == 7:
-        if env.var_D.is_normal_inclusive():
-            def __matrix_row_var_D(column_var_I):
-                if station.var_D.specific_values[index] < thresholds_var_D['below3']:
-                    contingency_table[column_var_I][0] += 1
-                if thresholds_var_D['below3'] <= station.var_D.specific_values[index] < thresholds_var_D['below2']:
-                    contingency_table[column_var_I][1] += 1
-                if thresholds_var_D['below2'] <= station.var_D.specific_values[index] < thresholds_var_D['below1']:
-                    contingency_table[column_var_I][2] += 1
-                if thresholds_var_D['below1'] <= station.var_D.specific_values[index] <= thresholds_var_D['above1']:
-                    contingency_table[column_var_I][3] += 1
-                if thresholds_var_D['above1'] < station.var_D.specific_values[index] <= thresholds_var_D['above2']:
-                    contingency_table[column_var_I][4] += 1
-                if thresholds_var_D['above2'] < station.var_D.specific_values[index] <= thresholds_var_D['above3']:
-                    contingency_table[column_var_I][5] += 1
-                if station.var_D.specific_values[index] > thresholds_var_D['above3']:
-                    contingency_table[column_var_I][6] += 1
-        else:
-            def __matrix_row_var_D(column_var_I):
-                if station.var_D.specific_values[index] <= thresholds_var_D['below3']:
-                    contingency_table[column_var_I][0] += 1
-                if thresholds_var_D['below3'] < station.var_D.specific_values[index] <= thresholds_var_D['below2']:
-                    contingency_table[column_var_I][1] += 1
-                if thresholds_var_D['below2'] < station.var_D.specific_values[index] <= thresholds_var_D['below1']:
-                    contingency_table[column_var_I][2] += 1
-                if thresholds_var_D['below1'] < station.var_D.specific_values[index] < thresholds_var_D['above1']:
-                    contingency_table[column_var_I][3] += 1
-                if thresholds_var_D['above1'] <= station.var_D.specific_values[index] < thresholds_var_D['above2']:
-                    contingency_table[column_var_I][4] += 1
-                if thresholds_var_D['above2'] <= station.var_D.specific_values[index] < thresholds_var_D['above3']:
-                    contingency_table[column_var_I][5] += 1
-                if station.var_D.specific_values[index] >= thresholds_var_D['above3']:
-                    contingency_table[column_var_I][6] += 1
-
-    if env.var_I.is_normal_inclusive():
-        # default case
-
-        if env.config_run.settings['class_category_analysis'] == 3:
-            for index, var_I in enumerate(station.var_I.specific_values):
-                if var_I < thresholds_var_I['below']:
-                    __matrix_row_var_D(0)
-                if thresholds_var_I['below'] <= var_I <= thresholds_var_I['above']:
-                    __matrix_row_var_D(1)
-                if var_I > thresholds_var_I['above']:
-                    __matrix_row_var_D(2)
-
-        if env.config_run.settings['class_category_analysis'] == 7:
-            for index, var_I in enumerate(station.var_I.specific_values):
-                if var_I < thresholds_var_I['below3']:
-                    __matrix_row_var_D(0)
-                if thresholds_var_I['below3'] <= var_I < thresholds_var_I['below2']:
-                    __matrix_row_var_D(1)
-                if thresholds_var_I['below2'] <= var_I < thresholds_var_I['below1']:
-                    __matrix_row_var_D(2)
-                if thresholds_var_I['below1'] <= var_I <= thresholds_var_I['above1']:
-                    __matrix_row_var_D(3)
-                if thresholds_var_I['above1'] < var_I <= thresholds_var_I['above2']:
-                    __matrix_row_var_D(4)
-                if thresholds_var_I['above2'] < var_I <= thresholds_var_I['above3']:
-                    __matrix_row_var_D(5)
-                if var_I > thresholds_var_I['above3']:
-                    __matrix_row_var_D(6)
+    :param station: Stations instance
+    :type station: Station
+    :param lag: lag for calculate the contingency table
+    :type lag: int
+    :param n_month: month for calculate the contingency table
+    :type n_month: int
+    :param day: day for calculate the contingency table when is
+        data is daily
+    :type start_day: int
 
-    else:
-        # SPECIAL CASE 2: for some variables, for set the category of phenomenon for the normal case the thresholds are exclude (< >)
-        # please see env/var_I file
-
-        if env.config_run.settings['class_category_analysis'] == 3:
-            for index, var_I in enumerate(station.var_I.specific_values):
-                if var_I <= thresholds_var_I['below']:
-                    __matrix_row_var_D(0)
-                if thresholds_var_I['below'] < var_I < thresholds_var_I['above']:
-                    __matrix_row_var_D(1)
-                if var_I >= thresholds_var_I['above']:
-                    __matrix_row_var_D(2)
-
-        if env.config_run.settings['class_category_analysis'] == 7:
-            for index, var_I in enumerate(station.var_I.specific_values):
-                if var_I <= thresholds_var_I['below3']:
-                    __matrix_row_var_D(0)
-                if thresholds_var_I['below3'] < var_I <= thresholds_var_I['below2']:
-                    __matrix_row_var_D(1)
-                if thresholds_var_I['below2'] < var_I <= thresholds_var_I['below1']:
-                    __matrix_row_var_D(2)
-                if thresholds_var_I['below1'] < var_I < thresholds_var_I['above1']:
-                    __matrix_row_var_D(3)
-                if thresholds_var_I['above1'] <= var_I < thresholds_var_I['above2']:
-                    __matrix_row_var_D(4)
-                if thresholds_var_I['above2'] <= var_I < thresholds_var_I['above3']:
-                    __matrix_row_var_D(5)
-                if var_I >= thresholds_var_I['above3']:
-                    __matrix_row_var_D(6)
+    :return: specific_contingency_table dict:
+        {'in_values', 'in_percentage', 'in_percentage_formatted',
+        'thresholds_var_D', 'thresholds_var_I'}
+    :rtype: dict
+    """
+
+    thresholds_var_D, thresholds_var_I = get_specific_values_and_thresholds(station, lag, n_month, start_day)
+
+    ## Calculating contingency table with absolute values
+    contingency_table = get_contingency_tables_in_values(
+        [station.var_D.specific_values], [station.var_I.specific_values],
+        [thresholds_to_list(thresholds_var_D)], [thresholds_to_list(thresholds_var_I)])[0].tolist()
+
+    return complete_specific_contingency_table(station, lag, contingency_table, thresholds_var_D, thresholds_var_I)
+
+
+def complete_specific_contingency_table(station, lag, contingency_table, thresholds_var_D, thresholds_var_I):
+    """Calculate the contingency table in percent and the values to print
+    from the contingency table in absolute values, see
+    get_specific_contingency_table
+    """
 
     # -------------------------------------------------------------------------
     # -------------------------------------------------------------------------
@@ -320,57 +261,9 @@ def get_specific_contingency_table(station, lag, n_month, start_day=None):
     # this cause division by zero and nan values
     contingency_table_in_percentage = [[i if not isnan(i) else 0 for i in c] for c in contingency_table_in_percentage]
 
-    # special case when the forecast type is 3x7, clear columns of the var I with zeros of
-    # the contingency table in absolute values for not selected categories defined in runfile
-    # for forecast type 3x7
-    if env.globals_vars.forecast_contingency_table['type'] == '3x7':
-        # init list 7x7 with zeros
-        contingency_table_3x7 = [[0] * 7] * 7
-        tags = ['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']
-        for idx_var_I in range(7):
-            # only set the real values for columns of var I for selected categories
-            # in below, and above selected and normal
-            if tags.index(env.globals_vars.probability_forecast_values[lag]['below']) == idx_var_I or \
-                            idx_var_I == 3 or \
-                            tags.index(env.globals_vars.probability_forecast_values[lag]['above']) == idx_var_I:
-                contingency_table_3x7[idx_var_I] = contingency_table[idx_var_I]
-
-        sum_per_column_CT_3x7 = matrix(contingency_table_3x7).sum(axis=1)
-        sum_per_column_CT_3x7 = [float(x) for x in sum_per_column_CT_3x7]
-        with console.redirectStdStreams():
-            contingency_table_in_percentage_3x7 \
-                = [(column / sum_per_column_CT_3x7[i] * 100).tolist()[0] for i, column in
-                   enumerate(matrix(contingency_table_3x7))]
-
-        # fix table when the value is nan (replace with zero) it is due to while it calculate the contingency
-        # table and there are not values with independent variable for one category (thresholds problem)
-        # this cause division by zero and nan values
-        contingency_table_in_percentage_3x7 = [[i if not isnan(i) else 0 for i in c] for c in
-                                               contingency_table_in_percentage_3x7]
-
     # -------------------------------------------------------------------------
-    # threshold_problem is global variable for detect problem with
-    # threshold of independent variable, if a problem is detected
-    # show message and print "nan" (this mean null value for
-    # division by zero) in contingency tabla percent in result
-    # table, jaziku show warning message and continue the process.
-
-    # convert 7 categories in 3 blocks: BELOW, NORMAL and ABOVE
-    if env.config_run.settings['class_category_analysis'] == 7:
-        sum_per_column_CT = [sum_per_column_CT[0], sum_per_column_CT[3], sum_per_column_CT[6]]
-
-    # iterate and check for each 3 blocks: BELOW, NORMAL and ABOVE
-    for index, label in enumerate([_('below'), _('normal'), _('above')]):
-        if float(sum_per_column_CT[index]) == 0 and not station.threshold_problem[index]:
-            console.msg(
-                _("\n > WARNING: The thresholds defined for var I\n"
-                  "   are not suitable in some time series for \n"
-                  "   compound analysis of '{0}' with relation to\n"
-                  "   '{1}' inside the block category '{2}'.\n"
-                  "   Is recommended review the thresholds\n"
-                  "   of two variables, or the series data .......")
-                    .format(env.var_D.TYPE_SERIES, env.var_I.TYPE_SERIES, label.upper()), color='yellow', newline=False)
-            station.threshold_problem[index] = True
+    # check the thresholds of var I with the contingency table
+    check_thresholds_problem(station, contingency_table)
 
     # -------------------------------------------------------------------------
     # -------------------------------------------------------------------------
@@ -403,13 +296,126 @@ def get_specific_contingency_table(station, lag, n_month, start_day=None):
                                   'thresholds_var_D': thresholds_var_D,
                                   'thresholds_var_I': thresholds_var_I}
 
-    # added the special contingency table in percentage for 3x7
-    if env.globals_vars.forecast_contingency_table['type'] == '3x7':
-        specific_contingency_table['in_percentage_3x7'] = contingency_table_in_percentage_3x7
-
     return specific_contingency_table
 
 
+def check_thresholds_problem(station, contingency_table):
+    """Check if the contingency table in absolute values has not values
+    in some block category of var I (BELOW, NORMAL and ABOVE).
+
+    threshold_problem is global variable for detect problem with
+    threshold of independent variable, if a problem is detected
+    show message and print "nan" (this mean null value for
+    division by zero) in contingency tabla percent in result
+    table, jaziku show warning message and continue the process.
+    """
+
+    # contingency_table[varI][varD]
+    # sum of column of all values in each category of var I
+    sum_per_column_CT = [float(x) for x in matrix(contingency_table).sum(axis=1)]
+
+    # convert 7 categories in 3 blocks: BELOW, NORMAL and ABOVE
+    if env.config_run.settings['class_category_analysis'] == 7:
+        sum_per_column_CT = [sum(sum_per_column_CT[0:3]), sum_per_column_CT[3], sum(sum_per_column_CT[4::])]
+
+    # iterate and check for each 3 blocks: BELOW, NORMAL and ABOVE
+    for index, label in enumerate([_('below'), _('normal'), _('above')]):
+        if float(sum_per_column_CT[index]) == 0 and not station.threshold_problem[index]:
+            console.msg(
+                _("\n > WARNING: The thresholds defined for var I\n"
+                  "   are not suitable in some time series for \n"
+                  "   compound analysis of '{0}' with relation to\n"
+                  "   '{1}' inside the block category '{2}'.\n"
+                  "   Is recommended review the thresholds\n"
+                  "   of two variables, or the series data .......")
+                    .format(env.var_D.TYPE_SERIES, env.var_I.TYPE_SERIES, label.upper()), color='yellow', newline=False)
+            station.threshold_problem[index] = True
+
+
+def get_slices_of_contingency_tables():
+    """Return all (lag, N-month or month, day) of the contingencies tables
+    to calculate, the day is None for N-monthly.
+    """
+    if env.var_D.is_n_monthly():
+        return [(lag, n_month, None) for lag in env.config_run.settings['lags'] for n_month in range(1, 13)]
+    if env.var_D.is_n_daily():
+        return [(lag, n_month, day) for lag in env.config_run.settings['lags'] for n_month in range(1, 13)
+                for day in get_range_analysis_interval()]
+
+
+def calculate_thresholds_of_slices(station, values_var_D, values_var_I):
+    """Calculate the thresholds of var D and var I (adjusted) for the specific
+    values of all slices of the station, the statistics for the thresholds
+    must be calculated in batch before (see calculate_statistics_in_batch).
+
+    The contingency tables are calculated after all thresholds, if there is
+    an error with the thresholds of some slice, before show it are showed
+    the warnings of the thresholds of var I of the slices before (see
+    check_thresholds_problem), as when each contingency table is calculated
+    after its thresholds.
+
+    :return: [(thresholds_var_D, thresholds_var_I), ...]
+    :rtype: list
+    """
+    thresholds = []
+    # defined if is first iteration
+    station.first_iter = True
+    for specific_values_var_D, specific_values_var_I in zip(values_var_D, values_var_I):
+        station.var_D.specific_values = specific_values_var_D
+        station.var_I.specific_values = specific_values_var_I
+        messages = io.StringIO()
+        try:
+            with redirect_stdout(messages):
+                thresholds.append(get_thresholds_adjusted(station))
+        except SystemExit:
+            station.threshold_problem = [False] * 3
+            if thresholds:
+                for contingency_table in get_contingency_tables_in_values(
+                        values_var_D[:len(thresholds)], values_var_I[:len(thresholds)],
+                        [thresholds_to_list(thresholds_var_D) for thresholds_var_D, thresholds_var_I in thresholds],
+                        [thresholds_to_list(thresholds_var_I) for thresholds_var_D, thresholds_var_I in thresholds]):
+                    check_thresholds_problem(station, contingency_table)
+            sys.stdout.write(messages.getvalue())
+            raise
+        sys.stdout.write(messages.getvalue())
+
+        if station.first_iter:
+            station.first_iter = False
+
+    return thresholds
+
+
+def calculate_contingency_tables_of_slices(station, slices):
+    """Calculate the thresholds and the contingency tables with absolute
+    values of the station for the slices (lag, N-month or month, day).
+
+    :return: ([(thresholds_var_D, thresholds_var_I), ...], contingency tables in values)
+    :rtype: tuple
+    """
+    # get the specific values for all contingencies tables
+    values_var_D = []
+    values_var_I = []
+    for lag, n_month, day in slices:
+        set_specific_values(station, lag, n_month, day)
+        values_var_D.append(station.var_D.specific_values)
+        values_var_I.append(station.var_I.specific_values)
+
+    # calculate the statistics for the thresholds of all slices in batch
+    calculate_statistics_in_batch(station.var_D, values_var_D)
+    calculate_statistics_in_batch(station.var_I, values_var_I)
+
+    # calculate the thresholds for all contingencies tables
+    thresholds = calculate_thresholds_of_slices(station, values_var_D, values_var_I)
+
+    # calculate all contingencies tables with absolute values in one batch
+    contingency_tables_in_values = get_contingency_tables_in_values(
+        values_var_D, values_var_I,
+        [thresholds_to_list(thresholds_var_D) for thresholds_var_D, thresholds_var_I in thresholds],
+        [thresholds_to_list(thresholds_var_I) for thresholds_var_D, thresholds_var_I in thresholds]).tolist()
+
+    return thresholds, contingency_tables_in_values
+
+
 def get_contingency_tables(station):
     """get all contingencies tables for all N-monthly or
     all month/day for each lag.
@@ -427,38 +433,42 @@ def get_contingency_tables(station):
     # for 3 and 7 categories there are 3 blocks: BELOW, NORMAL and ABOVE
     station.threshold_problem = [False] * 3
 
+    # all lag, N-monthly or month/day of contingencies tables
+    slices = get_slices_of_contingency_tables()
+
+    if station.climate_batch is not None:
+        # the thresholds and contingencies tables with absolute values were calculated
+        # with all stations (see batch), show the messages of this station at this point
+        sys.stdout.write(station.climate_batch['output'])
+        if station.climate_batch['exit']:
+            sys.exit()
+        thresholds = station.climate_batch['thresholds']
+        contingency_tables_in_values = station.climate_batch['contingency_tables_in_values']
+        station.climate_batch = None
+    elif station.climate_incremental is not None:
+        # the thresholds and contingencies tables with absolute values were updated
+        # only for the slices changed since the previous run (see incremental)
+        thresholds = station.climate_incremental['thresholds']
+        contingency_tables_in_values = station.climate_incremental['contingency_tables_in_values']
+        station.climate_incremental = None
+    else:
+        thresholds, contingency_tables_in_values = calculate_contingency_tables_of_slices(station, slices)
+
     # [lag][month][phenomenon][data(0,1,2)]
     # [lag][month][day][phenomenon][data(0,1,2)]
     contingency_tables = {}
-    # defined if is first iteration
-    station.first_iter = True
-    for lag in env.config_run.settings['lags']:
-
-        tmp_month_list = []
-        # all months in year 1->12
-        for n_month in range(1, 13):
-            if env.var_D.is_n_monthly():
-
-                specific_contingency_table = get_specific_contingency_table(station, lag, n_month)
-
-                tmp_month_list.append(specific_contingency_table)
-
-                if station.first_iter:
-                    station.first_iter = False
-
-            if env.var_D.is_n_daily():
-                tmp_day_list = []
-                for day in get_range_analysis_interval():
-
-                    specific_contingency_table = get_specific_contingency_table(station, lag,
-                                                                                n_month, day)
-                    tmp_day_list.append(specific_contingency_table)
-
-                    if station.first_iter:
-                        station.first_iter = False
-
-                tmp_month_list.append(tmp_day_list)
-
-        contingency_tables[lag] = tmp_month_list
+    for (lag, n_month, day), contingency_table, (thresholds_var_D, thresholds_var_I) in \
+            zip(slices, contingency_tables_in_values, thresholds):
+
+        specific_contingency_table = complete_specific_contingency_table(station, lag, contingency_table,
+                                                                         thresholds_var_D, thresholds_var_I)
+
+        tmp_month_list = contingency_tables.setdefault(lag, [])
+        if env.var_D.is_n_monthly():
+            tmp_month_list.append(specific_contingency_table)
+        if env.var_D.is_n_daily():
+            if len(tmp_month_list) < n_month:
+                tmp_month_list.append([])
+            tmp_month_list[n_month - 1].append(specific_contingency_table)
 
     station.contingency_tables = contingency_tables
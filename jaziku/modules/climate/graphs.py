@@ -33,6 +33,7 @@ from PIL import Image
 
 from jaziku import env
 from jaziku.core.analysis_interval import get_range_analysis_interval
+from jaziku.modules.climate import time_series
 from jaziku.utils import watermarking, output
 from jaziku.utils.array import minimum, maximum
 from jaziku.utils.matrix import transpose
@@ -449,11 +450,8 @@ def climate_graphs(station):
 
                 # get all values of the time series only for this N-month
                 # for all years inside the process period
-                specific_time_series = {'var_D': [], 'var_I': []}
-                for time_series in station.time_series['lag_' + str(lag)]:
-                    if time_series[0].month == n_month:
-                        specific_time_series['var_D'].append(time_series[1])
-                        specific_time_series['var_I'].append(time_series[2])
+                specific_time_series = {'var_D': time_series.get_specific_values(station, 'var_D', lag, n_month),
+                                        'var_I': time_series.get_specific_values(station, 'var_I', lag, n_month)}
 
                 create_chart()
 
@@ -468,11 +466,9 @@ def climate_graphs(station):
 
                     # get all values of the time series only for this N-month
                     # for all years inside the process period
-                    specific_time_series = {'var_D': [], 'var_I': []}
-                    for time_series in station.time_series['lag_' + str(lag)]:
-                        if time_series[0].month == n_month and time_series[0].day == day:
-                            specific_time_series['var_D'].append(time_series[1])
-                            specific_time_series['var_I'].append(time_series[2])
+                    specific_time_series = {
+                        'var_D': time_series.get_specific_values(station, 'var_D', lag, n_month, day),
+                        'var_I': time_series.get_specific_values(station, 'var_I', lag, n_month, day)}
 
                     create_chart()
 
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import numpy
+
+from jaziku import env
+from jaziku.modules.climate import store
+from jaziku.modules.climate.contingency_table import get_slices_of_contingency_tables, \
+    calculate_contingency_tables_of_slices
+from jaziku.modules.climate.thresholds import list_to_thresholds
+from jaziku.utils import console
+
+
+# ==============================================================================
+# INCREMENTAL UPDATE OF THE CLIMATE
+# When the series (e.g. the var I) gain new months, the climate of each
+# station is updated from the climate saved in the previous run (see store):
+# only the slices (lag, N-month or month/day) whose time series changed in
+# some year are calculated again (thresholds and contingency tables), the
+# contingency tables of the others slices are the same of the previous run.
+
+# climate saved in the previous run by store file, it is read before prepare
+# the output directories because these could be replaced
+previous_climate = {}
+
+
+def read_previous_climate(stations_list):
+    """Read the climate saved in the previous run of all stations (if
+    it exists) for update it incrementally.
+    """
+    for station in stations_list:
+        store_file = store.get_store_file(station)
+        if os.path.isfile(store_file):
+            previous_climate[store_file] = store.read(store_file)
+
+
+def get_changed_slices(station, previous, slices):
+    """Compare the time series of var D and var I of the station with the
+    time series saved in the previous run, and return the index of the
+    slices changed and the number of cells (lag, slice, year) changed.
+    When the previous run is not comparable (not exists, other settings,
+    other years or analog year enabled) all slices are changed.
+
+    :return: (index of slices changed, number of cells changed)
+    :rtype: tuple
+    """
+    indexed_time_series = station.indexed_time_series
+    days = [0 if day is None else day for day in indexed_time_series.days]
+
+    if previous is None or env.config_run.settings['analog_year'] or \
+            str(previous['settings']) != store.get_settings(station) or \
+            previous['frequency_data'].tolist() != [env.var_D.FREQUENCY_DATA, env.var_I.FREQUENCY_DATA] or \
+            previous['years'].tolist() != indexed_time_series.years or \
+            previous['days'].tolist() != days:
+        return list(range(len(slices))), len(slices) * len(indexed_time_series.years)
+
+    # cells [lag, month, day, year] with different values (nan is equal to nan)
+    changed_cells = numpy.zeros(indexed_time_series.values['var_D'].shape, dtype=bool)
+    for var in ['var_D', 'var_I']:
+        current_values = indexed_time_series.values[var]
+        previous_values = previous['time_series_' + var]
+        changed_cells |= ~((current_values == previous_values) |
+                           (numpy.isnan(current_values) & numpy.isnan(previous_values)))
+
+    changed_slices = []
+    number_of_changed_cells = 0
+    for idx, (lag, n_month, day) in enumerate(slices):
+        cells = changed_cells[lag, n_month - 1, indexed_time_series.days.index(day)]
+        if cells.any():
+            changed_slices.append(idx)
+            number_of_changed_cells += int(cells.sum())
+
+    return changed_slices, number_of_changed_cells
+
+
+def update_contingency_tables(station):
+    """Update the thresholds and the contingency tables with absolute
+    values of the station calculating only the slices whose time series
+    changed since the previous run, and if it is enabled (--verify-incremental)
+    compare the result with the complete calculation of all slices.
+
+    Return by reference:
+
+    :ivar STATION.climate_incremental: {'thresholds', 'contingency_tables_in_values'}
+        for all slices, used by get_contingency_tables
+    """
+
+    slices = get_slices_of_contingency_tables()
+    previous = previous_climate.pop(store.get_store_file(station), None)
+
+    changed_slices, number_of_changed_cells = get_changed_slices(station, previous, slices)
+
+    # the first slice is calculated always for show the warnings of thresholds (only
+    # showed in the first slice) as in the complete calculation
+    slices_to_calculate = sorted(set(changed_slices) | {0})
+    thresholds_calculated, contingency_tables_calculated = \
+        calculate_contingency_tables_of_slices(station, [slices[idx] for idx in slices_to_calculate])
+
+    if len(slices_to_calculate) == len(slices):
+        thresholds = thresholds_calculated
+        contingency_tables_in_values = contingency_tables_calculated
+    else:
+        thresholds = [(list_to_thresholds(thresholds_var_D), list_to_thresholds(thresholds_var_I))
+                      for thresholds_var_D, thresholds_var_I in zip(previous['thresholds_var_D'].tolist(),
+                                                                    previous['thresholds_var_I'].tolist())]
+        contingency_tables_in_values = previous['in_values'].tolist()
+        for idx, thresholds_of_slice, contingency_table in \
+                zip(slices_to_calculate, thresholds_calculated, contingency_tables_calculated):
+            thresholds[idx] = thresholds_of_slice
+            contingency_tables_in_values[idx] = contingency_table
+
+    console.msg(_("\n   slices updated: {0} of {1} ({2} cells lag/slice/year changed) ")
+                .format(len(changed_slices), len(slices), number_of_changed_cells), newline=False)
+
+    if env.globals_vars.arg_verify_incremental:
+        # the messages of the complete calculation were showed before
+        with console.redirectStdStreams():
+            thresholds_complete, contingency_tables_complete = \
+                calculate_contingency_tables_of_slices(station, slices)
+        different_slices = [slices[idx] for idx in range(len(slices))
+                            if thresholds[idx] != thresholds_complete[idx] or
+                            contingency_tables_in_values[idx] != contingency_tables_complete[idx]]
+        if different_slices:
+            console.msg_error(_("The incremental update of the climate of the station {0} ({1})\n"
+                                "is different to the complete calculation in the slices\n"
+                                "(lag, month, day): {2}")
+                              .format(station.name, station.code,
+                                      ', '.join([str(_slice) for _slice in different_slices])))
+        console.msg(_("(verified) "), newline=False)
+
+    station.climate_incremental = {'thresholds': thresholds,
+                                   'contingency_tables_in_values': contingency_tables_in_values}
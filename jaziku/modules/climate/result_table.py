@@ -20,7 +20,6 @@
 
 import os
 import csv
-from numpy import matrix
 from scipy import stats
 from datetime import date
 from dateutil.relativedelta import relativedelta
@@ -30,6 +29,7 @@ from jaziku.core.analysis_interval import get_range_analysis_interval
 from jaziku.modules.climate.thresholds import thresholds_to_list
 from jaziku.utils import output
 from jaziku.modules.climate import statistic_tests, time_series
+from jaziku.modules.climate.contingency_table import get_slices_of_contingency_tables
 from jaziku.utils.matrix import column
 
 
@@ -54,50 +54,18 @@ def composite_analysis(station):
         # test:
         # is significance risk analysis?
 
-        is_sig_risk_analysis = []  # [var_I][var_D]
+        idx_slice = index_of_slices[(lag, month, day if env.var_D.is_n_daily() else None)]
 
-        contingency_table_matrix = matrix(specific_contingency_table['in_values'])
-        sum_per_row = contingency_table_matrix.sum(axis=0).tolist()[0]
-        sum_per_column = contingency_table_matrix.sum(axis=1).tolist()
-        sum_contingency_table = contingency_table_matrix.sum()
+        is_sig_risk_analysis = [[_('yes') if is_sig else _('no') for is_sig in column_risk_analysis]
+                                for column_risk_analysis in is_sig_risk_analysis_of_slices[idx_slice]]  # [var_I][var_D]
 
-        for c, column_table in enumerate(specific_contingency_table['in_values']):
-            column_risk_analysis = []
-            for r, Xi in enumerate(column_table):
-                M = sum_per_column[c]
-                n = sum_per_row[r]
-                N = sum_contingency_table
-                X = stats.hypergeom.cdf(Xi, N, M, n)
-                Y = stats.hypergeom.sf(Xi, N, M, n, loc=1)
-                if X <= 0.1 or Y <= 0.1:
-                    column_risk_analysis.append(_('yes'))
-                else:
-                    column_risk_analysis.append(_('no'))
-
-            is_sig_risk_analysis.append(column_risk_analysis)
-
-        if env.var_D.is_n_monthly():
-            # get values of var D and I from this lag and month
-            var_D_values = time_series.get_specific_values(station, 'var_D', lag, month)
-
-            var_I_values = time_series.get_specific_values(station, 'var_I', lag, month)
-
-        if env.var_D.is_n_daily():
-            # get values of var D and I from this lag, month and day
-            var_D_values = time_series.get_specific_values(station, 'var_D', lag, month, day)
-
-            var_I_values = time_series.get_specific_values(station, 'var_I', lag, month, day)
-
-        # calculate pearson correlation of var_D and var_I
-        pearson = stats.pearsonr(var_D_values, var_I_values)[0]
-        # significance correlation
-        singr, T_test, t_crit \
-            = statistic_tests.significance_correlation(rho=0, r=pearson, n=len(station.common_period) + 1, alpha=0.05,
-                                                       side=0)
+        # pearson correlation of var_D and var_I and its significance
+        pearson = pearson_of_slices[idx_slice]
+        singr = singr_of_slices[idx_slice]
 
         # contingency test
-        Observed, Expected, test_stat, crit_value, df, p_value, alpha \
-            = statistic_tests.contingency_test(specific_contingency_table['in_values'], None, 0.9, -1)
+        test_stat = test_stat_of_slices[idx_slice]
+        p_value = p_value_of_slices[idx_slice]
 
         # calculate the correlation of contingency table
         chi_cdf = 1 - p_value
@@ -179,6 +147,37 @@ def composite_analysis(station):
 
         return pearson, is_sig_risk_analysis
 
+    # the correlations, risk analysis and contingency test of all slices
+    # (lag, month, day) of the station evaluated at once
+    slices = get_slices_of_contingency_tables()
+    index_of_slices = dict((slice_, idx_slice) for idx_slice, slice_ in enumerate(slices))
+    contingency_tables_in_values = []
+    for lag, month, day in slices:
+        if env.var_D.is_n_monthly():
+            contingency_tables_in_values.append(station.contingency_tables[lag][month - 1]['in_values'])
+        if env.var_D.is_n_daily():
+            contingency_tables_in_values.append(
+                station.contingency_tables[lag][month - 1][get_range_analysis_interval().index(day)]['in_values'])
+
+    # calculate pearson correlation of var_D and var_I for all slices
+    pearson_of_slices = []
+    for lag, month, day in slices:
+        # get values of var D and I from this lag, month and day (None for N-monthly)
+        var_D_values = time_series.get_specific_values(station, 'var_D', lag, month, day)
+        var_I_values = time_series.get_specific_values(station, 'var_I', lag, month, day)
+        pearson_of_slices.append(stats.pearsonr(var_D_values, var_I_values)[0])
+    # significance correlation
+    singr_of_slices, T_test_of_slices, t_crit \
+        = statistic_tests.significance_correlations(rho=0, r_values=pearson_of_slices,
+                                                    n=len(station.common_period) + 1, alpha=0.05, side=0)
+    singr_of_slices = singr_of_slices.tolist()
+
+    is_sig_risk_analysis_of_slices = statistic_tests.risk_analysis_tests(contingency_tables_in_values).tolist()
+    test_stat_of_slices, crit_value, df, p_value_of_slices \
+        = statistic_tests.contingency_tests(contingency_tables_in_values, 0.9, -1)
+    test_stat_of_slices = test_stat_of_slices.tolist()
+    p_value_of_slices = p_value_of_slices.tolist()
+
     for lag in env.config_run.settings['lags']:
 
         # dir and name to save the result table
@@ -18,12 +18,40 @@
 # You should have received a copy of the GNU General Public License
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy
 from math import sqrt
 from scipy import stats
 from scipy.stats import t
 
 from jaziku.utils import console
 
+# critical values calculated in the run {(distribution, probability, df): critical value}
+critical_values = {}
+
+
+def critical_value(distribution, probability, df):
+    """Return the critical value (percent point function) of the distribution
+    ('t' or 'chi2') for the probability and degree of freedom, each critical
+    value is calculated only once in the run.
+    """
+    if (distribution, probability, df) not in critical_values:
+        critical_values[(distribution, probability, df)] = \
+            {'t': stats.t, 'chi2': stats.chi2}[distribution].ppf(probability, df)
+    return critical_values[(distribution, probability, df)]
+
+
+def chi2_critical_value(df, alpha, side):
+    """Return the critical value of chi2 for the degree of freedom, the
+    significance level and the side of test.
+    """
+    if side == -1:
+        # http://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.chi2.html#scipy.stats.chi2
+        return critical_value('chi2', alpha, df)
+    elif side == 0:
+        return critical_value('chi2', 1 - alpha / 2.0, df)
+    else:
+        return critical_value('chi2', 1 - alpha, df)
+
 
 def contingency_test(O, E=None, alpha=0.10, side=0):
     """
@@ -81,20 +109,76 @@ def contingency_test(O, E=None, alpha=0.10, side=0):
     else:
         df = (m - 1) * (n - 1)
 
+    critvalue = chi2_critical_value(df, alpha, side)
     if side == -1:
-        critvalue = stats.chi2.ppf(alpha,
-                                   df)  # http://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.chi2.html#scipy.stats.chi2
         pvalue = stats.chi2.cdf(teststat, df)
-    elif side == 0:
-        critvalue = stats.chi2.ppf(1 - alpha / 2.0, df)
-        pvalue = (1.0 - stats.chi2.cdf(teststat, df))
     else:
-        critvalue = stats.chi2.ppf(1 - alpha, df)
         pvalue = 1.0 - stats.chi2.cdf(teststat, df)
 
     return O, E, teststat, critvalue, df, pvalue, alpha
 
 
+def contingency_tests(tables, alpha=0.10, side=0):
+    """Vectorized version of contingency_test for several observed values
+    matrices with the same shape (tables [table][row][column]), all tests
+    are evaluated as array operations.
+
+    Returns the test statistics, the critical value, the degree of freedom
+    and the p-values (arrays for each table).
+    """
+
+    O = numpy.asarray(tables, dtype=numpy.int64)
+    m, n = O.shape[1], O.shape[2]
+
+    # compute all marginal sums.
+    rowsum = O.sum(axis=2)
+    colsum = O.sum(axis=1)
+    Tot = rowsum.sum(axis=1).astype(float)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # Compute expected values.
+        E = (colsum[:, numpy.newaxis, :] * rowsum[:, :, numpy.newaxis]) / Tot[:, numpy.newaxis, numpy.newaxis]
+
+        # Compute statistic, the sum is sequential (row by row) as contingency_test
+        terms = numpy.where(E != 0, (E - O) ** 2 / E, 0.0)
+    teststat = numpy.cumsum(terms.reshape(len(O), -1), axis=1)[:, -1] if m * n else numpy.zeros(len(O))
+
+    # Determine critical value.
+    if m == 1:  # single row?
+        df = n - 1
+    elif n == 1:  # single column?
+        df = m - 1
+    else:
+        df = (m - 1) * (n - 1)
+
+    critvalue = chi2_critical_value(df, alpha, side)
+    if side == -1:
+        pvalue = stats.chi2.cdf(teststat, df)
+    else:
+        pvalue = 1.0 - stats.chi2.cdf(teststat, df)
+
+    return teststat, critvalue, df, pvalue
+
+
+def risk_analysis_tests(tables, alpha=0.1):
+    """Risk analysis with the hypergeometric distribution for each value
+    of several contingency tables [table][var I][var D], evaluated as array
+    operations, return a boolean array with the same shape of tables that
+    is True where the value is significant.
+    """
+
+    Xi = numpy.asarray(tables, dtype=numpy.int64)
+    # sum of values in each category of var I and var D, and total
+    M = Xi.sum(axis=2)[:, :, numpy.newaxis]
+    n = Xi.sum(axis=1)[:, numpy.newaxis, :]
+    N = Xi.sum(axis=(1, 2))[:, numpy.newaxis, numpy.newaxis]
+
+    X = stats.hypergeom.cdf(Xi, N, M, n)
+    Y = stats.hypergeom.sf(Xi, N, M, n, loc=1)
+
+    return (X <= alpha) | (Y <= alpha)
+
+
 # ----------------------------------------------------------------------------------------
 
 # the following two functions are base on:
@@ -131,16 +215,44 @@ def ttest(samplestat, se, df, alpha=0.05, side=0):
         if Ttest > 0:
             pvalue = 1 - pvalue
         pvalue *= 2
-        tcrit1 = t.ppf(alpha / 2.0, df)
-        tcrit2 = t.ppf(1 - alpha / 2.0, df)
+        tcrit1 = critical_value('t', alpha / 2.0, df)
+        tcrit2 = critical_value('t', 1 - alpha / 2.0, df)
         return pvalue, Ttest, (tcrit1, tcrit2)
     elif side == -1:
         pvalue = t.cdf(Ttest, df)
-        tcrit = t.ppf(alpha, df)
+        tcrit = critical_value('t', alpha, df)
         return pvalue, Ttest, tcrit
     else:
         pvalue = 1 - t.cdf(Ttest, df)
-        tcrit = t.ppf(1.0 - alpha, df)
+        tcrit = critical_value('t', 1.0 - alpha, df)
+        return pvalue, Ttest, tcrit
+
+
+def ttests(samplestats, se, df, alpha=0.05, side=0):
+    """Vectorized version of ttest for several sample statistics (and its
+    standard errors) with the same degree of freedom, the p-values are
+    evaluated as array operations.
+    """
+    samplestats = numpy.asarray(samplestats, dtype=float)
+    se = numpy.asarray(se, dtype=float)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        Ttest = samplestats / se
+
+    if side == 0:
+        pvalue = t.cdf(Ttest, df)
+        pvalue = numpy.where(Ttest > 0, 1 - pvalue, pvalue)
+        pvalue *= 2
+        tcrit1 = critical_value('t', alpha / 2.0, df)
+        tcrit2 = critical_value('t', 1 - alpha / 2.0, df)
+        return pvalue, Ttest, (tcrit1, tcrit2)
+    elif side == -1:
+        pvalue = t.cdf(Ttest, df)
+        tcrit = critical_value('t', alpha, df)
+        return pvalue, Ttest, tcrit
+    else:
+        pvalue = 1 - t.cdf(Ttest, df)
+        tcrit = critical_value('t', 1.0 - alpha, df)
         return pvalue, Ttest, tcrit
 
 
@@ -162,3 +274,13 @@ def significance_correlation(rho, r, n, alpha=0.05, side=0):
         # print "Berenson's example, p. 546"
         # print significance_correlation(rho, r, n, alpha, side)
         # exit()
+
+
+def significance_correlations(rho, r_values, n, alpha=0.05, side=0):
+    """Vectorized version of significance_correlation for several correlations
+    with the same number of values n.
+    """
+    r_values = numpy.asarray(r_values, dtype=float)
+    with numpy.errstate(invalid='ignore'):
+        se = numpy.sqrt((1 - r_values * r_values) / (n - 2.0))
+    return ttests(r_values - rho, se, n - 2, alpha, side)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import hashlib
+import numpy
+
+from jaziku import env
+from jaziku.core.analysis_interval import get_range_analysis_interval
+from jaziku.core.input import cache
+from jaziku.modules.climate.contingency_table import get_slices_of_contingency_tables
+from jaziku.modules.climate.thresholds import thresholds_to_list
+from jaziku.modules.climate.time_series import IndexedTimeSeries
+from jaziku.utils import console
+
+
+# ==============================================================================
+# STORE OF THE CLIMATE
+# Save the contingency tables and the time series (by lag, month and day) of
+# each station in a binary file (.npz) inside the climate directory of the
+# station (--store-climate), then the forecast can be made again only with
+# this store (--forecast-only) without read and process the series, or the
+# climate can be updated only where the series changed (--incremental).
+
+STORE_FILE = 'climate_store.npz'
+
+
+def get_store_file(station):
+    return os.path.join(env.globals_vars.CLIMATE_DIR, _('stations'), station.code + '_' + station.name, STORE_FILE)
+
+
+def get_settings(station):
+    """Return the settings that define the climate saved in the store, the
+    forecast only can use the store if these settings have not changed.
+    The limits are compared after resolve the 'default' limits with the
+    frequency data.
+    """
+    return repr((env.config_run.settings['class_category_analysis'],
+                 env.config_run.settings['analysis_interval'],
+                 list(env.config_run.settings['lags']),
+                 env.config_run.settings['process_period'],
+                 env.config_run.settings['analog_year'],
+                 env.var_D.TYPE_SERIES, env.var_I.TYPE_SERIES,
+                 env.config_run.settings['mode_calculation_series_D'],
+                 env.config_run.settings['mode_calculation_series_I'],
+                 env.config_run.settings['thresholds_var_D'],
+                 env.config_run.settings['thresholds_var_I'],
+                 cache.get_limits(station.var_D).tolist(),
+                 cache.get_limits(station.var_I).tolist(),
+                 get_source_of_var_I(station)))
+
+
+def get_source_of_var_I(station):
+    """Return 'internal' if the var I is the internal series of Jaziku,
+    else the absolute path to the file of var I.
+    """
+    if env.config_run.settings['path_to_file_var_I'] == "internal":
+        return "internal"
+    return station.var_I.file_path
+
+
+def get_fingerprint_of_series(station):
+    """Return the hash of the content of the files of var D and var I of
+    the station, the forecast only can use the store if the series have
+    not changed (the incremental update compares the series itself).
+    """
+    fingerprint = hashlib.sha1()
+    for variable in [station.var_D, station.var_I]:
+        if os.path.isfile(variable.file_path):
+            with open(variable.file_path, 'rb') as open_file:
+                fingerprint.update(open_file.read())
+    return fingerprint.hexdigest()
+
+
+def save(station):
+    """Save the contingency tables and the time series of the station in
+    the store, with the settings and the global values needed for forecast.
+    """
+
+    slices = get_slices_of_contingency_tables()
+    contingency_tables = []
+    for lag, n_month, day in slices:
+        if env.var_D.is_n_monthly():
+            contingency_tables.append(station.contingency_tables[lag][n_month - 1])
+        if env.var_D.is_n_daily():
+            contingency_tables.append(
+                station.contingency_tables[lag][n_month - 1][get_range_analysis_interval().index(day)])
+
+    indexed_time_series = station.indexed_time_series
+    days = [0 if day is None else day for day in indexed_time_series.days]
+
+    # write in temporal file and rename it, the store file is complete or not exists
+    store_file = get_store_file(station)
+    tmp_file = store_file + '.{0}.tmp.npz'.format(os.getpid())
+    try:
+        numpy.savez_compressed(
+            tmp_file,
+            settings=numpy.array(get_settings(station)),
+            fingerprint_of_series=numpy.array(get_fingerprint_of_series(station)),
+            frequency_data=numpy.array([env.var_D.FREQUENCY_DATA, env.var_I.FREQUENCY_DATA]),
+            process_period=numpy.array([env.globals_vars.PROCESS_PERIOD['start'],
+                                        env.globals_vars.PROCESS_PERIOD['end']]),
+            years=numpy.array(indexed_time_series.years),
+            days=numpy.array(days),
+            lags=numpy.array(indexed_time_series.lags),
+            time_series_var_D=indexed_time_series.values['var_D'],
+            time_series_var_I=indexed_time_series.values['var_I'],
+            in_values=numpy.array([contingency_table['in_values'] for contingency_table in contingency_tables]),
+            in_percentage=numpy.array([contingency_table['in_percentage']
+                                       for contingency_table in contingency_tables], dtype=numpy.float64),
+            thresholds_var_D=numpy.array([thresholds_to_list(contingency_table['thresholds_var_D'])
+                                          for contingency_table in contingency_tables], dtype=numpy.float64),
+            thresholds_var_I=numpy.array([thresholds_to_list(contingency_table['thresholds_var_I'])
+                                          for contingency_table in contingency_tables], dtype=numpy.float64))
+        os.replace(tmp_file, store_file)
+    except OSError:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+        console.msg_error(_("The climate of the station {0} ({1}) can't be saved in:\n{2}")
+                          .format(station.name, station.code, store_file))
+
+
+def read(store_file):
+    """Read all arrays saved in the store file.
+
+    :return: {'settings', 'frequency_data', 'process_period', 'years', ...}
+    :rtype: dict
+    """
+    with numpy.load(store_file) as stored:
+        return {name: stored[name] for name in stored.files}
+
+
+def load(station):
+    """Load the contingency tables and the time series of the station from
+    the store.
+
+    Return by reference:
+
+    :ivar STATION.contingency_tables: contingency tables (only in values
+        and in percentage) [lag][n_month][day]
+    :ivar STATION.indexed_time_series: time series of var D and var I
+    :return: the process period of the climate saved [start, end]
+    """
+
+    store_file = get_store_file(station)
+
+    if not os.path.isfile(store_file):
+        console.msg_error(_("The climate of the station {0} ({1}) was not saved,\n"
+                            "run Jaziku with the climate process and the argument\n"
+                            "--store-climate before, the file not exists:\n{2}")
+                          .format(station.name, station.code, store_file))
+
+    stored = read(store_file)
+
+    frequency_data = stored['frequency_data'].tolist()
+    process_period = stored['process_period'].tolist()
+    in_values = stored['in_values'].tolist()
+    in_percentage = stored['in_percentage'].tolist()
+
+    # set the frequency data of the climate saved for get the slices and
+    # the limits by default
+    env.var_D.set_FREQUENCY_DATA(frequency_data[0], check=False)
+    env.var_I.set_FREQUENCY_DATA(frequency_data[1], check=False)
+
+    if str(stored['settings']) != get_settings(station):
+        console.msg_error(_("The climate of the station {0} ({1}) was saved with\n"
+                            "different settings (analysis interval, lags, thresholds,\n"
+                            "limits, file of var I, etc.), run Jaziku with the climate\n"
+                            "process and the argument --store-climate again.")
+                          .format(station.name, station.code))
+    if 'fingerprint_of_series' not in stored or \
+            str(stored['fingerprint_of_series']) != get_fingerprint_of_series(station):
+        console.msg_error(_("The climate of the station {0} ({1}) was saved with\n"
+                            "others series of var D or var I (the files changed), run\n"
+                            "Jaziku with the climate process and the argument\n"
+                            "--store-climate again.")
+                          .format(station.name, station.code))
+
+    station.indexed_time_series = get_indexed_time_series(stored)
+
+    contingency_tables = {}
+    for (lag, n_month, day), contingency_table_in_values, contingency_table_in_percentage in \
+            zip(get_slices_of_contingency_tables(), in_values, in_percentage):
+        specific_contingency_table = {'in_values': contingency_table_in_values,
+                                      'in_percentage': contingency_table_in_percentage}
+
+        tmp_month_list = contingency_tables.setdefault(lag, [])
+        if env.var_D.is_n_monthly():
+            tmp_month_list.append(specific_contingency_table)
+        if env.var_D.is_n_daily():
+            if len(tmp_month_list) < n_month:
+                tmp_month_list.append([])
+            tmp_month_list[n_month - 1].append(specific_contingency_table)
+
+    station.contingency_tables = contingency_tables
+
+    return process_period
+
+
+def get_indexed_time_series(stored):
+    """Return the time series of var D and var I saved in the store.
+
+    :rtype: IndexedTimeSeries
+    """
+    days = stored['days'].tolist()
+    indexed_time_series = IndexedTimeSeries(stored['years'].tolist(),
+                                            None if days == [0] else days)
+    indexed_time_series.lags = stored['lags'].tolist()
+    indexed_time_series.values['var_D'] = stored['time_series_var_D']
+    indexed_time_series.values['var_I'] = stored['time_series_var_I']
+    return indexed_time_series
+
+
+def load_all_stations(stations_list):
+    """Load the climate saved of all stations for the forecast only, and
+    set the frequency data of var D and var I and the process period of
+    the climate saved.
+    """
+
+    console.msg(_("Loading the climate saved of all stations .......... "), newline=False)
+
+    for station in stations_list:
+        process_period = load(station)
+
+        if env.globals_vars.PROCESS_PERIOD and \
+                [env.globals_vars.PROCESS_PERIOD['start'], env.globals_vars.PROCESS_PERIOD['end']] != process_period:
+            console.msg_error(_("The climate of the station {0} ({1}) was saved with\n"
+                                "a different process period than the others stations.")
+                              .format(station.name, station.code))
+
+        env.globals_vars.PROCESS_PERIOD = {'start': process_period[0], 'end': process_period[1]}
+
+    console.msg(_("done"), color='green')
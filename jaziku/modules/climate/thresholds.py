@@ -21,12 +21,20 @@
 import copy
 import numpy
 from datetime import date
-from dateutil.relativedelta import relativedelta
 
 from jaziku import env
 from jaziku.core.input import validation
 from jaziku.utils import console, input, array
 
+# thresholds inputs parsed {repr of thresholds input: (type of thresholds, values)}
+thresholds_inputs_parsed = {}
+# thresholds calculated and shared for all slices of the station in process,
+# it is cleared for each station {key: thresholds}
+thresholds_calculated = {}
+# statistics calculated in batch for the specific values of all slices of a
+# station {type of variable: {specific values cleaned (bytes): {statistic: value}}}
+statistics_of_values = {'D': {}, 'I': {}}
+
 
 def percentiles(values, percentile_values):
     """Calculate various percentiles of input values list
@@ -48,6 +56,121 @@ def percentiles(values, percentile_values):
         raise ValueError("the 'percentile_values' should be a list with 2 or 6 values")
 
 
+def percentiles_in_batch(sorted_values, sizes, percentile_value):
+    """Calculate the percentile of each row of values sorted with the nan at
+    the end of each row (the valid values of each row are the first 'sizes'),
+    with the same linear interpolation of numpy.percentile.
+
+    :rtype: numpy.ndarray
+    """
+    rows = numpy.arange(len(sorted_values))
+    quantile = numpy.true_divide(percentile_value, 100)
+    virtual_indexes = (sizes - 1) * quantile
+    previous_indexes = numpy.floor(virtual_indexes).astype(numpy.int64)
+    next_indexes = previous_indexes + 1
+    # when the index is above the max index take the max value
+    above_bounds = virtual_indexes >= sizes - 1
+    previous_indexes[above_bounds] = sizes[above_bounds] - 1
+    next_indexes[above_bounds] = sizes[above_bounds] - 1
+    gamma = virtual_indexes - numpy.floor(virtual_indexes)
+
+    previous = sorted_values[rows, previous_indexes]
+    diff = sorted_values[rows, next_indexes] - previous
+    result = previous + diff * gamma
+    result[gamma >= 0.5] = (sorted_values[rows, next_indexes] - diff * (1 - gamma))[gamma >= 0.5]
+    return result
+
+
+def calculate_statistics_in_batch(variable, specific_values_of_slices):
+    """Calculate in batch (one vectorized pass over all slices) the statistics
+    that the thresholds defined for the variable need (percentiles, p50,
+    standard deviation or mean), for the specific values of all slices
+    (lag, month, day) of a station. The statistics are used by get_thresholds
+    for these values instead of calculate them for each slice.
+    """
+    statistics_of_values[variable.type] = {}
+
+    thresholds_input = env.config_run.settings['thresholds_var_' + variable.type]
+    if thresholds_input == "default":
+        thresholds_input = env.var_[variable.type].get_default_thresholds()
+    type_of_thresholds, values_of_thresholds = parse_thresholds_input(thresholds_input)
+
+    statistics = []
+    if type_of_thresholds == "percentile":
+        percentile_values = [input.to_float(value) for value in values_of_thresholds]
+        if False in [isinstance(value, float) and 0 <= value <= 100 for value in percentile_values]:
+            # the error is showed when calculate the thresholds
+            return
+        statistics = [('percentiles',) + tuple(percentile_values)]
+    if type_of_thresholds in ["p50", "particular_values"]:
+        statistics = ['p50']
+    if type_of_thresholds == "std_deviation":
+        statistics = ['p50', 'std']
+    if type_of_thresholds == "percentage":
+        statistics = ['mean']
+    if not statistics or not specific_values_of_slices:
+        return
+
+    # all specific values in one matrix filled with nan at the end, without nulls
+    values = numpy.full((len(specific_values_of_slices), max([len(v) for v in specific_values_of_slices] + [1])),
+                        numpy.nan)
+    for idx, specific_values in enumerate(specific_values_of_slices):
+        values[idx, :len(specific_values)] = specific_values
+    values[array.nulls(values)] = numpy.nan
+    # move the nan to the end of each row keeping the order of values
+    values = numpy.take_along_axis(values, numpy.argsort(numpy.isnan(values), axis=1, kind='stable'), axis=1)
+    sizes = (~numpy.isnan(values)).sum(axis=1)
+    sorted_values = numpy.sort(values, axis=1)
+    # sequential sum (as array.mean) ignoring the nan
+    sums = numpy.cumsum(numpy.where(numpy.isnan(values), 0.0, values), axis=1)[:, -1]
+
+    # only the slices with values, for the other the thresholds show the errors
+    with_values = sizes > 0
+    results = {}
+    for statistic in statistics:
+        if statistic == 'p50':
+            results[statistic] = percentiles_in_batch(sorted_values[with_values], sizes[with_values], 50)
+        elif statistic == 'mean':
+            results[statistic] = sums[with_values] / sizes[with_values]
+        elif statistic == 'std':
+            # by groups of slices with the same number of values for get exactly the
+            # same result of numpy.std (the pairwise sum depends on the size)
+            results[statistic] = numpy.full(with_values.sum(), numpy.nan)
+            for size in numpy.unique(sizes[with_values & (sizes > 1)]):
+                same_size = sizes[with_values] == size
+                results[statistic][same_size] = numpy.std(values[with_values][same_size, :size], axis=1, ddof=1)
+        else:
+            results[statistic] = numpy.array([percentiles_in_batch(sorted_values[with_values], sizes[with_values],
+                                                                   percentile_value)
+                                              for percentile_value in statistic[1:]]).T
+
+    for idx, row in enumerate(numpy.flatnonzero(with_values)):
+        cleaned = numpy.asarray(array.clean(specific_values_of_slices[row]), dtype=float).tobytes()
+        statistics_of_values[variable.type][cleaned] = {}
+        for statistic in statistics:
+            if statistic == 'std' and sizes[row] < 2:
+                continue
+            if statistic == 'mean':
+                value = float(results[statistic][idx])
+            elif isinstance(statistic, tuple):
+                value = list(results[statistic][idx])
+            else:
+                value = results[statistic][idx]
+            statistics_of_values[variable.type][cleaned][statistic] = value
+
+
+def get_statistic(variable, statistic, calculate):
+    """Return the statistic of the specific values cleaned of the variable
+    calculated in batch (see calculate_statistics_in_batch), or calculate
+    it if it was not calculated in batch.
+    """
+    statistics = statistics_of_values[variable.type].get(
+        numpy.asarray(variable.specific_values_cleaned, dtype=float).tobytes())
+    if statistics is not None and statistic in statistics:
+        return statistics[statistic]
+    return calculate()
+
+
 # decorator
 def thresholds_to_dict_format(func):
     """Format the thresholds to defined dictionary for
@@ -141,7 +264,17 @@ def thresholds_to_list(thresholds):
                 thresholds['above3']]
 
 
-def get_thresholds(station, variable, thresholds_input=None, process_analog_year=False):
+def list_to_thresholds(thresholds_list):
+    """Return the dictionary thresholds from a
+    ordered thresholds list (see thresholds_to_list).
+    """
+    if env.config_run.settings['class_category_analysis'] == 3:
+        return dict(zip(['below', 'above'], thresholds_list))
+    if env.config_run.settings['class_category_analysis'] == 7:
+        return dict(zip(['below3', 'below2', 'below1', 'above1', 'above2', 'above3'], thresholds_list))
+
+
+def calculate_thresholds(station, variable, thresholds_input, process_analog_year=False):
     """Calculate and return thresholds of dependent or
     independent variable, the type of threshold as
     defined by the user in station file, these may be:
@@ -189,15 +322,10 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
         # check if analog_year is inside in process period
         if env.globals_vars.PROCESS_PERIOD['start'] <= env.config_run.settings['analog_year'] <= \
                 env.globals_vars.PROCESS_PERIOD['end']:
-            _iter_date = date(env.config_run.settings['analog_year'], 1, 1)
-            specific_values_with_analog_year = []
             # get all raw values of var D only in analog year
-            while _iter_date <= date(env.config_run.settings['analog_year'], 12, 31):
-                specific_values_with_analog_year.append(variable.data[variable.date.index(_iter_date)])
-                if env.var_[variable.type].is_n_daily():  # TODO 0.10
-                    _iter_date += relativedelta(days=1)
-                if env.var_[variable.type].is_n_monthly():
-                    _iter_date += relativedelta(months=1)
+            start_idx, end_idx = variable.series.range_of_dates(date(env.config_run.settings['analog_year'], 1, 1),
+                                                                date(env.config_run.settings['analog_year'], 12, 31))
+            specific_values_with_analog_year = list(variable.data[start_idx:end_idx])
 
             # check nulls
             number_of_nulls, percentage_of_nulls = array.check_nulls(specific_values_with_analog_year)
@@ -238,7 +366,8 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
             console.msg_error(_("the percentile values of var {0} ({1}) must have "
                                 "rising values:\n\n{2}")
                               .format(variable.type, env.var_[variable.type].TYPE_SERIES, thresholds_input))
-        return percentiles(variable.specific_values_cleaned, percentile_values)
+        return get_statistic(variable, ('percentiles',) + tuple(percentile_values),
+                             lambda: percentiles(variable.specific_values_cleaned, percentile_values))
 
     @validate_thresholds(variable, force=True)
     @thresholds_to_dict_format
@@ -261,8 +390,8 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
                                 "of var {0} ({1}), must have rising values:\n\n{2}")
                               .format(variable.type, env.var_[variable.type].TYPE_SERIES, std_dev_values))
 
-        p50 = numpy.percentile(variable.specific_values_cleaned, 50)
-        std_deviation = numpy.std(variable.specific_values_cleaned, ddof=1)
+        p50 = get_statistic(variable, 'p50', lambda: numpy.percentile(variable.specific_values_cleaned, 50))
+        std_deviation = get_statistic(variable, 'std', lambda: numpy.std(variable.specific_values_cleaned, ddof=1))
 
         if env.config_run.settings['class_category_analysis'] == 3:
             return [p50 + std_dev_values[0] * std_deviation,
@@ -297,7 +426,7 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
                                 "of var {0} ({1}), must have rising values:\n\n{2}")
                               .format(variable.type, env.var_[variable.type].TYPE_SERIES, p50_values))
 
-        p50 = numpy.percentile(variable.specific_values_cleaned, 50)
+        p50 = get_statistic(variable, 'p50', lambda: numpy.percentile(variable.specific_values_cleaned, 50))
 
         if env.config_run.settings['class_category_analysis'] == 3:
             return [p50 + p50_values[0],
@@ -332,7 +461,7 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
                                 "of var {0} ({1}), must have rising values:\n\n{2}")
                               .format(variable.type, env.var_[variable.type].TYPE_SERIES, percentage_values))
 
-        _100percent = array.mean(variable.specific_values_cleaned)
+        _100percent = get_statistic(variable, 'mean', lambda: array.mean(variable.specific_values_cleaned))
 
         if env.config_run.settings['class_category_analysis'] == 3:
             return [_100percent * percentage_values[0] / 100.0,
@@ -361,7 +490,7 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
 
             # specific behavior for temperatures
             if env.var_[variable.type].TYPE_SERIES in ['TMIN', 'TMAX', 'TEMP']:
-                p50 = numpy.percentile(variable.specific_values_cleaned, 50)
+                p50 = get_statistic(variable, 'p50', lambda: numpy.percentile(variable.specific_values_cleaned, 50))
 
                 if env.config_run.settings['class_category_analysis'] == 3:
                     return [p50 + thresholds_input[0],
@@ -382,64 +511,130 @@ def get_thresholds(station, variable, thresholds_input=None, process_analog_year
     # -------------------------------------------------------------------------
     # detect and calculate thresholds
 
-    # check
-    number_of_nulls, percentage_of_nulls = array.check_nulls(variable.specific_values)
-    if percentage_of_nulls > 20 and station.first_iter:
-        console.msg(_("\n > WARNING: calculating thresholds for var {0} ({1}),\n"
-                      "   one of the time series have {2}% of nulls, more than\n"
-                      "   20% of permissive nulls. Jaziku continue but the series\n"
-                      "   could not be consistent, recommended enable 'consistent_data'\n"
-                      "   inside runfile.")
-                    .format(variable.type, env.var_[variable.type].TYPE_SERIES, percentage_of_nulls), color='yellow')
-
     # first clean specific values of null and empty elements
     variable.specific_values_cleaned = array.clean(variable.specific_values)
 
-    ## get defined thresholds on env.config_run and variable
-    if thresholds_input is None:
-        if variable.type == 'D':
-            thresholds_input = env.config_run.settings['thresholds_var_D']
-        if variable.type == 'I':
-            thresholds_input = env.config_run.settings['thresholds_var_I']
-
     # check if analog_year is defined but thresholds aren't equal to "default"
     if not process_analog_year:
         if env.config_run.settings['analog_year'] and variable.type == 'D':
             thresholds_with_analog_year_for_var_D()
 
     ## now analysis threshold input in arguments
+    type_of_thresholds, values_of_thresholds = parse_thresholds_input(thresholds_input)
+
     # if are define as default
-    if thresholds_input == "default":
+    if type_of_thresholds == "default":
         return thresholds_by_default()
 
+    # if are defined as p50+ - p50+NN
+    if type_of_thresholds == "p50":
+        return thresholds_with_p50(values_of_thresholds)
 
-    # if are defined as percentile or standard deviation (all str instance)
-    if not False in [isinstance(threshold, str) for threshold in thresholds_input]:
-
-        # if are defined as p50+ - p50+NN
-        if not False in [threshold.startswith(('p50+', 'P50+', 'p50-', 'P50-')) for threshold in thresholds_input]:
-            p50_values = [threshold[3::] for threshold in thresholds_input]
-            return thresholds_with_p50(p50_values)
-
-        # if are defined as percentile - pNN
-        if not False in [threshold.startswith(('p', 'P')) for threshold in thresholds_input]:
-            percentile_values = [threshold[1::] for threshold in thresholds_input]
-            return thresholds_with_percentiles(percentile_values)
+    # if are defined as percentile - pNN
+    if type_of_thresholds == "percentile":
+        return thresholds_with_percentiles(values_of_thresholds)
 
-        # if are defined as standard deviation - sdNN
-        if not False in [threshold.startswith(('sd', 'SD', 'Sd')) for threshold in thresholds_input]:
-            std_dev_values = [threshold[2::] for threshold in thresholds_input]
-            return thresholds_with_std_deviation(std_dev_values)
+    # if are defined as standard deviation - sdNN
+    if type_of_thresholds == "std_deviation":
+        return thresholds_with_std_deviation(values_of_thresholds)
 
-        # if are defined as percentage - NN%
-        if not False in [threshold.endswith("%") for threshold in thresholds_input]:
-            percentage_values = [threshold[0:-1] for threshold in thresholds_input]
-            return thresholds_with_percentage(percentage_values)
+    # if are defined as percentage - NN%
+    if type_of_thresholds == "percentage":
+        return thresholds_with_percentage(values_of_thresholds)
 
     # if are defined as particular values
-    if not False in [isinstance(threshold, (int, float)) for threshold in thresholds_input]:
-        return thresholds_with_particular_values(thresholds_input)
+    if type_of_thresholds == "particular_values":
+        return thresholds_with_particular_values(values_of_thresholds)
 
     # unrecognizable thresholds
     console.msg_error(_("unrecognizable thresholds '{0}' for var {1} ({2})")
                       .format(thresholds_input, variable.type, env.var_[variable.type].TYPE_SERIES))
+
+
+def parse_thresholds_input(thresholds_input):
+    """Detect the type of thresholds defined by the user and return it
+    with the values of thresholds without the prefix or suffix of the type,
+    the result is saved for parse each thresholds input only once.
+
+    :return: (type of thresholds, values) the type can be: "default", "p50",
+        "percentile", "std_deviation", "percentage", "particular_values" or
+        None if the thresholds are unrecognizable
+    :rtype: tuple
+    """
+
+    key = repr(thresholds_input)
+    if key in thresholds_inputs_parsed:
+        return thresholds_inputs_parsed[key]
+
+    parsed = (None, None)
+
+    if thresholds_input == "default":
+        parsed = ("default", None)
+
+    # if are defined as percentile or standard deviation (all str instance)
+    elif not False in [isinstance(threshold, str) for threshold in thresholds_input]:
+
+        if not False in [threshold.startswith(('p50+', 'P50+', 'p50-', 'P50-')) for threshold in thresholds_input]:
+            parsed = ("p50", [threshold[3::] for threshold in thresholds_input])
+
+        elif not False in [threshold.startswith(('p', 'P')) for threshold in thresholds_input]:
+            parsed = ("percentile", [threshold[1::] for threshold in thresholds_input])
+
+        elif not False in [threshold.startswith(('sd', 'SD', 'Sd')) for threshold in thresholds_input]:
+            parsed = ("std_deviation", [threshold[2::] for threshold in thresholds_input])
+
+        elif not False in [threshold.endswith("%") for threshold in thresholds_input]:
+            parsed = ("percentage", [threshold[0:-1] for threshold in thresholds_input])
+
+    if parsed[0] is None and not False in [isinstance(threshold, (int, float)) for threshold in thresholds_input]:
+        parsed = ("particular_values", thresholds_input)
+
+    thresholds_inputs_parsed[key] = parsed
+    return parsed
+
+
+def get_thresholds(station, variable, thresholds_input=None, process_analog_year=False):
+    """Return thresholds of dependent or independent variable (see
+    calculate_thresholds). The thresholds calculated are saved by the
+    specific values, the thresholds defined and the configuration of the
+    variable, so the slices of the station with the same values (e.g. the
+    var I in all lags) don't calculate the same thresholds again. The
+    thresholds of var D with analog year are not saved, these depend on
+    all the series of the station and not only on the specific values.
+
+    :return: thresholds dictionary (a copy, can be modified)
+    :rtype: dict
+    """
+
+    # check
+    number_of_nulls, percentage_of_nulls = array.check_nulls(variable.specific_values)
+    if percentage_of_nulls > 20 and station.first_iter:
+        console.msg(_("\n > WARNING: calculating thresholds for var {0} ({1}),\n"
+                      "   one of the time series have {2}% of nulls, more than\n"
+                      "   20% of permissive nulls. Jaziku continue but the series\n"
+                      "   could not be consistent, recommended enable 'consistent_data'\n"
+                      "   inside runfile.")
+                    .format(variable.type, env.var_[variable.type].TYPE_SERIES, percentage_of_nulls), color='yellow')
+
+    ## get defined thresholds on env.config_run and variable
+    if thresholds_input is None:
+        if variable.type == 'D':
+            thresholds_input = env.config_run.settings['thresholds_var_D']
+        if variable.type == 'I':
+            thresholds_input = env.config_run.settings['thresholds_var_I']
+
+    if env.config_run.settings['analog_year'] and variable.type == 'D':
+        return calculate_thresholds(station, variable, thresholds_input, process_analog_year)
+
+    key = (variable.type, env.var_[variable.type].TYPE_SERIES, env.config_run.settings['class_category_analysis'],
+           repr(env.config_run.settings['limits_var_' + variable.type]), repr(thresholds_input), process_analog_year,
+           numpy.asarray(variable.specific_values, dtype=float).tobytes())
+
+    if key not in thresholds_calculated:
+        thresholds_calculated[key] = calculate_thresholds(station, variable, thresholds_input, process_analog_year)
+    else:
+        # as in calculate_thresholds, the specific values cleaned of this slice
+        variable.specific_values_cleaned = array.clean(variable.specific_values)
+
+    thresholds = thresholds_calculated[key]
+    return dict(thresholds) if isinstance(thresholds, dict) else thresholds
@@ -20,14 +20,53 @@
 
 import os
 import csv
-from calendar import monthrange
+import numpy
 from datetime import date
 
 from jaziku import env
-from jaziku.core.analysis_interval import get_values_in_range_analysis_interval, get_range_analysis_interval
+from jaziku.core.analysis_interval import get_range_analysis_interval, get_range_of_index_in_years
 from jaziku.utils import array, output
 
 
+class IndexedTimeSeries(object):
+    """Container of the time series of var D and var I of a station indexed
+    as [lag, month, interval_day, year], for get the values of a specific
+    lag, month and day without scan all the time series. For n-monthly
+    analysis interval there is only one interval day (None).
+    """
+
+    def __init__(self, years, days=None):
+        self.years = list(years)
+        self.days = [None] if days is None else list(days)
+        # lags calculated
+        self.lags = []
+        shape = (3, 12, len(self.days), len(self.years))
+        self.values = {'var_D': numpy.full(shape, numpy.nan),
+                       'var_I': numpy.full(shape, numpy.nan)}
+
+    def set(self, lag, n_month, day, time_series_of_var_D, time_series_of_var_I):
+        """Set the time series of var D and var I for all years in specific
+        lag, month and day
+        """
+        idx_day = self.days.index(day)
+        self.values['var_D'][lag, n_month - 1, idx_day] = time_series_of_var_D
+        self.values['var_I'][lag, n_month - 1, idx_day] = time_series_of_var_I
+        if lag not in self.lags:
+            self.lags.append(lag)
+
+    def get(self, var, lag, n_month, day=None):
+        """Return a view of the time series (for all years) of var_D or var_I
+        in specific lag, month and day, or the dates if var is 'date'
+        """
+        if lag not in self.lags or (day or None) not in self.days:
+            return numpy.array([]) if var != 'date' else []
+
+        if var == 'date':
+            return [date(year, n_month, day or 1) for year in self.years]
+
+        return self.values[var][lag, n_month - 1, self.days.index(day or None)]
+
+
 def get_specific_values(station, var, lag, n_month, day=None):
     """Return all values of var_D, var_I or date
     inside the period to process with a specific lag,
@@ -48,17 +87,11 @@ def get_specific_values(station, var, lag, n_month, day=None):
     :rtype: list
     """
 
-    var_select = {'date': 0, 'var_D': 1, 'var_I': 2}
-    lag_select = {0: station.time_series['lag_0'], 1: station.time_series['lag_1'], 2: station.time_series['lag_2']}
-    temp_list = []
-    for line in lag_select[lag]:
-        if day:
-            if n_month == line[0].month and day == line[0].day:
-                temp_list.append(line)
-        else:
-            if n_month == line[0].month:
-                temp_list.append(line)
-    return [row[var_select[var]] for row in temp_list]
+    specific_values = station.indexed_time_series.get(var, lag, n_month, day)
+
+    if var == 'date':
+        return specific_values
+    return specific_values.tolist()
 
 
 def calculate_specific_values_of_time_series(variable, specific_values):
@@ -87,6 +120,98 @@ def calculate_specific_values_of_time_series(variable, specific_values):
         return sum(array.clean(specific_values))
 
 
+def calculate_specific_values_of_groups(variable, groups, sizes, mode_calculation=None, check_nulls=True):
+    '''Calculate the time series for several groups of specific values at once,
+    this is the vectorized version of calculate_specific_values_of_time_series
+    with the same results, each group is a row of values filled with nan at
+    the end (see array.group_by_starts).
+
+    :param variable: variable of the values
+    :type variable: Variable
+    :param groups: groups in rows filled with nan at the end
+    :type groups: numpy.ndarray
+    :param sizes: the size of each group
+    :type sizes: numpy.ndarray
+    :param mode_calculation: 'mean' or 'accumulate', by default is the mode
+        calculation series of the variable
+    :type mode_calculation: str
+    :param check_nulls: return NaN for groups with nulls great than 40%
+    :type check_nulls: bool
+
+    :return: the value of the time series for each group
+    :rtype: numpy.ndarray
+    '''
+
+    sums, number_of_nulls = array.sums_of_groups(groups, sizes)
+
+    return calculate_specific_values_of_sums(variable, sums, number_of_nulls, sizes, groups[:, 0],
+                                             mode_calculation, check_nulls)
+
+
+def calculate_specific_values_of_ranges(variable, start_idxs, end_idxs):
+    '''Calculate the time series for several ranges of values of the variable at
+    once, each range are the values between the index start and end (exclusive),
+    with the same rules and results of calculate_specific_values_of_time_series
+    (see calculate_specific_values_of_groups).
+
+    :param variable: variable of the values
+    :type variable: Variable
+    :param start_idxs: index of the first value of each range
+    :type start_idxs: numpy.ndarray
+    :param end_idxs: index after the last value of each range
+    :type end_idxs: numpy.ndarray
+
+    :return: the value of the time series for each range
+    :rtype: numpy.ndarray
+    '''
+
+    groups, sizes = array.group_by_ranges(variable.series.data, start_idxs, end_idxs)
+
+    return calculate_specific_values_of_groups(variable, groups, sizes)
+
+
+def calculate_specific_values_of_sums(variable, sums, number_of_nulls, sizes, first_values,
+                                      mode_calculation=None, check_nulls=True):
+    '''Calculate the time series of several groups of specific values from the sums,
+    number of nulls, sizes and the first value of each group (see
+    calculate_specific_values_of_groups)
+    '''
+
+    if mode_calculation is None:
+        mode_calculation = env.config_run.settings['mode_calculation_series_' + variable.type]
+
+    # calculate time series based on mode calculation series
+    if mode_calculation == 'mean':
+        number_of_values = sizes - number_of_nulls
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            values = numpy.where(number_of_values > 0, sums / number_of_values, numpy.nan)
+    if mode_calculation == 'accumulate':
+        values = numpy.array(sums, dtype=numpy.float64)
+
+    if check_nulls:
+        # check if null if over 40% (except if is 1)
+        too_many_nulls = [size > 0 and round((nulls / float(size)) * 100, 1) > 40 and nulls != 1
+                          for nulls, size in zip(number_of_nulls.tolist(), sizes.tolist())]
+        values[numpy.array(too_many_nulls, dtype=bool)] = numpy.nan
+        # if only have one value, return this
+        values[sizes == 1] = first_values[sizes == 1]
+
+    return values
+
+
+def calculate_time_series_in_years(variable, years, n_month, day=None, lag=None):
+    '''Calculate the time series of the variable for all years in specific
+    month, day or lag (see get_values_in_range_analysis_interval).
+
+    :return: the value of the time series for each year
+    :rtype: list
+    '''
+
+    start_idxs, end_idxs = get_range_of_index_in_years(variable, years, n_month, day, lag)
+
+    return calculate_specific_values_of_ranges(variable, start_idxs, end_idxs).tolist()
+
+
 def calculate_time_series(station, lags=None, makes_files=True):
     """Calculate and add dictionary to station of time series calculated for
     lags 0, 1 and 2 of var_D and var_I based on mode calculation series and
@@ -104,6 +229,7 @@ def calculate_time_series(station, lags=None, makes_files=True):
     :ivar STATION.time_series['lag_0'][[date,var_D,var_I],...]: time series calculated for lag 0 of this station
     :ivar STATION.time_series['lag_1'][[date,var_D,var_I],...]: time series calculated for lag 1 of this station
     :ivar STATION.time_series['lag_2'][[date,var_D,var_I],...]: time series calculated for lag 2 of this station
+    :ivar STATION.indexed_time_series: the same time series indexed as [lag, month, interval_day, year]
     """
     # if is None set lags defined in runfile
     lags = env.config_run.settings['lags'] if lags is None else lags
@@ -112,139 +238,103 @@ def calculate_time_series(station, lags=None, makes_files=True):
     # format list for each lag: [trim, [ date, time_series_value_of_var_D, time_series_value_of_var_I ]], ...
     station.time_series = {'lag_0': [], 'lag_1': [], 'lag_2': []}
 
-    if makes_files:
-        # directories to save lags
-        dir_lag = [os.path.join(station.climate_dir, _('time_series'), _('lag_0')),
-                   os.path.join(station.climate_dir, _('time_series'), _('lag_1')),
-                   os.path.join(station.climate_dir, _('time_series'), _('lag_2'))]
-
-    if env.var_D.is_n_monthly():
-
-        for lag in lags:
-
-            if makes_files:
-                output.make_dirs(dir_lag[lag])
-
-            # all months in year 1->12
-            for month in range(1, 13):
-                if makes_files:
-                    csv_name = os.path.join(dir_lag[lag],
-                                            _('Time_Series_lag_{0}_{1}_{2}_{3}_{4}_{5}_'
-                                              '({6}-{7}).csv')
-                                            .format(
-                                                lag, output.n_months_in_initials('D', month),
-                                                station.code, station.name, station.var_D.type_series,
-                                                station.var_I.type_series,
-                                                env.globals_vars.PROCESS_PERIOD['start'],
-                                                env.globals_vars.PROCESS_PERIOD['end']))
-
-                    if os.path.isfile(csv_name):
-                        os.remove(csv_name)
-
-                    # output write file:
-                    # [[ yyyy/month, Mean_Lag_X_var_D, Mean_Lag_X_var_I ],... ]
-                    open_file = open(csv_name, 'w')
-                    csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-
-                    # print headers
-                    csv_file.writerow([_('DATE'), _('VAR_D') + ' ({0})'.format(station.var_D.type_series),
-                                       _('VAR_I') + ' ({0})'.format(station.var_I.type_series)])
-                    csv_file.writerow(['', env.config_run.get_MODE_CALCULATION_SERIES_i18n("D"),
-                                       env.config_run.get_MODE_CALCULATION_SERIES_i18n("I")])
-
-                # iteration for all years inside process period
-                for year in range(env.globals_vars.PROCESS_PERIOD['start'], env.globals_vars.PROCESS_PERIOD['end'] + 1):
-
-                    ## calculate time series, get values and calculate the mean or accumulate the values in range analysis
-                    values_in_range_analysis_interval = get_values_in_range_analysis_interval(station.var_D, year,
-                                                                                              month)
-                    time_series_value_of_var_D = calculate_specific_values_of_time_series(station.var_D,
-                                                                                          values_in_range_analysis_interval)
-
-                    values_in_range_analysis_interval = get_values_in_range_analysis_interval(station.var_I, year,
-                                                                                              month, lag=lag)
-                    time_series_value_of_var_I = calculate_specific_values_of_time_series(station.var_I,
-                                                                                          values_in_range_analysis_interval)
+    # all years inside process period (the start days of the analysis interval exist in all months)
+    years = list(range(env.globals_vars.PROCESS_PERIOD['start'], env.globals_vars.PROCESS_PERIOD['end'] + 1))
+    station.indexed_time_series = IndexedTimeSeries(years, get_range_analysis_interval()
+                                                    if env.var_D.is_n_daily() else None)
+
+    for lag in lags:
+        # all months in year 1->12
+        for month in range(1, 13):
+            for day in station.indexed_time_series.days:
 
+                ## calculate time series, get values and calculate the mean or accumulate the values in range
+                ## analysis of var D and var I for all years inside process period
+                time_series_of_var_D = calculate_time_series_in_years(station.var_D, years, month, day, lag)
+                time_series_of_var_I = calculate_time_series_in_years(station.var_I, years, month, day, lag)
+                station.indexed_time_series.set(lag, month, day, time_series_of_var_D, time_series_of_var_I)
+
+                for year, time_series_value_of_var_D, time_series_value_of_var_I in \
+                        zip(years, time_series_of_var_D, time_series_of_var_I):
                     # add line in list: Lag_X
                     station.time_series['lag_' + str(lag)].append(
-                        [date(year, month, 1), time_series_value_of_var_D, time_series_value_of_var_I])
+                        [date(year, month, day or 1), time_series_value_of_var_D, time_series_value_of_var_I])
+
+    if makes_files:
+        save_time_series(station, lags)
+
+
+def save_time_series(station, lags=None):
+    """Makes the csv files of time series calculated for the station (see
+    calculate_time_series) for each lag and N-month or month.
+
+    :param station: station with the time series calculated
+    :type station: Station
+    """
+    # if is None set lags defined in runfile
+    lags = env.config_run.settings['lags'] if lags is None else lags
+
+    # directories to save lags
+    dir_lag = [os.path.join(station.climate_dir, _('time_series'), _('lag_0')),
+               os.path.join(station.climate_dir, _('time_series'), _('lag_1')),
+               os.path.join(station.climate_dir, _('time_series'), _('lag_2'))]
+
+    years = station.indexed_time_series.years
+
+    for lag in lags:
+        output.make_dirs(dir_lag[lag])
+
+        # all months in year 1->12
+        for month in range(1, 13):
+            if env.var_D.is_n_monthly():
+                csv_name = os.path.join(dir_lag[lag],
+                                        _('Time_Series_lag_{0}_{1}_{2}_{3}_{4}_{5}_'
+                                          '({6}-{7}).csv')
+                                        .format(
+                                            lag, output.n_months_in_initials('D', month),
+                                            station.code, station.name, station.var_D.type_series,
+                                            station.var_I.type_series,
+                                            env.globals_vars.PROCESS_PERIOD['start'],
+                                            env.globals_vars.PROCESS_PERIOD['end']))
+            if env.var_D.is_n_daily():
+                csv_name = os.path.join(dir_lag[lag],
+                                        _('Time_Series_lag_{0}_{1}_{2}_{3}_'
+                                          '{4}_{5}_{6}_({7}-{8}).csv')
+                                        .format(
+                                            lag, env.config_run.get_ANALYSIS_INTERVAL_i18n(),
+                                            output.months_in_initials(month - 1), station.code,
+                                            station.name, station.var_D.type_series,
+                                            station.var_I.type_series,
+                                            env.globals_vars.PROCESS_PERIOD['start'],
+                                            env.globals_vars.PROCESS_PERIOD['end']))
+
+            if os.path.isfile(csv_name):
+                os.remove(csv_name)
+
+            # output write file:
+            # [[ yyyy/month, Mean_Lag_X_var_D, Mean_Lag_X_var_I ],... ]
+            open_file = open(csv_name, 'w')
+            csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
+
+            # print headers
+            csv_file.writerow([_('DATE'), _('VAR_D') + ' ({0})'.format(station.var_D.type_series),
+                               _('VAR_I') + ' ({0})'.format(station.var_I.type_series)])
+            csv_file.writerow(['', env.config_run.get_MODE_CALCULATION_SERIES_i18n("D"),
+                               env.config_run.get_MODE_CALCULATION_SERIES_i18n("I")])
+
+            for day in station.indexed_time_series.days:
+                for year, time_series_value_of_var_D, time_series_value_of_var_I in \
+                        zip(years, station.indexed_time_series.get('var_D', lag, month, day).tolist(),
+                            station.indexed_time_series.get('var_I', lag, month, day).tolist()):
 
                     # add line output file csv_file
-                    if makes_files:
-                        csv_file.writerow([str(year) + "-" + output.n_monthly_int2char(month, type="D"),
-                                           output.number(time_series_value_of_var_D),
-                                           output.number(time_series_value_of_var_I)])
-
-                if makes_files:
-                    open_file.close()
-                    del csv_file
-
-    if env.var_D.is_n_daily():
-
-        for lag in lags:
-            if makes_files:
-                output.make_dirs(dir_lag[lag])
-
-            # all months in year 1->12
-            for month in range(1, 13):
-                if makes_files:
-                    csv_name = os.path.join(dir_lag[lag],
-                                            _('Time_Series_lag_{0}_{1}_{2}_{3}_'
-                                              '{4}_{5}_{6}_({7}-{8}).csv')
-                                            .format(
-                                                lag, env.config_run.get_ANALYSIS_INTERVAL_i18n(),
-                                                output.months_in_initials(month - 1), station.code,
-                                                station.name, station.var_D.type_series,
-                                                station.var_I.type_series,
-                                                env.globals_vars.PROCESS_PERIOD['start'],
-                                                env.globals_vars.PROCESS_PERIOD['end']))
-
-                    if os.path.isfile(csv_name):
-                        os.remove(csv_name)
-
-                    # output write file:
-                    # [[ yyyy/month, Mean_Lag_X_var_D, Mean_Lag_X_var_I ],... ]
-                    open_file = open(csv_name, 'w')
-                    csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-
-                    # print headers
-                    csv_file.writerow([_('DATE'), _('VAR_D') + ' ({0})'.format(station.var_D.type_series),
-                                       _('VAR_I') + ' ({0})'.format(station.var_I.type_series)])
-                    csv_file.writerow(['', env.config_run.get_MODE_CALCULATION_SERIES_i18n("D"),
-                                       env.config_run.get_MODE_CALCULATION_SERIES_i18n("I")])
-
-                for day in get_range_analysis_interval():
-
-                    # iteration for all years inside process period
-                    for year in range(env.globals_vars.PROCESS_PERIOD['start'],
-                                      env.globals_vars.PROCESS_PERIOD['end'] + 1):
-
-                        # test if day exist in month and year
-                        if day > monthrange(year, month)[1]:
-                            continue
-
-                        ## calculate time series, get values and calculate the mean or accumulate the values in range analysis of var D
-                        values_in_range_analysis_interval = get_values_in_range_analysis_interval(station.var_D, year,
-                                                                                                  month, day, lag)
-                        time_series_value_of_var_D = calculate_specific_values_of_time_series(station.var_D,
-                                                                                              values_in_range_analysis_interval)
-
-                        values_in_range_analysis_interval = get_values_in_range_analysis_interval(station.var_I, year,
-                                                                                                  month, day, lag)
-                        time_series_value_of_var_I = calculate_specific_values_of_time_series(station.var_I,
-                                                                                              values_in_range_analysis_interval)
-
-                        # add line in list: Lag_X
-                        station.time_series['lag_' + str(lag)].append(
-                            [date(year, month, day), time_series_value_of_var_D, time_series_value_of_var_I])
-
-                        # add line output file csv_file
-                        if makes_files:
-                            csv_file.writerow([str(year) + "-" + output.fix_zeros(month)
-                                               + "-" + output.fix_zeros(day),
-                                               output.number(time_series_value_of_var_D),
-                                               output.number(time_series_value_of_var_I)])
-                if makes_files:
-                    open_file.close()
-                    del csv_file
+                    if env.var_D.is_n_monthly():
+                        date_text = str(year) + "-" + output.n_monthly_int2char(month, type="D")
+                    else:
+                        date_text = str(year) + "-" + output.fix_zeros(month) + "-" + output.fix_zeros(day)
+                    csv_file.writerow([date_text,
+                                       output.number(time_series_value_of_var_D),
+                                       output.number(time_series_value_of_var_I)])
+
+            open_file.close()
+            del csv_file
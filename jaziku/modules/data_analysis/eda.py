@@ -36,6 +36,7 @@ from PIL import Image
 from scipy import stats
 
 from jaziku import env
+from jaziku.core import journal
 from jaziku.core.station import Station
 from jaziku.core.analysis_interval import get_values_in_range_analysis_interval, locate_day_in_analysis_interval, \
     get_range_analysis_interval, adjust_data_of_variables, get_text_of_frequency_data
@@ -62,6 +63,13 @@ def main(stations_list):
     global eda_dir
     eda_dir = os.path.join(env.globals_vars.DATA_ANALYSIS_DIR, _('Exploratory_Data_Analysis'))
 
+    # each stage of EDA is a unit in the journal, the stages completed in the run resumed are skipped
+    inputs_of_stages = journal.get_inputs(stations_list)
+
+    def run_stage(stage, function, *args):
+        return journal.run('eda', 'eda ' + stage, function, (stations_list,) + args,
+                           directories=[env.globals_vars.DATA_ANALYSIS_DIR], inputs=inputs_of_stages)
+
     # -------------------------------------------------------------------------
     # DESCRIPTIVE STATISTICS
     # -------------------------------------------------------------------------
@@ -158,7 +166,7 @@ def main(stations_list):
     if env.config_run.settings['graphics']:
         if Station.stations_processed > 1:
             with console.redirectStdStreams():
-                descriptive_statistic_graphs(stations_list)
+                run_stage('descriptive_statistic_graphs', descriptive_statistic_graphs)
             console.msg(_("done"), color='green')
         else:
             console.msg(_("partial\n > WARNING: There is only one station for process\n"
@@ -195,7 +203,7 @@ def main(stations_list):
     if env.config_run.settings['graphics']:
         console.msg(_("Graphs inspection of series .......................... "), newline=False)
         with console.redirectStdStreams():
-            graphs_inspection_of_series(stations_list)
+            run_stage('graphs_inspection_of_series', graphs_inspection_of_series)
         console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -203,7 +211,7 @@ def main(stations_list):
 
     console.msg(_("Climatology .......................................... "), newline=False)
     with console.redirectStdStreams():
-        climatology(stations_list)
+        run_stage('climatology', climatology)
     console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -221,7 +229,7 @@ def main(stations_list):
     if env.config_run.settings['graphics']:
         console.msg(_("Scatter plots of series .............................. "), newline=False)
         with console.redirectStdStreams():
-            return_msg = scatter_plots_of_series(stations_list)
+            return_msg = run_stage('scatter_plots_of_series', scatter_plots_of_series)
         if return_msg is True:
             console.msg(_("done"), color='green')
         else:
@@ -233,7 +241,7 @@ def main(stations_list):
     if env.config_run.settings['graphics']:
         console.msg(_("Frequency histogram .................................. "), newline=False)
         with console.redirectStdStreams():
-            frequency_histogram(stations_list)
+            run_stage('frequency_histogram', frequency_histogram)
         console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -241,7 +249,7 @@ def main(stations_list):
 
     console.msg(_("Shapiro Wilks test ................................... "), newline=False)
 
-    shapiro_wilks_test(stations_list)
+    run_stage('shapiro_wilks_test', shapiro_wilks_test)
     console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -254,7 +262,7 @@ def main(stations_list):
 
     console.msg(_("Outliers ............................................. "), newline=False)
     # with console.redirectStdStreams():  #TODO maybe this no need activade, need when check thresholds
-    outliers(stations_list)
+    run_stage('outliers', outliers)
 
     if Station.stations_processed > 50:
         console.msg(_("partial\n > WARNING: The maximum limit for make the box-plot of\n"
@@ -278,7 +286,7 @@ def main(stations_list):
 
     console.msg(_("AutoCorrelation ...................................... "), newline=False)
     with console.redirectStdStreams():
-        correlation(stations_list, type_correlation='auto')
+        run_stage('autocorrelation', correlation, 'auto')
     console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -286,7 +294,7 @@ def main(stations_list):
 
     console.msg(_("CrossCorrelation ..................................... "), newline=False)
     with console.redirectStdStreams():
-        return_msg = correlation(stations_list, type_correlation='cross')
+        return_msg = run_stage('crosscorrelation', correlation, 'cross')
     if return_msg is True:
         console.msg(_("done"), color='green')
     else:
@@ -300,7 +308,7 @@ def main(stations_list):
     output.make_dirs(anomaly_dir)
 
     console.msg(_("Anomaly .............................................. "), newline=False)
-    anomaly(stations_list)
+    run_stage('anomaly', anomaly)
     console.msg(_("done"), color='green')
 
 
@@ -322,7 +330,7 @@ def main(stations_list):
 
     console.msg(_("Periodogram .......................................... "), newline=False)
     with console.redirectStdStreams():
-        periodogram(stations_list)
+        run_stage('periodogram', periodogram)
     console.msg(_("done"), color='green')
 
     # -------------------------------------------------------------------------
@@ -334,7 +342,7 @@ def main(stations_list):
 
     console.msg(_("Wavelets ............................................. "), newline=False)
     with console.redirectStdStreams():
-        wavelets(stations_list)
+        run_stage('wavelets', wavelets)
     console.msg(_("done"), color='green')
 
 
@@ -349,7 +357,7 @@ def main(stations_list):
 
     console.msg(_("Homogeneity .......................................... "), newline=False)
     with console.redirectStdStreams():
-        return_msg = homogeneity(stations_list)
+        return_msg = run_stage('homogeneity', homogeneity)
     if return_msg is True:
         console.msg(_("done"), color='green')
     else:
@@ -374,7 +382,7 @@ def convert_stations(stations_list, filling=False, force_same_frequencies=False,
         return stations_list_adjusted_filling
 
     if filling:
-        stations_list_adjusted_filling = copy.deepcopy(stations_list)
+        stations_list_adjusted_filling = [station.snapshot() for station in stations_list]
         ## make periodogram for var D (all stations)
         # Filling the variables for all stations before convert
         for station in stations_list_adjusted_filling:
@@ -387,7 +395,7 @@ def convert_stations(stations_list, filling=False, force_same_frequencies=False,
                                  messages=messages)
         return stations_list_adjusted_filling
     if not filling:
-        stations_list_adjusted = copy.deepcopy(stations_list)
+        stations_list_adjusted = [station.snapshot() for station in stations_list]
         # Adjust the same frequency data for the two time series
         adjust_data_of_variables(stations_list_adjusted, force_same_frequencies=force_same_frequencies,
                                  messages=messages)
@@ -592,7 +600,7 @@ def analysis_the_best_periods_to_process(stations_list):
                         end_date_var = date(period["end_year"], 12, 1)
 
                     station_data = station.var_D.data[
-                                   station.var_D.date.index(start_date_var):station.var_D.date.index(end_date_var) + 1]
+                                   station.var_D.series.index(start_date_var):station.var_D.series.index(end_date_var) + 1]
 
                     # number of valid nulls for var D of the station
                     nulls_in_analysis_period, \
@@ -703,7 +711,7 @@ def graphs_inspection_of_series(stations_list):
 
                 # add point in end of X-axis
                 x.append(x[-1] + relativedelta(months=1))
-                y.append(var.data[var.date.index(x[-1])])
+                y.append(var.series.get(x[-1]))
 
                 if type == 'special_I':
                     len_x = len(station.var_D.date_in_process_period)
@@ -866,7 +874,7 @@ def get_climatology_data(station, freq=None):
     and others results
     '''
 
-    _station = copy.deepcopy(station)
+    _station = station.snapshot()
     original_FREQUENCY_DATA = env.var_D.FREQUENCY_DATA
 
     if freq is None:
@@ -879,6 +887,7 @@ def get_climatology_data(station, freq=None):
     _station.var_D.calculate_data_date_and_nulls_in_period()
     var_D_data = _station.var_D.data_in_process_period
     var_D_date = _station.var_D.date_in_process_period
+    var_D_series = _station.var_D.series
 
     env.var_D.set_FREQUENCY_DATA(original_FREQUENCY_DATA, check=False)
 
@@ -906,7 +915,7 @@ def get_climatology_data(station, freq=None):
             for day in range_analysis_interval:
                 interannual_values = []
                 for year in range(env.globals_vars.PROCESS_PERIOD['start'], env.globals_vars.PROCESS_PERIOD['end'] + 1):
-                    value_in_this_year = var_D_data[var_D_date.index(date(year, month, day))]
+                    value_in_this_year = var_D_series.get(date(year, month, day))
                     interannual_values.append(value_in_this_year)
                 interannual_values = array.clean(interannual_values)
                 y_mean.append(array.mean(interannual_values))
@@ -1577,15 +1586,13 @@ def outliers(stations_list):
     original_freq_data_var_I = env.var_I.FREQUENCY_DATA
 
     def clone_and_transform_station(station, convert_var_D_to, convert_var_I_to):
-        station_copy = copy.deepcopy(station)
+        station_copy = station.snapshot()
         if convert_var_D_to:
-            env.var_D.set_FREQUENCY_DATA(original_freq_data_var_D, check=False)
             station_copy.var_D.convert2(convert_var_D_to)
             if station_copy.var_D.was_converted:
                 env.var_D.set_FREQUENCY_DATA(convert_var_D_to, check=False)
             station_copy.var_D.calculate_data_date_and_nulls_in_period()
         if convert_var_I_to:
-            env.var_I.set_FREQUENCY_DATA(original_freq_data_var_I, check=False)
             station_copy.var_I.convert2(convert_var_I_to)
             if station_copy.var_I.was_converted:
                 env.var_I.set_FREQUENCY_DATA(convert_var_I_to, check=False)
@@ -1902,7 +1909,7 @@ def correlation(stations_list, type_correlation):
     original_freq_data_var_I = env.var_I.FREQUENCY_DATA
 
     # Adjust the same frequency data for the two time series
-    stations_list_copy = copy.deepcopy(stations_list)
+    stations_list_copy = [station.snapshot() for station in stations_list]
     if type_correlation == 'auto':
         adjust_data_of_variables(stations_list_copy, force_same_frequencies=False, messages=False)
     if type_correlation == 'cross':
@@ -1964,20 +1971,15 @@ def correlation(stations_list, type_correlation):
         if type_correlation == 'cross':
             # TODO: check if move overlaps between the series is correctly
 
-            data_X = copy.deepcopy(station.var_D.data_in_process_period)
-            data_Y = copy.deepcopy(station.var_I.data_in_process_period)
+            data_X = station.var_D.data_in_process_period
+            data_Y = station.var_I.data_in_process_period
 
             # clear NaN values in par, if one of two series have a NaN value
             # delete this NaN and corresponding value in the other series in
             # the same location
-            idx_to_clean = []
-            for idx in range(len(data_X)):
-                if env.globals_vars.is_valid_null(data_X[idx]) or env.globals_vars.is_valid_null(data_Y[idx]):
-                    idx_to_clean.append(idx)
-            idx_to_clean.reverse()
-            for idx in idx_to_clean:
-                del data_X[idx]
-                del data_Y[idx]
+            valid_pairs = ~(array.nulls(data_X) | array.nulls(data_Y))
+            data_X = data_X[valid_pairs]
+            data_Y = data_Y[valid_pairs]
 
             # -------------------------------------------------------------------------
             # calculate pearson for -1 to -24 lags
@@ -2187,7 +2189,7 @@ def correlation(stations_list, type_correlation):
 def homogeneity(stations_list):
     return_msg = True
 
-    stations_list_copy = copy.deepcopy(stations_list)
+    stations_list_copy = [station.snapshot() for station in stations_list]
 
     # -------------------------------------------------------------------------
     # Mann-Whitney-Wilcoxon Test (MWW)
@@ -2380,11 +2382,11 @@ def anomaly(stations_list):
     original_freq_data_var_I = env.var_I.FREQUENCY_DATA
 
     # Adjust the same frequency data for the two time series
-    stations_list_adjusted = copy.deepcopy(stations_list)
+    stations_list_adjusted = [station.snapshot() for station in stations_list]
     adjust_data_of_variables(stations_list_adjusted, messages=False)
 
     for station in stations_list_adjusted:
-        station_copy = copy.deepcopy(station)
+        station_copy = station.snapshot()
         calculate_time_series(station_copy, lags=[0], makes_files=False)
 
         # get the climatology values
@@ -2749,7 +2751,7 @@ def periodogram(stations_list):
     original_freq_data_var_I = env.var_I.FREQUENCY_DATA
 
     # stations_list_adjusted = convert_stations(stations_list, filling=True)
-    stations_list_adjusted = copy.deepcopy(stations_list)
+    stations_list_adjusted = [station.snapshot() for station in stations_list]
     ## make periodogram for var D (all stations)
     # Filling the variables for all stations before convert
     for station in stations_list_adjusted:
@@ -2858,8 +2860,8 @@ def make_wavelets(station, path_to_save, variable):
     # ax1.set_xlabel(_('Time'), env.globals_vars.graphs_axis_properties())
 
     x_idx_years1 = [d for d in station.var_[variable].date_in_process_period if d.month == 1 and d.day == 1]
-    x_idx_years = [station.var_[variable].date_in_process_period.index(d) for d in
-                   station.var_[variable].date_in_process_period if d.month == 1 and d.day == 1]
+    x_idx_years = [idx for idx, d in enumerate(station.var_[variable].date_in_process_period)
+                   if d.month == 1 and d.day == 1]
     x_years = [d.year for d in station.var_[variable].date_in_process_period if d.month == 1 and d.day == 1]
 
     ax1.xaxis.set_ticks(x_idx_years1)
@@ -3021,7 +3023,7 @@ def wavelets(stations_list):
     original_freq_data_var_I = env.var_I.FREQUENCY_DATA
 
     # stations_list_adjusted = convert_stations(stations_list, filling=True)
-    stations_list_adjusted = copy.deepcopy(stations_list)
+    stations_list_adjusted = [station.snapshot() for station in stations_list]
     ## make periodogram for var D (all stations)
     # Filling the variables for all stations before convert
     for station in stations_list_adjusted:
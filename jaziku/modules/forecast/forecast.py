@@ -19,11 +19,12 @@
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-from numpy import matrix
+import numpy
 from clint.textui import colored
 
 from jaziku import env
 from jaziku.core.analysis_interval import get_range_analysis_interval
+from jaziku.modules.forecast import scenarios
 from jaziku.modules.forecast.graphs import forecast_graphs
 from jaziku.modules.maps.data import forecast_data_for_maps
 from jaziku.utils import console, output
@@ -45,33 +46,170 @@ def pre_process():
                                                    os.path.abspath(os.path.dirname(env.globals_vars.arg_runfile)))))
 
     # reset forecast_var_I_lag_N
+    probability_forecast_values = get_probability_forecast_values(
+        dict([(lag, env.config_run.settings['forecast_var_I_lag_' + str(lag)]) for lag in env.globals_vars.ALL_LAGS]),
+        env.globals_vars.forecast_contingency_table['type'])
+    for lag in env.globals_vars.ALL_LAGS:
+        env.globals_vars.probability_forecast_values[lag] = probability_forecast_values[lag]
+
+    # the scenario defined in runfile and the scenarios from the file of scenarios
+    env.globals_vars.forecast_scenarios = [{
+        'name': env.config_run.settings['forecast_date']['text'],
+        'forecast_date': env.config_run.settings['forecast_date'],
+        'type': env.globals_vars.forecast_contingency_table['type'],
+        'probability_forecast_values': env.globals_vars.probability_forecast_values}]
+
+    if env.globals_vars.arg_forecast_scenarios:
+        for scenario in scenarios.read_scenarios(env.globals_vars.arg_forecast_scenarios):
+            scenario['probability_forecast_values'] = \
+                get_probability_forecast_values(scenario.pop('forecast_var_I'), scenario['type'])
+            env.globals_vars.forecast_scenarios.append(scenario)
+
+        print(_("\nScenarios for forecast: {0}").format(len(env.globals_vars.forecast_scenarios)))
+        for scenario in env.globals_vars.forecast_scenarios:
+            print("   " + colored.cyan(scenario['name']))
+
+
+def get_probability_forecast_values(forecast_var_I, forecast_type):
+    """Get the probability_forecast_values by lag (see globals_vars) from
+    the values of var I for forecast by lag, as 'forecast_var_I_lag_N'
+    in runfile.
+
+    :param forecast_var_I: {lag: values of var I}
+    :type forecast_var_I: dict
+    :param forecast_type: type of forecast contingency table: '3x3', '3x7' or '7x7'
+    :type forecast_type: str
+
+    :return: {lag: {tag: value}}
+    :rtype: dict
+    """
+
+    probability_forecast_values = {}
+
     if env.config_run.settings['class_category_analysis'] == 3:
-        for lag in env.globals_vars.ALL_LAGS:
+        for lag in forecast_var_I:
 
-            env.globals_vars.probability_forecast_values[lag] = {}
+            probability_forecast_values[lag] = {}
             for idx, tag in enumerate(['below', 'normal', 'above']):
-                env.globals_vars.probability_forecast_values[lag][tag] \
-                    = env.config_run.settings['forecast_var_I_lag_' + str(lag)][idx]
+                probability_forecast_values[lag][tag] = forecast_var_I[lag][idx]
 
     if env.config_run.settings['class_category_analysis'] == 7:
-        for lag in env.globals_vars.ALL_LAGS:
+        for lag in forecast_var_I:
 
-            env.globals_vars.probability_forecast_values[lag] = {}
+            probability_forecast_values[lag] = {}
             for idx, tag in enumerate(['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']):
-                env.globals_vars.probability_forecast_values[lag][tag] \
-                    = env.config_run.settings['forecast_var_I_lag_' + str(lag)][idx]
+                probability_forecast_values[lag][tag] = forecast_var_I[lag][idx]
 
-            if env.globals_vars.forecast_contingency_table['type'] == '3x7':
+            if forecast_type == '3x7':
                 for tag in ['below3', 'below2', 'below1']:
-                    if env.globals_vars.probability_forecast_values[lag][tag] != '':
-                        env.globals_vars.probability_forecast_values[lag]['below'] = tag
+                    if probability_forecast_values[lag][tag] != '':
+                        probability_forecast_values[lag]['below'] = tag
                     else:
-                        del env.globals_vars.probability_forecast_values[lag][tag]
+                        del probability_forecast_values[lag][tag]
                 for tag in ['above3', 'above2', 'above1']:
-                    if env.globals_vars.probability_forecast_values[lag][tag] != '':
-                        env.globals_vars.probability_forecast_values[lag]['above'] = tag
+                    if probability_forecast_values[lag][tag] != '':
+                        probability_forecast_values[lag]['above'] = tag
                     else:
-                        del env.globals_vars.probability_forecast_values[lag][tag]
+                        del probability_forecast_values[lag][tag]
+
+    return probability_forecast_values
+
+
+def get_contingency_table_for_forecast_date(station, lag, forecast_date, forecast_type):
+    """Get the contingency table in percentage for this lag and the forecast
+    date of the station. If the forecast type is 3x7 each category of var I
+    is in percentage by itself, from the contingency table in values.
+    """
+
+    if env.var_D.is_n_monthly():
+        contingency_table = station.contingency_tables[lag][forecast_date['month'] - 1]
+    if env.var_D.is_n_daily():
+        day = get_range_analysis_interval().index(forecast_date['day'])
+        contingency_table = station.contingency_tables[lag][forecast_date['month'] - 1][day]
+
+    if forecast_type != '3x7':
+        return contingency_table['in_percentage']
+
+    in_values = numpy.array(contingency_table['in_values'], dtype=float)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        in_percentage = in_values / in_values.sum(axis=1)[:, numpy.newaxis] * 100
+    # fix table when the value is nan (replace with zero)
+    in_percentage[numpy.isnan(in_percentage)] = 0
+
+    return in_percentage
+
+
+def calculate_probabilities_of_var_D(station, forecast_scenarios):
+    """Calculate the probabilities of var D for all lags and all scenarios at
+    once. The contingency tables of the forecast date of each scenario are
+    stacked in a tensor [scenario, lag, var I, var D] and the rows of var I
+    are grouped in below, normal and above with the probabilities of var I
+    of the scenario:
+
+        3x3 -> the rows of below, normal and above
+        3x7 -> the rows of the categories selected in below, normal and above
+        7x7 -> the sum of the rows of below3-below1, normal and above1-above3
+               and the sum of its probabilities
+
+    then the probabilities of var D are the contraction of the grouped
+    contingency tables with the probabilities of var I (in the same order
+    of the sums of the forecast for one lag and scenario).
+
+    :param station: station with the contingency tables calculated
+    :type station: Station
+    :param forecast_scenarios: scenarios for forecast (see env.globals_vars.forecast_scenarios)
+    :type forecast_scenarios: list
+
+    :return: [scenario][lag][tag]: probabilities of var D
+    :rtype: list
+    """
+
+    lags = env.config_run.settings['lags']
+    if env.config_run.settings['class_category_analysis'] == 3:
+        tags = ['below', 'normal', 'above']
+    if env.config_run.settings['class_category_analysis'] == 7:
+        tags = ['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']
+
+    # contingency tables for the forecast date of each scenario, convert from percentage to 0-1
+    CT_for_forecast_date = numpy.array(
+        [[get_contingency_table_for_forecast_date(station, lag, scenario['forecast_date'], scenario['type'])
+          for lag in lags] for scenario in forecast_scenarios], dtype=float) / 100.0
+
+    # grouped contingency tables [scenario, lag, group, var D] and probabilities of var I [scenario, lag, group]
+    CT_grouped = numpy.empty(CT_for_forecast_date.shape[0:2] + (3, len(tags)))
+    probability_var_I = numpy.empty(CT_for_forecast_date.shape[0:2] + (3,))
+
+    for idx_scenario, scenario in enumerate(forecast_scenarios):
+        for idx_lag, lag in enumerate(lags):
+            CT = CT_for_forecast_date[idx_scenario, idx_lag]
+            values = scenario['probability_forecast_values'][lag]
+
+            # when there are 3 categories
+            if scenario['type'] == '3x3':
+                CT_grouped[idx_scenario, idx_lag] = CT
+                probability_var_I[idx_scenario, idx_lag] = [values['below'], values['normal'], values['above']]
+
+            # when there are 7 categories but only 3 values for the categories in forecast options
+            if scenario['type'] == '3x7':
+                CT_grouped[idx_scenario, idx_lag] = CT[[tags.index(values['below']), 3, tags.index(values['above'])]]
+                probability_var_I[idx_scenario, idx_lag] = \
+                    [values[values['below']], values['normal'], values[values['above']]]
+
+            # when there are 7 categories and 7 values for the categories in forecast options
+            if scenario['type'] == '7x7':
+                CT_grouped[idx_scenario, idx_lag] = [CT[0] + CT[1] + CT[2], CT[3], CT[4] + CT[5] + CT[6]]
+                probability_var_I[idx_scenario, idx_lag] = \
+                    [values['below3'] + values['below2'] + values['below1'],
+                     values['normal'],
+                     values['above1'] + values['above2'] + values['above3']]
+
+    prob_var_D = CT_grouped[:, :, 0] * probability_var_I[:, :, 0, numpy.newaxis] + \
+                 CT_grouped[:, :, 1] * probability_var_I[:, :, 1, numpy.newaxis] + \
+                 CT_grouped[:, :, 2] * probability_var_I[:, :, 2, numpy.newaxis]
+
+    return [dict([(lag, dict(zip(tags, prob_var_D_of_lag)))
+                  for lag, prob_var_D_of_lag in zip(lags, prob_var_D_of_scenario)])
+            for prob_var_D_of_scenario in prob_var_D.tolist()]
 
 
 def process(station):
@@ -82,6 +220,7 @@ def process(station):
     Return by reference:
 
     :ivar STATION.prob_var_D[lag][tag]: probabilities of var D
+    :ivar STATION.prob_var_D_of_scenarios[scenario][lag][tag]: probabilities of var D for all scenarios
     """
 
     # console message
@@ -90,81 +229,12 @@ def process(station):
     console.msg(_("   making forecast for date: ") + env.config_run.settings['forecast_date']['text'] + ' ...',
                 color="cyan", newline=False)
 
-    prob_var_D = {}
-
-    for lag in env.config_run.settings['lags']:
-
-        prob_var_D[lag] = {}
-
-        # get the contingency table for this lag and the specific forecast date set in runfile,
-        # if 'risk_analysis' is enabled, check first if the value for the forecast date is significant
-        # else put zero value. If the forecast type is 3x7 get the special contingency table in percentage
-        # only with values in selected categories
-        if env.globals_vars.forecast_contingency_table['type'] == '3x7':
-            in_percentage = 'in_percentage_3x7'
-        else:
-            in_percentage = 'in_percentage'
-        if env.var_D.is_n_monthly():
-            CT_for_forecast_date = \
-            station.contingency_tables[lag][env.config_run.settings['forecast_date']['month'] - 1][in_percentage]
-        if env.var_D.is_n_daily():
-            month = env.config_run.settings['forecast_date']['month']
-            day = get_range_analysis_interval().index(env.config_run.settings['forecast_date']['day'])
-            CT_for_forecast_date = station.contingency_tables[lag][month - 1][day][in_percentage]
-
-        # convert from percentage to 0-1
-        CT_for_forecast_date = (matrix(CT_for_forecast_date) / 100.0).tolist()
-
-        # when there are 3 categories
-        if env.globals_vars.forecast_contingency_table['type'] == '3x3':
-            for idx_varD, tag in enumerate(['below', 'normal', 'above']):
-                prob_var_D[lag][tag] = \
-                    (CT_for_forecast_date[0][idx_varD] * env.globals_vars.probability_forecast_values[lag]['below']) + \
-                    (CT_for_forecast_date[1][idx_varD] * env.globals_vars.probability_forecast_values[lag]['normal']) + \
-                    (CT_for_forecast_date[2][idx_varD] * env.globals_vars.probability_forecast_values[lag]['above'])
-
-        # when there are 7 categories but only 3 values for the categories in forecast options
-        if env.globals_vars.forecast_contingency_table['type'] == '3x7':
-            tags = ['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']
-            forecast_position_selected_below = env.globals_vars.probability_forecast_values[lag]['below']
-            forecast_var_I_selected_below = env.globals_vars.probability_forecast_values[lag][
-                forecast_position_selected_below]
-
-            forecast_var_I_selected_normal = env.globals_vars.probability_forecast_values[lag]['normal']
-
-            forecast_position_selected_above = env.globals_vars.probability_forecast_values[lag]['above']
-            forecast_var_I_selected_above = env.globals_vars.probability_forecast_values[lag][
-                forecast_position_selected_above]
-
-            for idx_varD, tag in enumerate(['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']):
-                prob_var_D[lag][tag] = \
-                    (CT_for_forecast_date[tags.index(forecast_position_selected_below)][
-                         idx_varD] * forecast_var_I_selected_below) + \
-                    (CT_for_forecast_date[3][idx_varD] * forecast_var_I_selected_normal) + \
-                    (CT_for_forecast_date[tags.index(forecast_position_selected_above)][
-                         idx_varD] * forecast_var_I_selected_above)
-
-        # when there are 7 categories and 7 values for the categories in forecast options
-        if env.globals_vars.forecast_contingency_table['type'] == '7x7':
-            for idx_varD, tag in enumerate(['below3', 'below2', 'below1', 'normal', 'above1', 'above2', 'above3']):
-                prob_var_D[lag][tag] = \
-                    ((CT_for_forecast_date[0][idx_varD] +
-                      CT_for_forecast_date[1][idx_varD] +
-                      CT_for_forecast_date[2][idx_varD]) * \
-                     (env.globals_vars.probability_forecast_values[lag]['below3'] +
-                      env.globals_vars.probability_forecast_values[lag]['below2'] +
-                      env.globals_vars.probability_forecast_values[lag]['below1'])) + \
-                    (CT_for_forecast_date[3][idx_varD] * \
-                     env.globals_vars.probability_forecast_values[lag]['normal']) + \
-                    ((CT_for_forecast_date[4][idx_varD] +
-                      CT_for_forecast_date[5][idx_varD] +
-                      CT_for_forecast_date[6][idx_varD]) * \
-                     (env.globals_vars.probability_forecast_values[lag]['above1'] +
-                      env.globals_vars.probability_forecast_values[lag]['above2'] +
-                      env.globals_vars.probability_forecast_values[lag]['above3']))
+    # calculate the forecast values for all lags and scenarios
+    prob_var_D_of_scenarios = calculate_probabilities_of_var_D(station, env.globals_vars.forecast_scenarios)
 
     # save the calculated forecast values in station class
-    station.prob_var_D = prob_var_D
+    station.prob_var_D = prob_var_D_of_scenarios[0]
+    station.prob_var_D_of_scenarios = prob_var_D_of_scenarios
 
     if env.config_run.settings['graphics']:
         # settings directories to save forecast graphics
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import csv
+import unicodedata
+
+from jaziku import env
+from jaziku.core.analysis_interval import get_range_analysis_interval
+from jaziku.utils import console, input, output, array
+from jaziku.utils.text import slugify
+
+
+def read_scenarios(scenarios_file):
+    """Read the scenarios for forecast from the file of scenarios, this
+    file has the same format of the forecast options in runfile, each
+    scenario start with the line 'scenario' with the name of the scenario,
+    the options not defined in the scenario are the same of runfile:
+
+        scenario;El Niño moderate
+        forecast_date;12
+        forecast_var_I_lag_0;60;30;10
+        forecast_var_I_lag_1;50;35;15
+
+    :param scenarios_file: path to file of scenarios
+    :type scenarios_file: str
+
+    :return: [{'name', 'forecast_date', 'type', 'forecast_var_I'}, ...]
+    :rtype: list
+    """
+
+    if not os.path.isfile(scenarios_file):
+        console.msg_error(_("The file of scenarios for forecast not exist: {0}").format(scenarios_file), False)
+
+    open_file = open(scenarios_file, 'r', encoding='utf-8')
+    lines = csv.reader(open_file, delimiter=env.globals_vars.INPUT_CSV_DELIMITER)
+
+    scenarios = []
+    names = [get_name_key(env.config_run.settings['forecast_date']['text'])]
+
+    for line in lines:
+        # if line is null o empty, e.g. empty but with tabs or spaces
+        if not line or not line[0].strip() or line[0].strip().startswith("#"):
+            continue
+
+        option = line[0].strip()
+        if option in ['forecast_var_I_lag_0', 'forecast_var_I_lag_1', 'forecast_var_I_lag_2']:
+            # trim all items in line and NOT clean empty items
+            items = [i.strip() for i in line[1::]]
+        else:
+            # trim all items in line and clean empty items
+            items = [i.strip() for i in line[1::] if i.strip() != '']
+
+        def error_in_line(text_error):
+            console.msg_error(_("Reading the scenario for forecast from the file of scenarios\n"
+                                "in line {0}:\n").format(lines.line_num) + ' > ' +
+                              ';'.join(line) + "\n\n" + str(text_error), False)
+
+        if option == 'scenario':
+            if not items or get_name_key(items[0]) in names:
+                error_in_line(_("The name of the scenario is empty or it is repeated, the names\n"
+                                "are compared without symbols, accents and uppercase (as the\n"
+                                "directories of the maps) and with the forecast date of runfile."))
+            names.append(get_name_key(items[0]))
+            scenarios.append({'name': items[0],
+                              'line': lines.line_num,
+                              'forecast_date': env.config_run.settings['forecast_date'],
+                              'forecast_var_I': {}})
+            continue
+
+        if not scenarios:
+            error_in_line(_("The scenario must start with the line 'scenario' and its name."))
+
+        if option == 'forecast_date':
+            scenarios[-1]['forecast_date'] = get_forecast_date(items, error_in_line)
+        elif option in ['forecast_var_I_lag_0', 'forecast_var_I_lag_1', 'forecast_var_I_lag_2']:
+            scenarios[-1]['forecast_var_I'][int(option[-1])] = get_forecast_var_I(items, error_in_line)
+        else:
+            error_in_line(_("Unknown option for the scenario: {0}").format(option))
+
+    open_file.close()
+
+    # set the type and the values of var I by lag for each scenario
+    for scenario in scenarios:
+        forecast_var_I = {}
+        types = []
+        for lag in env.globals_vars.ALL_LAGS:
+            if lag in scenario['forecast_var_I']:
+                forecast_var_I[lag], forecast_type = scenario['forecast_var_I'][lag]
+            else:
+                forecast_var_I[lag] = env.config_run.settings['forecast_var_I_lag_' + str(lag)]
+                forecast_type = env.globals_vars.forecast_contingency_table['type']
+            types.append(forecast_type)
+
+        if len(set(types)) != 1:
+            console.msg_error(_("The scenario for forecast '{0}' in the file of scenarios (line {1})\n"
+                                "has values of var I with 3 and 7 categories, all lags must\n"
+                                "have the same amount of values (this includes the values of\n"
+                                "the runfile for the lags not defined in the scenario).")
+                              .format(scenario['name'], scenario['line']), False)
+
+        scenario['type'] = types[0]
+        scenario['forecast_var_I'] = forecast_var_I
+        del scenario['line']
+
+    return scenarios
+
+
+def get_name_key(name):
+    """Return the name of the scenario as it is compared with the names of
+    the other scenarios: the directory of its maps (see forecast_data_for_maps)
+    without accents and uppercase, so two scenarios never share the directory
+    of maps in any file system.
+    """
+
+    name = unicodedata.normalize('NFKD', slugify(name)).encode('ascii', 'ignore').decode('ascii')
+    return name.lower()
+
+
+def get_forecast_date(items, error_in_line):
+    """Check and return the forecast date of the scenario, as it is
+    defined in 'forecast_date' in runfile.
+
+    :return: {'month', 'day' (only for n-daily), 'text'}
+    :rtype: dict
+    """
+
+    try:
+        if env.config_run.settings['analysis_interval'] in ['5days', '10days', '15days']:
+            forecast_date = {'month': int(items[0]), 'day': int(items[1])}
+            if len(items) != 2 or forecast_date['day'] not in get_range_analysis_interval():
+                raise ValueError
+        elif env.config_run.settings['analysis_interval'] in ['monthly']:
+            forecast_date = {'month': int(float(items[0]))}
+        else:
+            if env.config_run.settings['analysis_interval'] in ['bimonthly']:
+                forecast_date = {'month': input.bimonthly_char2int(items[0])}
+            if env.config_run.settings['analysis_interval'] in ['trimonthly']:
+                forecast_date = {'month': input.trimonthly_char2int(items[0])}
+            if forecast_date['month'] is False:
+                raise ValueError
+        if not (1 <= forecast_date['month'] <= 12):
+            raise ValueError
+    except Exception:
+        error_in_line(_("The date for forecast is invalid for {0}, it must be\n"
+                        "defined as 'forecast_date' in runfile.")
+                      .format(env.config_run.get_ANALYSIS_INTERVAL_i18n()))
+
+    if 'day' in forecast_date:
+        forecast_date['text'] = output.analysis_interval_text(forecast_date['month'], forecast_date['day'])
+    else:
+        forecast_date['text'] = output.analysis_interval_text(forecast_date['month'])
+
+    return forecast_date
+
+
+def get_forecast_var_I(items, error_in_line):
+    """Check and return the values of var I for forecast of the scenario
+    and the type of forecast contingency table, as it is defined in
+    'forecast_var_I_lag_N' in runfile.
+
+    :return: (values of var I, type)
+    :rtype: tuple
+    """
+
+    values = [input.to_float(item) for item in items]
+    valid_values = array.clean(values)
+
+    if False in [isinstance(value, (float, int)) for value in valid_values] or \
+            not (99 < sum(valid_values) < 101):
+        error_in_line(_("The values of var I for forecast must be valid values\n"
+                        "(int or float) and the sum of them must be equal to 100."))
+
+    if env.config_run.settings['class_category_analysis'] == 3 and len(valid_values) == 3:
+        return valid_values, '3x3'
+
+    if env.config_run.settings['class_category_analysis'] == 7:
+        if len(valid_values) == 7:
+            return valid_values, '7x7'
+        if len(valid_values) == 3:
+            # complete the values for the last items with ''
+            values += [''] * (7 - len(values))
+            # there must be one value in below, normal and one value in above
+            if len(values) == 7 and values[3] != '' and array.clean(values[0:3]) and array.clean(values[4:7]):
+                return values, '3x7'
+
+    error_in_line(_("The values of var I for forecast should be a {0} valid\n"
+                    "values (int or float).").format('3' if env.config_run.settings['class_category_analysis'] == 3
+                                                     else '3 or 7'))
@@ -28,6 +28,72 @@ from jaziku.utils import output
 from jaziku.utils.text import slugify
 
 
+# rows for the maps data files of the station processed inside a process of
+# the pool, these are not saved in env.globals_vars.maps_data but returned to
+# the main process for add them in the same order of stations (see write_rows_for_maps)
+rows_for_maps = None
+
+
+def set_header_for_maps(csv_name, header):
+    """Start the maps data file in env.globals_vars.maps_data with the header,
+    the file is written after processing all stations (see save_maps_data).
+
+    :param csv_name: maps data file
+    :type csv_name: str
+    :param header: header of the maps data file
+    :type header: list
+    """
+
+    env.globals_vars.maps_data[csv_name] = [list(header)]
+
+
+def write_row_for_maps(csv_name, row):
+    """Add the row in the end of the maps data file in env.globals_vars.maps_data,
+    or save it in rows_for_maps if the station is processed inside a process
+    of the pool. The values are saved as text as in the csv file.
+
+    :param csv_name: maps data file
+    :type csv_name: str
+    :param row: values of the station for the maps data file
+    :type row: list
+    """
+
+    row = ['' if value is None else str(value) for value in row]
+
+    if rows_for_maps is not None:
+        rows_for_maps.append((csv_name, row))
+        return
+
+    env.globals_vars.maps_data[csv_name].append(row)
+
+
+def write_rows_for_maps(rows):
+    """Add the rows for the maps data files returned by a process of
+    the pool, in the same order that these were added.
+
+    :param rows: [(csv_name, row), ...]
+    :type rows: list
+    """
+
+    for csv_name, row in rows:
+        write_row_for_maps(csv_name, row)
+
+
+def save_maps_data():
+    """Write all maps data files (climate and forecast) saved in
+    env.globals_vars.maps_data with the rows of all stations processed.
+    """
+
+    for csv_name, rows in env.globals_vars.maps_data.items():
+        # the directory could not exist if the station was restored from the cache of stages
+        output.make_dirs(os.path.dirname(csv_name))
+        open_file = open(csv_name, 'w')
+        csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
+        csv_file.writerows(rows)
+        open_file.close()
+        del csv_file
+
+
 def calculate_index(category, values):
     """Calculate the index based on values and the category, the index value
     is the maximum value predominating the values near to normal.
@@ -157,13 +223,9 @@ def climate_data_for_maps(station):
                             del _list
 
                         # write header
-                        open_file = open(csv_name, 'w')
-                        csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-                        csv_file.writerow([_('CODE'), _('LAT'), _('LON'), _('PEARSON')] + \
-                                          env.var_D.get_generic_labels(upper=True) + \
-                                          [sum_header, _('INDEX'), _('INDEX POSITION')])
-                        open_file.close()
-                        del csv_file
+                        set_header_for_maps(csv_name, [_('CODE'), _('LAT'), _('LON'), _('PEARSON')] + \
+                                                      env.var_D.get_generic_labels(upper=True) + \
+                                                      [sum_header, _('INDEX'), _('INDEX POSITION')])
 
                         categories_list.append(csv_name)
 
@@ -200,13 +262,9 @@ def climate_data_for_maps(station):
                                 del _list
 
                             # write header
-                            open_file = open(csv_name, 'w')
-                            csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-                            csv_file.writerow([_('CODE'), _('LAT'), _('LON'), _('PEARSON')] + \
-                                              env.var_D.get_generic_labels(upper=True) + \
-                                              [sum_header, _('INDEX'), _('INDEX POSITION')])
-                            open_file.close()
-                            del csv_file
+                            set_header_for_maps(csv_name, [_('CODE'), _('LAT'), _('LON'), _('PEARSON')] + \
+                                                          env.var_D.get_generic_labels(upper=True) + \
+                                                          [sum_header, _('INDEX'), _('INDEX POSITION')])
 
                             categories_list.append(csv_name)
 
@@ -242,32 +300,28 @@ def climate_data_for_maps(station):
 
                     # write new row in file
                     csv_name = env.globals_vars.maps_files_climate[lag][month - 1][category_var_I]
-                    open_file = open(csv_name, 'a')
-                    csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
                     if env.config_run.settings['class_category_analysis'] == 3:
-                        csv_file.writerow([station.code, output.number(station.lat), output.number(station.lon),
-                                           output.number(station.pearson_list[lag][month - 1]),
-                                           output.number(values_CT['below']),
-                                           output.number(values_CT['normal']),
-                                           output.number(values_CT['above']),
-                                           output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
-                                           output.number(index['value']),
-                                           env.globals_vars.categories(index['position'])])
+                        write_row_for_maps(csv_name, [station.code, output.number(station.lat), output.number(station.lon),
+                                                      output.number(station.pearson_list[lag][month - 1]),
+                                                      output.number(values_CT['below']),
+                                                      output.number(values_CT['normal']),
+                                                      output.number(values_CT['above']),
+                                                      output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
+                                                      output.number(index['value']),
+                                                      env.globals_vars.categories(index['position'])])
                     if env.config_run.settings['class_category_analysis'] == 7:
-                        csv_file.writerow([station.code, output.number(station.lat), output.number(station.lon),
-                                           output.number(station.pearson_list[lag][month - 1]),
-                                           output.number(values_CT['below3']),
-                                           output.number(values_CT['below2']),
-                                           output.number(values_CT['below1']),
-                                           output.number(values_CT['normal']),
-                                           output.number(values_CT['above1']),
-                                           output.number(values_CT['above2']),
-                                           output.number(values_CT['above3']),
-                                           output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
-                                           output.number(index['value']),
-                                           env.globals_vars.categories(index['position'])])
-                    open_file.close()
-                    del csv_file
+                        write_row_for_maps(csv_name, [station.code, output.number(station.lat), output.number(station.lon),
+                                                      output.number(station.pearson_list[lag][month - 1]),
+                                                      output.number(values_CT['below3']),
+                                                      output.number(values_CT['below2']),
+                                                      output.number(values_CT['below1']),
+                                                      output.number(values_CT['normal']),
+                                                      output.number(values_CT['above1']),
+                                                      output.number(values_CT['above2']),
+                                                      output.number(values_CT['above3']),
+                                                      output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
+                                                      output.number(index['value']),
+                                                      env.globals_vars.categories(index['position'])])
 
             if env.var_D.is_n_daily():
                 for idx_day, day in enumerate(get_range_analysis_interval()):
@@ -299,138 +353,129 @@ def climate_data_for_maps(station):
 
                         # write new row in file
                         csv_name = env.globals_vars.maps_files_climate[lag][month - 1][idx_day][category_var_I]
-                        open_file = open(csv_name, 'a')
-                        csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
                         if env.config_run.settings['class_category_analysis'] == 3:
-                            csv_file.writerow([station.code, output.number(station.lat), output.number(station.lon),
-                                               output.number(station.pearson_list[lag][month - 1][idx_day]),
-                                               output.number(values_CT['below']),
-                                               output.number(values_CT['normal']),
-                                               output.number(values_CT['above']),
-                                               output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
-                                               output.number(index['value']),
-                                               env.globals_vars.categories(index['position'])])
+                            write_row_for_maps(csv_name, [station.code, output.number(station.lat), output.number(station.lon),
+                                                          output.number(station.pearson_list[lag][month - 1][idx_day]),
+                                                          output.number(values_CT['below']),
+                                                          output.number(values_CT['normal']),
+                                                          output.number(values_CT['above']),
+                                                          output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
+                                                          output.number(index['value']),
+                                                          env.globals_vars.categories(index['position'])])
                         if env.config_run.settings['class_category_analysis'] == 7:
-                            csv_file.writerow([station.code, output.number(station.lat), output.number(station.lon),
-                                               output.number(station.pearson_list[lag][month - 1][idx_day]),
-                                               output.number(values_CT['below3']),
-                                               output.number(values_CT['below2']),
-                                               output.number(values_CT['below1']),
-                                               output.number(values_CT['normal']),
-                                               output.number(values_CT['above1']),
-                                               output.number(values_CT['above2']),
-                                               output.number(values_CT['above3']),
-                                               output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
-                                               output.number(index['value']),
-                                               env.globals_vars.categories(index['position'])])
-                        open_file.close()
-                        del csv_file
+                            write_row_for_maps(csv_name, [station.code, output.number(station.lat), output.number(station.lon),
+                                                          output.number(station.pearson_list[lag][month - 1][idx_day]),
+                                                          output.number(values_CT['below3']),
+                                                          output.number(values_CT['below2']),
+                                                          output.number(values_CT['below1']),
+                                                          output.number(values_CT['normal']),
+                                                          output.number(values_CT['above1']),
+                                                          output.number(values_CT['above2']),
+                                                          output.number(values_CT['above3']),
+                                                          output.number(sum([float(value_CT) for value_CT in list(values_CT.values())])),
+                                                          output.number(index['value']),
+                                                          env.globals_vars.categories(index['position'])])
 
 
 def forecast_data_for_maps(station):
-    """Create maps data csv file (one by lag) for climate with all information required
+    """Create maps data csv file (one by lag) for forecast with all information required
     for make particular maps, this included stations names, latitude, longitude, the
     probabilities values, the index, the position the index and others. This file
     contain all stations processed but this function process one station each time
-    and the data is added in the end of file.
+    and the data is added in the end of file. There are maps data files for each
+    scenario for forecast (see env.globals_vars.forecast_scenarios).
     """
 
-    # -------------------------------------------------------------------------
-    # create maps plots files for forecast process, only once
-
-    # run only the first time
-    if not env.globals_vars.maps_files_forecast:
-
-        maps_dir = os.path.join(
-            env.globals_vars.FORECAST_DIR, _('maps'),
-            env.config_run.get_ANALYSIS_INTERVAL_i18n(),
-            slugify(env.config_run.settings['forecast_date']['text']))
-
-        output.make_dirs(maps_dir)
-
-        if env.var_D.is_n_monthly():
-            lags_list = {}
-            # define maps data files and directories
-            for lag in env.config_run.settings['lags']:
-
-                # write the headers in file
-                csv_name = os.path.join(maps_dir, _('Map_Data_lag_{0}_{1}.csv')
-                                        .format(lag, output.tri_months_in_initials(
-                    env.config_run.settings['forecast_date']['month'] - 1)))
-
-                if os.path.isfile(csv_name):
-                    os.remove(csv_name)
-
-                open_file = open(csv_name, 'w')
-                csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-                csv_file.writerow([_('CODE'), _('LAT'), _('LON'), _('FORECAST_DATE')] + \
-                                  env.var_D.get_generic_labels(upper=True) + \
-                                  [_('SUM'), _('INDEX'), _('INDEX POSITION')])
-                open_file.close()
-                del csv_file
-
-                lags_list[lag] = csv_name
-            env.globals_vars.maps_files_forecast[env.config_run.settings['forecast_date']['text']] = lags_list
-
-        if env.var_D.is_n_daily():
-            lags_list = {}
-            # define maps data files and directories
-            for lag in env.config_run.settings['lags']:
-
-                # write the headers in file
-                csv_name = os.path.join(maps_dir, _('Map_Data_lag_{0}_{1}.csv')
-                                        .format(lag, slugify(env.config_run.settings['forecast_date']['text'])))
-
-                if os.path.isfile(csv_name):
-                    os.remove(csv_name)
-
-                open_file = open(csv_name, 'w')
-                csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
-                csv_file.writerow([_('CODE'), _('LAT'), _('LON'), _('FORECAST_DATE')] + \
-                                  env.var_D.get_generic_labels(upper=True) + \
-                                  [_('SUM'), _('INDEX'), _('INDEX POSITION')])
-                open_file.close()
-                del csv_file
-
-                lags_list[lag] = csv_name
-            env.globals_vars.maps_files_forecast[env.config_run.settings['forecast_date']['text']] = lags_list
-
-    # process station by lag
-    for lag in env.config_run.settings['lags']:
+    for scenario, prob_var_D in zip(env.globals_vars.forecast_scenarios, station.prob_var_D_of_scenarios):
 
-        index = calculate_index(env.config_run.settings['class_category_analysis'], station.prob_var_D[lag])
+        forecast_date = scenario['forecast_date']
 
-        # write new row in file
-        csv_name = env.globals_vars.maps_files_forecast[env.config_run.settings['forecast_date']['text']][lag]
-        open_file = open(csv_name, 'a')
-        csv_file = csv.writer(open_file, delimiter=env.globals_vars.OUTPUT_CSV_DELIMITER)
+        # -------------------------------------------------------------------------
+        # create maps plots files for forecast process, only once
 
-        if env.config_run.settings['class_category_analysis'] == 3:
-            csv_file.writerow([station.code,
-                               output.number(station.lat),
-                               output.number(station.lon),
-                               env.config_run.settings['forecast_date']['text'],
-                               output.number(station.prob_var_D[lag]['below']),
-                               output.number(station.prob_var_D[lag]['normal']),
-                               output.number(station.prob_var_D[lag]['above']),
-                               output.number(sum(station.prob_var_D[lag].values())),
-                               output.number(index['value']),
-                               env.globals_vars.categories(index['position'])])
-
-        if env.config_run.settings['class_category_analysis'] == 7:
-            csv_file.writerow([station.code,
-                               output.number(station.lat),
-                               output.number(station.lon),
-                               env.config_run.settings['forecast_date']['text'],
-                               output.number(station.prob_var_D[lag]['below3']),
-                               output.number(station.prob_var_D[lag]['below2']),
-                               output.number(station.prob_var_D[lag]['below1']),
-                               output.number(station.prob_var_D[lag]['normal']),
-                               output.number(station.prob_var_D[lag]['above1']),
-                               output.number(station.prob_var_D[lag]['above2']),
-                               output.number(station.prob_var_D[lag]['above3']),
-                               output.number(sum(station.prob_var_D[lag].values())),
-                               output.number(index['value']),
-                               env.globals_vars.categories(index['position'])])
-        open_file.close()
-        del csv_file
+        # run only the first time for this scenario
+        if scenario['name'] not in env.globals_vars.maps_files_forecast:
+
+            maps_dir = os.path.join(
+                env.globals_vars.FORECAST_DIR, _('maps'),
+                env.config_run.get_ANALYSIS_INTERVAL_i18n(),
+                slugify(scenario['name']))
+
+            output.make_dirs(maps_dir)
+
+            if env.var_D.is_n_monthly():
+                lags_list = {}
+                # define maps data files and directories
+                for lag in env.config_run.settings['lags']:
+
+                    # write the headers in file
+                    csv_name = os.path.join(maps_dir, _('Map_Data_lag_{0}_{1}.csv')
+                                            .format(lag, output.tri_months_in_initials(
+                        forecast_date['month'] - 1)))
+
+                    if os.path.isfile(csv_name):
+                        os.remove(csv_name)
+
+                    set_header_for_maps(csv_name, [_('CODE'), _('LAT'), _('LON'), _('FORECAST_DATE')] + \
+                                                  env.var_D.get_generic_labels(upper=True) + \
+                                                  [_('SUM'), _('INDEX'), _('INDEX POSITION')])
+
+                    lags_list[lag] = csv_name
+                env.globals_vars.maps_files_forecast[scenario['name']] = \
+                    {'forecast_date': forecast_date['text'], 'files': lags_list}
+
+            if env.var_D.is_n_daily():
+                lags_list = {}
+                # define maps data files and directories
+                for lag in env.config_run.settings['lags']:
+
+                    # write the headers in file
+                    csv_name = os.path.join(maps_dir, _('Map_Data_lag_{0}_{1}.csv')
+                                            .format(lag, slugify(forecast_date['text'])))
+
+                    if os.path.isfile(csv_name):
+                        os.remove(csv_name)
+
+                    set_header_for_maps(csv_name, [_('CODE'), _('LAT'), _('LON'), _('FORECAST_DATE')] + \
+                                                  env.var_D.get_generic_labels(upper=True) + \
+                                                  [_('SUM'), _('INDEX'), _('INDEX POSITION')])
+
+                    lags_list[lag] = csv_name
+                env.globals_vars.maps_files_forecast[scenario['name']] = \
+                    {'forecast_date': forecast_date['text'], 'files': lags_list}
+
+        # process station by lag
+        for lag in env.config_run.settings['lags']:
+
+            index = calculate_index(env.config_run.settings['class_category_analysis'], prob_var_D[lag])
+
+            # write new row in file
+            csv_name = env.globals_vars.maps_files_forecast[scenario['name']]['files'][lag]
+
+            if env.config_run.settings['class_category_analysis'] == 3:
+                write_row_for_maps(csv_name, [station.code,
+                                              output.number(station.lat),
+                                              output.number(station.lon),
+                                              forecast_date['text'],
+                                              output.number(prob_var_D[lag]['below']),
+                                              output.number(prob_var_D[lag]['normal']),
+                                              output.number(prob_var_D[lag]['above']),
+                                              output.number(sum(prob_var_D[lag].values())),
+                                              output.number(index['value']),
+                                              env.globals_vars.categories(index['position'])])
+
+            if env.config_run.settings['class_category_analysis'] == 7:
+                write_row_for_maps(csv_name, [station.code,
+                                              output.number(station.lat),
+                                              output.number(station.lon),
+                                              forecast_date['text'],
+                                              output.number(prob_var_D[lag]['below3']),
+                                              output.number(prob_var_D[lag]['below2']),
+                                              output.number(prob_var_D[lag]['below1']),
+                                              output.number(prob_var_D[lag]['normal']),
+                                              output.number(prob_var_D[lag]['above1']),
+                                              output.number(prob_var_D[lag]['above2']),
+                                              output.number(prob_var_D[lag]['above3']),
+                                              output.number(sum(prob_var_D[lag].values())),
+                                              output.number(index['value']),
+                                              env.globals_vars.categories(index['position'])])
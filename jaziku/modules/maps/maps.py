@@ -26,6 +26,7 @@ import numpy
 from subprocess import call
 
 from jaziku import env
+from jaziku.core import journal
 from jaziku.core.analysis_interval import get_range_analysis_interval
 from jaziku.modules.maps import interpolation
 from jaziku.modules.maps.ncl import make_ncl_probabilistic_map, make_ncl_deterministic_map
@@ -113,17 +114,20 @@ def process(grid):
     def process_map():
         # add counter of maps created in this grid
         Grid.maps_created_in_grid += 1
+        # each map is a unit in the journal, the map completed in the run resumed is skipped
+        map_file = os.path.join(base_path, base_file + ".png")
+        journal.run('map', 'map ' + os.path.relpath(map_file, env.globals_vars.OUTPUT_DIR), make_map, (),
+                    objects=[grid], files=[map_file],
+                    inputs=(env.globals_vars.maps_data[file_map_points], map_type, message_warning))
+        # delete temporal directory
+        shutil.rmtree(tmp_dir)
+
+    def make_map():
         # copy matrix from base_matrix
         matrix = base_matrix.copy()
-        # read values from saved file and set points on matrix
-        open_file = open(file_map_points, 'rb')
-        csv_file = csv.reader(open_file, delimiter=env.globals_vars.INPUT_CSV_DELIMITER)
-        first_line = True
+        # read values from maps data (saved for the file) and set points on matrix
         marks_stations = []
-        for line in csv_file:
-            if first_line:
-                first_line = False
-                continue
+        for line in env.globals_vars.maps_data[file_map_points][1::]:
 
             # get lat and lon from Map_Data
             latitude = input.to_float(line[1])
@@ -182,9 +186,6 @@ def process(grid):
 
             marks_stations.append([latitude, longitude, index, index_position])
 
-        open_file.close()
-        del csv_file
-
         if map_type == _("probabilistic"):
 
             # save matrix for interpolation
@@ -280,9 +281,6 @@ def process(grid):
             os.remove(base_path_file + ".png")
         shutil.move(tmp_path_file + ".png", base_path)
 
-        # delete temporal directory
-        shutil.rmtree(tmp_dir)
-
         del matrix
 
     grid.if_running = {"climate": False, "correlation": False, "forecast": False}
@@ -543,11 +541,16 @@ def process(grid):
 
             print(_("Processing {map_type} maps for forecast:").format(map_type=map_type))
 
-            # console message
-            console.msg("   {0} ... ".format(env.config_run.settings['forecast_date']['text']), newline=False)
-
             # walking file by file of maps directory and make interpolation and map for each file
-            for forecast_date in env.globals_vars.maps_files_forecast:
+            for scenario_name, maps_files in env.globals_vars.maps_files_forecast.items():
+
+                forecast_date = maps_files['forecast_date']
+
+                # console message, the name of the scenario of runfile is its forecast date
+                if scenario_name == forecast_date:
+                    console.msg("   {0} ... ".format(forecast_date), newline=False)
+                else:
+                    console.msg("   {0} ({1}) ... ".format(scenario_name, forecast_date), newline=False)
 
                 for lag in env.config_run.settings['lags']:
                     # show only once
@@ -557,7 +560,7 @@ def process(grid):
                         message_warning = False
 
                     # file where saved points for plot map
-                    file_map_points = env.globals_vars.maps_files_forecast[forecast_date][lag]
+                    file_map_points = maps_files['files'][lag]
                     # save matrix for interpolation
                     base_path = os.path.join(os.path.dirname(file_map_points), grid.grid_name)
                     if env.config_run.settings['class_category_analysis'] == 7:
@@ -589,7 +592,7 @@ def process(grid):
 
                     process_map()
 
-            console.msg(_("done"), color='green')
+                console.msg(_("done"), color='green')
         grid.if_running["forecast"] = False
 
     del base_matrix
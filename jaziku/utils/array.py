@@ -18,7 +18,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
 
-from math import isnan
+import numpy
 from jaziku import env
 
 from jaziku.env import globals_vars
@@ -110,3 +110,104 @@ def check_nulls(values):
     percentage_of_nulls = round((number_of_nulls / float((len(values)))) * 100, 1)
 
     return number_of_nulls, percentage_of_nulls
+
+
+def nulls(values):
+    """Return a boolean array with True where the values are valid nulls,
+    this is the vectorized version of globals_vars.is_valid_null.
+
+    :param values: values to check the nulls
+    :type values: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    """
+
+    values = numpy.asarray(values, dtype=numpy.float64)
+    with numpy.errstate(invalid='ignore'):
+        return numpy.isnan(values) | numpy.isin(numpy.trunc(values), globals_vars.OLD_VALID_NULL)
+
+
+def group_by_starts(values, starts):
+    """Split the values in contiguous groups that start in the index
+    in starts, return the groups in rows of a matrix filled with
+    nan at the end of each row (for the groups shorter) and the size
+    of each group.
+
+    :param values: values to split in groups
+    :type values: numpy.ndarray
+    :param starts: index of start of each group (sorted)
+    :type starts: numpy.ndarray
+
+    :return: groups (matrix), sizes
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+
+    values = numpy.asarray(values, dtype=numpy.float64)
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    if len(starts) == 0:
+        return numpy.empty((0, 0)), numpy.empty(0, dtype=numpy.int64)
+
+    sizes = numpy.diff(numpy.append(starts, len(values)))
+
+    groups = numpy.full((len(starts), sizes.max()), numpy.nan)
+    rows = numpy.repeat(numpy.arange(len(starts)), sizes)
+    columns = numpy.arange(starts[0], len(values)) - numpy.repeat(starts, sizes)
+    groups[rows, columns] = values[starts[0]:]
+
+    return groups, sizes
+
+
+def group_by_ranges(values, start_idxs, end_idxs):
+    """Return the values of each range, between the index start and end
+    (exclusive), in rows of a matrix filled with nan at the end of each row
+    (for the ranges shorter) and the size of each range. The ranges can
+    overlap.
+
+    :param values: values of the ranges
+    :type values: numpy.ndarray
+    :param start_idxs: index of the first value of each range
+    :type start_idxs: numpy.ndarray
+    :param end_idxs: index after the last value of each range
+    :type end_idxs: numpy.ndarray
+
+    :return: groups (matrix), sizes
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+
+    values = numpy.asarray(values, dtype=numpy.float64)
+    start_idxs = numpy.asarray(start_idxs, dtype=numpy.int64)
+    sizes = numpy.asarray(end_idxs, dtype=numpy.int64) - start_idxs
+
+    # at least one column, for the first value of the groups
+    columns = numpy.arange(max(sizes.max(initial=0), 1))
+    inside = columns < sizes[:, numpy.newaxis]
+    groups = numpy.full(inside.shape, numpy.nan)
+    groups[inside] = values[(start_idxs[:, numpy.newaxis] + columns)[inside]]
+
+    return groups, sizes
+
+
+def sums_of_groups(groups, sizes):
+    """Sum the values of each group (row) ignoring the valid nulls, the sum
+    is sequential (as sum() of python) for get exactly the same results,
+    return too the number of nulls of each group.
+
+    :param groups: groups in rows filled with nan at the end
+    :type groups: numpy.ndarray
+    :param sizes: the size of each group
+    :type sizes: numpy.ndarray
+
+    :return: sums, number of nulls
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+
+    null_values = nulls(groups)
+    # the nan filled at the end of groups are not nulls of the group
+    number_of_nulls = null_values.sum(axis=1) - (groups.shape[1] - sizes)
+
+    if groups.shape[1] == 0:
+        return numpy.zeros(len(groups)), number_of_nulls
+
+    sums = numpy.cumsum(numpy.where(null_values, 0.0, groups), axis=1)[:, -1]
+
+    return sums, number_of_nulls
@@ -199,7 +199,8 @@ def prepare_dirs():
         if os.path.isdir(env.globals_vars.FORECAST_DIR):
             dirs_existent.append(env.globals_vars.FORECAST_DIR)
 
-    if not len(dirs_existent) == 0:
+    # the run resumed continues in the output directories (merge)
+    if not len(dirs_existent) == 0 and not env.globals_vars.arg_resume:
         console.msg(_(" > WARNING: the following output directories already exist:"), color='yellow')
         for dir in dirs_existent:
             console.msg("   " + dir, color='cyan')
@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright © 2011-2017 Xavier Corredor Ll. - IDEAM
+#
+# This file is part of Jaziku.
+#
+# Jaziku is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Jaziku is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Jaziku.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# Regression check of Jaziku against the complete calculation. Make a small
+# dataset (stations with nulls), run Jaziku with it in the complete way and
+# with each path that reads, reuses or invalidates results (see the checks
+# in main), and compare all files of the outputs (except the graphics).
+# This needs all dependencies of Jaziku, run it from the root of the
+# repository:
+#
+#     python3 tests/regression_check.py
+#
+# use --keep DIR for keep the dataset, outputs and logs of the runs, and
+# --command for run other Jaziku, e.g. --command "python3 /path/to/jaziku.py"
+
+import os
+import re
+import sys
+import time
+import shlex
+import random
+import shutil
+import filecmp
+import argparse
+import tempfile
+import subprocess
+import numpy
+from datetime import date, timedelta
+
+# the root of the repository, the Jaziku run by default
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command for run Jaziku, the arguments are added at the end
+JAZIKU_COMMAND = [sys.executable, '-c', 'from jaziku import jaziku; jaziku.main()']
+
+# the journal of the run in the output directory (see journal.JOURNAL_DIR)
+JOURNAL_DIR = '.jaziku_journal'
+
+# the hash of the files of the series saved in the store of the climate (see
+# store.get_fingerprint_of_series), it changes with the format of the files
+FINGERPRINT_OF_SERIES = 'fingerprint_of_series'
+
+RUNFILE = """####################;CONFIGURATION RUN
+data_analysis;{data_analysis}
+climate_process;enable
+forecast_process;enable
+analysis_interval;{analysis_interval}
+class_category_analysis;3
+process_period;maximum
+analog_year;disable
+lags;all
+language;en
+consistent_data;disable
+risk_analysis;enable
+graphics;disable
+categories_labels_var_I;default
+relevant_climate_categories_var_I;all
+type_var_D;PPT
+mode_calculation_series_D;default
+limits_var_D;default
+thresholds_var_D;default
+type_var_I;SOI
+mode_calculation_series_I;default
+path_to_file_var_I;{file_var_I}
+limits_var_I;default
+thresholds_var_I;default
+forecast_date;{forecast_date}
+forecast_var_I_lag_0;30;40;30
+forecast_var_I_lag_1;30;40;30
+forecast_var_I_lag_2;30;40;30
+####################;MAPS
+maps;disable
+####################;STATIONS LIST
+"""
+
+STATIONS = [('s0', 'Sta0', '4.5', '-74.1', '2500'),
+            ('s1', 'Sta1', '5.5', '-75.1', '2000'),
+            ('s2', 'Sta2', '6.5', '-73.1', '1500')]
+
+
+def external_run():
+    arguments = argparse.ArgumentParser(prog='regression_check.py',
+                                        description="Regression check of Jaziku against the complete calculation")
+    arguments.add_argument('--keep', type=str, default=None,
+                           help='directory for save the dataset, outputs and logs of the runs')
+    arguments.add_argument('--command', type=str, default=None,
+                           help='command for run Jaziku (default: the Jaziku of this repository)')
+    args = arguments.parse_args()
+
+    command = shlex.split(args.command) if args.command else JAZIKU_COMMAND
+
+    if args.keep:
+        work_dir = os.path.abspath(args.keep)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        sys.exit(main(work_dir, command))
+    else:
+        work_dir = tempfile.mkdtemp(prefix='jaziku_regression_check_')
+        try:
+            sys.exit(main(work_dir, command))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(work_dir, command=JAZIKU_COMMAND):
+    """Run all checks in the work directory, return 0 if all checks
+    passed, else 1.
+    """
+    check = RegressionCheck(work_dir, command)
+
+    print('Making the dataset and the complete runs in: ' + work_dir)
+    problems = check.prepare()
+    if problems:
+        print('complete runs ', end='')
+        show_result(problems)
+        return 1
+
+    all_passed = True
+    for name, function in [('bulk parser of the series', check.parser),
+                           ('cache of series read', check.parse_cache),
+                           ('forecast only with the climate saved', check.forecast_only),
+                           ('incremental update of the climate', check.incremental),
+                           ('cache of stages', check.stage_cache),
+                           ('resume the run killed', check.resume),
+                           ('data analysis with nulls', check.data_analysis)]:
+        print(name + ' ' + '.' * (45 - len(name)) + ' ', end='', flush=True)
+        problems = function()
+        show_result(problems)
+        all_passed = all_passed and not problems
+
+    return 0 if all_passed else 1
+
+
+def show_result(problems):
+    if not problems:
+        print('ok')
+        return
+    print('FAIL')
+    for problem in problems:
+        print('   ' + problem)
+
+
+def write_daily_series(file_path, rand, start, end, modified_from=None):
+    """Write a daily series of precipitation with 5% of nulls, the values
+    since modified_from (if it is defined) are 50% more.
+    """
+    with open(file_path, 'w') as open_file:
+        day = start
+        while day <= end:
+            scale = 1.5 if modified_from is not None and day >= modified_from else 1.0
+            if rand.random() < 0.05:
+                value = 'nan'
+            else:
+                value = '{0:.1f}'.format(rand.expovariate(0.2) * scale if rand.random() < 0.6 else 0)
+            open_file.write('{0}-{1:02d}-{2:02d}\t{3}\n'.format(day.year, day.month, day.day, value))
+            day += timedelta(days=1)
+
+
+def write_monthly_series(file_path, rand, get_value=lambda rand: rand.expovariate(0.01)):
+    """Write a monthly series with 5% of nulls, the values are returned by
+    get_value (by default of precipitation, with outliers)
+    """
+    with open(file_path, 'w') as open_file:
+        for year in range(1975, 2011):
+            for month in range(1, 13):
+                value = 'nan' if rand.random() < 0.05 else '{0:.1f}'.format(get_value(rand))
+                open_file.write('{0}-{1:02d} {2}\n'.format(year, month, value))
+
+
+def write_runfile(runfile, files, data_analysis=False, analysis_interval='5days', forecast_date='3;6',
+                  file_var_I='internal'):
+    with open(runfile, 'w') as open_file:
+        open_file.write(RUNFILE.format(data_analysis='enable' if data_analysis else 'disable',
+                                       analysis_interval=analysis_interval, forecast_date=forecast_date,
+                                       file_var_I=file_var_I))
+        for station, file_name in zip(STATIONS, files):
+            open_file.write(';'.join(station + (file_name,)) + '\n')
+
+
+def compare_dirs(reference_dir, output_dir):
+    """Compare all files (except graphics and the journal) of the output
+    directory with the reference.
+
+    :return: the files different, missing or extra
+    :rtype: list
+    """
+
+    def files_of(directory):
+        files = set()
+        for root, dirs, file_names in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != JOURNAL_DIR]
+            for file_name in file_names:
+                if not file_name.endswith('.png'):
+                    files.add(os.path.relpath(os.path.join(root, file_name), directory))
+        return files
+
+    reference_files = files_of(reference_dir)
+    output_files = files_of(output_dir)
+
+    problems = ['missing: ' + path for path in sorted(reference_files - output_files)]
+    problems += ['extra: ' + path for path in sorted(output_files - reference_files)]
+    problems += ['different: ' + path for path in sorted(reference_files & output_files)
+                 if not same_file(os.path.join(reference_dir, path), os.path.join(output_dir, path))]
+    return problems
+
+
+def same_file(reference_file, output_file):
+    """Compare the files byte by byte, except the binary files (.npz) that
+    are compared array by array without the hash of the files of the series.
+    """
+    if not reference_file.endswith('.npz'):
+        return filecmp.cmp(reference_file, output_file, shallow=False)
+
+    with numpy.load(reference_file) as reference, numpy.load(output_file) as output:
+        names = set(reference.files) - {FINGERPRINT_OF_SERIES}
+        return names == set(output.files) - {FINGERPRINT_OF_SERIES} and \
+            all(numpy.array_equal(reference[name], output[name], equal_nan=reference[name].dtype.kind == 'f')
+                for name in names)
+
+
+class RegressionCheck(object):
+    """Dataset, complete runs (references) and the checks of each path
+    """
+
+    def __init__(self, work_dir, command):
+        self.work_dir = work_dir
+        self.command = command
+        # the Jaziku of this repository for the default command
+        self.python_path = REPOSITORY_DIR if command == JAZIKU_COMMAND else None
+        self.data_dir = os.path.join(work_dir, 'data')
+        self.runfile = os.path.join(work_dir, 'runfile.csv')
+        self.runs = 0
+
+    def path(self, *names):
+        return os.path.join(self.work_dir, *names)
+
+    def write_series(self, modified=False):
+        """Write the daily series of the stations, the series modified
+        have other values in the last two years of the station s1 (e.g.
+        the data corrected) for check the invalidation of the paths.
+        """
+        for idx in range(3):
+            rand = random.Random(idx)
+            start = date(1975, 11, 1) if idx == 0 else date(1975, 1, 1)
+            end = date(2010, 2, 28) if idx == 1 else date(2010, 12, 31)
+            write_daily_series(os.path.join(self.data_dir, 'st{0}.txt'.format(idx)), rand, start, end,
+                               modified_from=date(2008, 1, 1) if modified and idx == 1 else None)
+
+    def environment(self, home=None):
+        """Return the environment for run Jaziku, with the cache in the home
+        """
+        environment = dict(os.environ, HOME=home or self.path('home'))
+        if self.python_path:
+            environment['PYTHONPATH'] = os.pathsep.join(
+                [self.python_path] + [path for path in [os.environ.get('PYTHONPATH')] if path])
+        return environment
+
+    def run(self, output_dir, *arguments, runfile=None, home=None):
+        """Run Jaziku with the arguments, the cache is in the home.
+
+        :return: (completed, log of the run)
+        :rtype: tuple
+        """
+        self.runs += 1
+        log_file = self.path('log_{0:02d}_{1}.txt'.format(self.runs, os.path.basename(output_dir)))
+        with open(log_file, 'w') as open_log:
+            subprocess.call(self.command + [runfile or self.runfile, '-f', '-o', output_dir] + list(arguments),
+                            stdin=subprocess.DEVNULL, stdout=open_log, stderr=subprocess.STDOUT,
+                            env=self.environment(home), cwd=self.work_dir)
+        with open(log_file, errors='replace') as open_log:
+            log = open_log.read()
+        return 'Process completed!' in log, log
+
+    def run_and_compare(self, reference, output_dir, *arguments, **kwargs):
+        completed, log = self.run(output_dir, *arguments, **kwargs)
+        if not completed:
+            return ['the run did not complete, see: ' + output_dir], log
+        return compare_dirs(self.path(reference), output_dir), log
+
+    def prepare(self):
+        """Make the dataset and the complete runs (without cache) of the
+        series and the series modified.
+        """
+        os.makedirs(self.data_dir)
+        os.makedirs(self.path('home'))
+        write_runfile(self.runfile, ['data/st{0}.txt'.format(idx) for idx in range(3)])
+
+        problems = []
+        self.write_series(modified=True)
+        if not self.run(self.path('ref_modified'), '--no-cache', '--store-climate')[0]:
+            problems.append('the complete run with the series modified did not complete')
+        self.write_series()
+        if not self.run(self.path('ref'), '--no-cache', '--store-climate')[0]:
+            problems.append('the complete run did not complete')
+        return problems
+
+    def parser(self):
+        """The series in others formats (delimiter, date and decimal separator,
+        old nulls) give the same results, and the wrong lines are reported.
+        """
+        alternative_dir = self.path('data_alternative')
+        os.makedirs(alternative_dir)
+        for idx in range(3):
+            with open(os.path.join(self.data_dir, 'st{0}.txt'.format(idx))) as open_file:
+                lines = open_file.read().split('\n')
+            with open(os.path.join(alternative_dir, 'st{0}.txt'.format(idx)), 'w') as open_file:
+                for line in lines:
+                    if not line:
+                        continue
+                    date_value, value = line.split('\t')
+                    value = '-99999' if value == 'nan' else value.replace('.', ',')
+                    open_file.write('{0};{1}\n\n'.format(date_value.replace('-', '/'), value))
+        runfile = self.path('runfile_alternative.csv')
+        write_runfile(runfile, ['data_alternative/st{0}.txt'.format(idx) for idx in range(3)])
+        problems, log = self.run_and_compare('ref', self.path('out_parser'), '--no-cache', '--store-climate',
+                                             runfile=runfile)
+
+        # wrong value and missing date in the series
+        with open(os.path.join(self.data_dir, 'st2.txt')) as open_file:
+            lines = open_file.readlines()
+        wrong_dir = self.path('data_wrong')
+        os.makedirs(wrong_dir)
+        for idx in range(2):
+            shutil.copy(os.path.join(self.data_dir, 'st{0}.txt'.format(idx)), wrong_dir)
+        for case, wrong_lines, expected in \
+                [('value', lines[:99] + [lines[99].split('\t')[0] + '\t1.a\n'] + lines[100:], 'in line: 100'),
+                 ('date', lines[:199] + lines[200:], 'missing value for date')]:
+            with open(os.path.join(wrong_dir, 'st2.txt'), 'w') as open_file:
+                open_file.writelines(wrong_lines)
+            runfile = self.path('runfile_wrong.csv')
+            write_runfile(runfile, ['data_wrong/st{0}.txt'.format(idx) for idx in range(3)])
+            completed, log = self.run(self.path('out_wrong_' + case), '--no-cache', runfile=runfile)
+            if completed or expected not in log:
+                problems.append("the wrong {0} in the series was not reported ('{1}')".format(case, expected))
+
+        return problems
+
+    def parse_cache(self):
+        """The series read from the cache (and the cache invalidated when the
+        series change) give the same results.
+        """
+        home = self.path('home_parse_cache')
+        problems = []
+        for run in ['cold', 'warm']:
+            problems += self.run_and_compare('ref', self.path('out_parse_cache_' + run), '--store-climate',
+                                             home=home)[0]
+        if not os.listdir(os.path.join(home, '.jaziku', 'cache')):
+            problems.append('the series were not saved in the cache')
+        self.write_series(modified=True)
+        problems += self.run_and_compare('ref_modified', self.path('out_parse_cache_modified'), '--store-climate',
+                                         home=home)[0]
+        self.write_series()
+        return problems
+
+    def forecast_only(self):
+        """The forecast with the climate saved is the same forecast of the
+        complete run.
+        """
+        output_dir = self.path('out_forecast_only')
+        shutil.copytree(self.path('ref'), output_dir)
+        shutil.rmtree(os.path.join(output_dir, 'Jaziku_Forecast'))
+        completed, log = self.run(output_dir, '--no-cache', '--forecast-only')
+        if not completed:
+            return ['the run did not complete, see: ' + output_dir]
+        return compare_dirs(self.path('ref', 'Jaziku_Forecast'), os.path.join(output_dir, 'Jaziku_Forecast'))
+
+    def incremental(self):
+        """The climate updated incrementally from the previous run when the
+        series change is the same climate of the complete run.
+        """
+        output_dir = self.path('out_incremental')
+        shutil.copytree(self.path('ref'), output_dir)
+        self.write_series(modified=True)
+        problems, log = self.run_and_compare('ref_modified', output_dir, '--no-cache', '--incremental',
+                                             '--verify-incremental')
+        self.write_series()
+        if '(verified)' not in log:
+            problems.append('the incremental update was not verified')
+        return problems
+
+    def stage_cache(self):
+        """The stages restored from the cache (and the stages invalidated when
+        the series change) give the same results.
+        """
+        home = self.path('home_stage_cache')
+        # the output directory is part of the key of the stages, then all runs
+        # use the same directory
+        output_dir = self.path('out_stage_cache')
+        problems = []
+        for run in ['cold', 'warm']:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            run_problems, log = self.run_and_compare('ref', output_dir, '--stage-cache', '--store-climate', home=home)
+            problems += run_problems
+            if run == 'warm':
+                report = log.split('Cache of stages (hits/misses):')[-1]
+                if [misses for hits, misses in re.findall(r' (\d+)/(\d+)\n', report) if misses != '0']:
+                    problems.append('there are misses in the cache of stages with the same inputs')
+        self.write_series(modified=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        problems += self.run_and_compare('ref_modified', output_dir, '--stage-cache', '--store-climate', home=home)[0]
+        self.write_series()
+        return problems
+
+    def resume(self):
+        """The run killed after complete some units and resumed gives the same
+        results of the complete run.
+        """
+        output_dir = self.path('out_resume')
+        journal_file = os.path.join(output_dir, JOURNAL_DIR, 'journal.txt')
+
+        # kill the run when the first unit is completed
+        self.runs += 1
+        with open(self.path('log_{0:02d}_out_resume_killed.txt'.format(self.runs)), 'w') as open_log:
+            process = subprocess.Popen(self.command + [self.runfile, '-f', '-o', output_dir, '--no-cache',
+                                                       '--store-climate'],
+                                       stdin=subprocess.DEVNULL, stdout=open_log, stderr=subprocess.STDOUT,
+                                       env=self.environment(), cwd=self.work_dir)
+            while process.poll() is None and \
+                    not (os.path.isfile(journal_file) and os.path.getsize(journal_file) > 0):
+                time.sleep(0.01)
+            process.kill()
+            process.wait()
+
+        problems, log = self.run_and_compare('ref', output_dir, '--no-cache', '--store-climate', '--resume')
+        if 'Run resumed' not in log:
+            problems.append('the run was not resumed')
+        return problems
+
+    def data_analysis(self):
+        """The steps of the exploratory data analysis that use the pairs of
+        var D and var I (the outliers and the cross correlation) with nulls
+        of both variables inside the process period are completed. The
+        other steps of the data analysis are not checked.
+        """
+        files = []
+        for idx in range(3):
+            files.append('data/stm{0}.txt'.format(idx))
+            write_monthly_series(self.path(files[-1]), random.Random(10 + idx))
+        write_monthly_series(self.path('data/soi.txt'), random.Random(20), lambda rand: rand.uniform(-3, 3))
+        runfile = self.path('runfile_data_analysis.csv')
+        write_runfile(runfile, files, data_analysis=True, analysis_interval='monthly', forecast_date='3',
+                      file_var_I='data/soi.txt')
+        output_dir = self.path('out_data_analysis')
+        completed, log = self.run(output_dir, '--no-cache', runfile=runfile)
+        problems = []
+        for step in ['Outliers', 'CrossCorrelation']:
+            if not re.search(step + r' \.+ +done', log):
+                problems.append('the {0} of the data analysis did not complete, see: {1}'.format(step, output_dir))
+        return problems
+
+
+if __name__ == "__main__":
+    external_run()